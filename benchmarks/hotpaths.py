@@ -0,0 +1,341 @@
+"""Hot-path benchmark: per-call latency of the calculation and rendering code.
+
+Times the projection engine (against the original per-year loop),
+``generate_plots`` (figure specs against plotly objects),
+``analyze_financial_health``, the chat-context builder, ``calculate_batch``,
+the cash-flow ledger at annual and monthly steps, the goal solver, the
+sensitivity grid, decimating and encoding long chart series and a full
+``/calculate`` through Flask's test client.
+Inputs vary over 0-10 children, 5-70 year horizons and batch sizes. Each case reports the
+median and fastest per-call time over ``--repeat`` runs.
+
+Usage (from the repository root):
+
+    python benchmarks/hotpaths.py [--quick] [--repeat 5] [--only generate_plots]
+                                  [--output hotpaths.json]
+                                  [--compare baseline.json --threshold 0.25]
+
+``--compare`` reads an earlier ``--output`` file, prints the change per case
+and exits with status 1 if any case got slower than ``--threshold``.
+"""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from financial_planner import figures
+from financial_planner.context import build_chat_context, render_chat_context
+from financial_planner.planner import analyze_financial_health, calculate_batch, generate_plots, parse_user_profile
+from financial_planner.projection import profiles_to_arrays, project_ledger, project_profile
+from financial_planner.sensitivity import sensitivity_grid
+from financial_planner.solver import GOALS, solve_goal
+
+CHILDREN = (0, 1, 3, 10)
+HORIZONS = (5, 20, 40, 70)
+BATCH_SIZES = (1, 100, 1000, 10000)
+SERIES_LENGTHS = (1_000, 10_000, 100_000, 1_000_000)
+QUICK = {'children': (0, 10), 'horizons': (5, 70), 'batch_sizes': (1, 1000), 'series_lengths': (1_000, 1_000_000)}
+
+# Minimum wall time of one timed run; the loop count grows until a run takes this long
+MIN_RUN_SECONDS = 0.05
+
+
+def make_profile(num_children, horizon, seed=0):
+    """A deterministic profile retiring ``horizon`` years from now; also valid as a /calculate body."""
+    rng = np.random.default_rng(seed)
+    age = 95 - horizon if horizon > 40 else 30
+    return {
+        'age': age,
+        'retirement_age': age + horizon,
+        'current_savings': float(rng.integers(0, 500_000)),
+        'annual_income': float(rng.integers(30_000, 250_000)),
+        'children': [
+            {'age': int(child_age), 'education_goal': 'college'}
+            for child_age in rng.integers(0, 22, num_children)
+        ],
+    }
+
+
+def legacy_projection(user_profile):
+    """The original per-year loop the vectorized engine replaced, kept as the comparison baseline."""
+    annual_savings = user_profile['annual_income'] * 0.15
+    savings = []
+    current = user_profile['current_savings']
+    for _ in range(user_profile['retirement_age'] - user_profile['age'] + 1):
+        savings.append(current)
+        current = current * (1 + 0.06) + annual_savings
+
+    years_to_college = [18 - child['age'] for child in user_profile['children']]
+    projected_costs = [35000 * 4 * (1 + 0.05) ** years for years in years_to_college]
+    college_monthly = [
+        cost / (years * 12) if years > 0 else cost / 12
+        for cost, years in zip(projected_costs, years_to_college)
+    ]
+    monthly_expenses = user_profile['annual_income'] * 0.8 / 12
+    return {
+        'savings': savings,
+        'final_savings': savings[-1],
+        'projected_costs': projected_costs,
+        'college_monthly': college_monthly,
+        'total_monthly': annual_savings / 12 + sum(college_monthly),
+        'years_of_retirement_covered': savings[-1] / (monthly_expenses * 12),
+    }
+
+
+def time_call(func, repeat):
+    """Return (median, fastest) seconds per call and the loop count used."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_RUN_SECONDS or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < MIN_RUN_SECONDS / 10 else 2
+    runs = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        runs.append((time.perf_counter() - start) / loops)
+    return statistics.median(runs), min(runs), loops
+
+
+def case_key(case):
+    return f"{case['name']}[{','.join(f'{k}={v}' for k, v in sorted(case['params'].items()))}]"
+
+
+def projection_cases(grid):
+    for children in grid['children']:
+        for horizon in grid['horizons']:
+            profile = make_profile(children, horizon)
+            if not children:
+                # The ledger also pays college bills, so only childless profiles match the old loop
+                expected = legacy_projection(profile)['final_savings']
+                assert math.isclose(project_profile(profile)['final_savings'], expected, rel_tol=1e-9)
+            params = {'children': children, 'horizon': horizon}
+            yield 'projection', {**params, 'engine': 'vectorized'}, lambda p=profile: project_profile(p)
+            yield 'projection', {**params, 'engine': 'loop'}, lambda p=profile: legacy_projection(p)
+
+
+def plot_cases(grid):
+    # generate_plots imports plotly itself; only check that it is installed
+    engines = ('spec', 'plotly') if importlib.util.find_spec('plotly') else ('spec',)
+    for children in grid['children']:
+        for horizon in grid['horizons']:
+            profile = make_profile(children, horizon)
+            for engine in engines:
+                yield (
+                    'generate_plots',
+                    {'children': children, 'horizon': horizon, 'engine': engine},
+                    lambda p=profile, use_plotly=engine == 'plotly': generate_plots(p, use_plotly=use_plotly),
+                )
+
+
+def analysis_cases(grid):
+    for children in grid['children']:
+        for horizon in grid['horizons']:
+            profile = make_profile(children, horizon)
+            projection = project_profile(profile)
+            plots = generate_plots(profile, projection)
+            yield (
+                'analyze_financial_health',
+                {'children': children, 'horizon': horizon},
+                lambda p=profile, pl=plots, pr=projection: analyze_financial_health(p, pl, pr),
+            )
+
+
+def context_cases(grid):
+    for children in grid['children']:
+        profile = make_profile(children, 30)
+        projection = project_profile(profile)
+        yield (
+            'chat_context',
+            {'children': children},
+            lambda p=profile, pr=projection: render_chat_context(build_chat_context(p, pr)),
+        )
+
+
+def batch_cases(grid):
+    for size in grid['batch_sizes']:
+        profiles = [
+            make_profile(i % 4, HORIZONS[i % len(HORIZONS)], seed=i)
+            for i in range(size)
+        ]
+        yield 'calculate_batch', {'size': size, 'engine': 'vectorized'}, lambda p=profiles: list(calculate_batch(p))
+        yield (
+            'calculate_batch',
+            {'size': size, 'engine': 'loop'},
+            lambda p=profiles: [legacy_projection(parse_user_profile(data)) for data in p],
+        )
+
+
+def ledger_cases(grid):
+    for size in grid['batch_sizes']:
+        # Start at 15 so every ledger runs 80 years to age 95
+        profiles = [dict(make_profile(i % 4, 45, seed=i), age=15, retirement_age=60) for i in range(size)]
+        arrays = profiles_to_arrays(profiles)
+        for steps_per_year in (1, 12):
+            yield (
+                'ledger',
+                {'size': size, 'steps_per_year': steps_per_year},
+                lambda a=arrays, s=steps_per_year: project_ledger(a, s),
+            )
+
+
+def solver_cases(grid):
+    for children in grid['children']:
+        for horizon in grid['horizons']:
+            profile = make_profile(children, horizon)
+            for goal in GOALS:
+                yield (
+                    'solver',
+                    {'children': children, 'horizon': horizon, 'goal': goal},
+                    lambda p=profile, g=goal: solve_goal(p, g),
+                )
+
+
+def sensitivity_cases(grid):
+    # Returns x savings rates x retirement ages
+    shapes = ((10, 10, 10), (100, 100, 40)) if grid is QUICK else ((10, 10, 10), (50, 50, 20), (100, 100, 40))
+    for children in grid['children']:
+        profile = make_profile(children, 40)
+        for returns, rates, ages in shapes:
+            axes = (np.linspace(0.03, 0.09, returns), np.linspace(0.05, 0.30, rates),
+                    np.arange(profile['age'] + 1, profile['age'] + 1 + ages))
+            yield (
+                'sensitivity',
+                {'children': children, 'cells': returns * rates * ages},
+                lambda p=profile, a=axes: sensitivity_grid(p, *a),
+            )
+
+
+def series_cases(grid):
+    # One line trace as long as a monthly or multi-scenario series could get
+    for length in grid['series_lengths']:
+        ages = np.arange(length)
+        balances = np.cumsum(np.random.default_rng(0).normal(size=length))
+        yield (
+            'compact_figure',
+            {'points': length},
+            lambda x=ages, y=balances: figures.dumps(figures.compact_figure(figures.retirement_figure(x, y))),
+        )
+
+
+def endpoint_cases(grid):
+    from financial_planner.app import create_app
+
+    # One app without a result cache to time the computation, one to time cache hits
+    previous = os.environ.get('RESULT_CACHE_BACKEND')
+    clients = {}
+    for cache in ('none', 'memory'):
+        os.environ['RESULT_CACHE_BACKEND'] = cache
+        clients[cache] = create_app().test_client()
+    if previous is None:
+        del os.environ['RESULT_CACHE_BACKEND']
+    else:
+        os.environ['RESULT_CACHE_BACKEND'] = previous
+
+    def post(client, body):
+        response = client.post('/calculate', json=body)
+        assert response.status_code == 200
+        return response.data
+
+    for children in grid['children']:
+        for horizon in grid['horizons']:
+            body = make_profile(children, horizon)
+            for cache, client in clients.items():
+                yield (
+                    'calculate_endpoint',
+                    {'children': children, 'horizon': horizon, 'cache': 'off' if cache == 'none' else 'hit'},
+                    lambda c=client, b=body: post(c, b),
+                )
+
+
+SUITES = {
+    'projection': projection_cases,
+    'generate_plots': plot_cases,
+    'analyze_financial_health': analysis_cases,
+    'chat_context': context_cases,
+    'calculate_batch': batch_cases,
+    'ledger': ledger_cases,
+    'solver': solver_cases,
+    'sensitivity': sensitivity_cases,
+    'compact_figure': series_cases,
+    'calculate_endpoint': endpoint_cases,
+}
+
+
+def compare(results, baseline_path, threshold):
+    """Print the per-case change against a baseline file and return the regressed case keys."""
+    with open(baseline_path) as f:
+        baseline = {case_key(case): case for case in json.load(f)['results']}
+    regressions = []
+    for case in results:
+        key = case_key(case)
+        if key not in baseline:
+            continue
+        change = case['median_us'] / baseline[key]['median_us'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{key:<70} {change:+7.1%}{flag}")
+        if change > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help='run a reduced input grid')
+    parser.add_argument('--only', action='append', choices=sorted(SUITES), help='run only these suites')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output run')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown before failing')
+    args = parser.parse_args()
+
+    grid = QUICK if args.quick else {
+        'children': CHILDREN, 'horizons': HORIZONS, 'batch_sizes': BATCH_SIZES, 'series_lengths': SERIES_LENGTHS,
+    }
+    results = []
+    for suite in args.only or SUITES:
+        for name, params, func in SUITES[suite](grid):
+            median, fastest, loops = time_call(func, args.repeat)
+            case = {
+                'name': name,
+                'params': params,
+                'median_us': median * 1e6,
+                'min_us': fastest * 1e6,
+                'loops': loops,
+            }
+            if 'size' in params:
+                case['profiles_per_second'] = params['size'] / median
+            results.append(case)
+            print(f"{case_key(case):<70} {case['median_us']:12.1f} us")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'repeat': args.repeat,
+                'results': results,
+            }, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
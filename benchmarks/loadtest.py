@@ -0,0 +1,278 @@
+"""Load test: throughput and latency of mixed /calculate and /chat traffic.
+
+Many concurrent clients (``--concurrency``) send requests over keep-alive
+connections for ``--duration`` seconds. A ``--chat-ratio`` share of the
+requests go to /chat and the rest to /calculate, with a different profile
+each time so the result cache does not answer them. The test reports
+requests per second, latency percentiles and errors (including 503s from
+ASGI load shedding) per endpoint.
+
+Usage (from the repository root):
+
+    python benchmarks/loadtest.py --launch [--openai-delay 1.0] [--output loadtest.json]
+    python benchmarks/loadtest.py --target wsgi=http://127.0.0.1:5000 --target asgi=http://127.0.0.1:8000
+
+``--launch`` starts a fake OpenAI server and the app twice: on Flask's
+threaded WSGI server (the ``app.run`` mode) and on uvicorn in ASGI mode
+(``financial_planner.asgi``, which needs ``pip install uvicorn``). Each
+server gets the fake server's address as ``OPENAI_BASE_URL``, with the
+result cache off. Then both are load-tested in turn. Against servers you
+run yourself, point their ``OPENAI_BASE_URL`` at
+``python benchmarks/loadtest.py --serve-fake-openai 9100`` so /chat latency
+is the simulated ``--openai-delay`` rather than the real API.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPLY = 'You are on track for retirement.'
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions with a fixed reply after ``server.delay`` seconds."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        time.sleep(self.server.delay)
+        payload = json.dumps({
+            'id': 'chatcmpl-load', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': REPLY}}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_fake_openai(port, delay):
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_profile(rng):
+    age = rng.randint(25, 55)
+    return {
+        'age': age,
+        'retirement_age': rng.randint(age + 5, 70),
+        'current_savings': rng.randint(0, 500_000),
+        'annual_income': rng.randint(30_000, 250_000),
+        'children': [{'age': rng.randint(0, 17), 'education_goal': 'college'} for _ in range(rng.randint(0, 3))],
+    }
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; return (status, body, server_closes_connection)."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Server closed the connection')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            chunks.append(await reader.readexactly(size + 2))
+            if size == 0:
+                break
+        body = b''.join(chunk[:-2] for chunk in chunks)
+    else:
+        body = await reader.read()
+    return status, body, headers.get('connection', '').lower() == 'close'
+
+
+class Client:
+    """One keep-alive connection, reopened whenever the server closes it."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.reader = self.writer = None
+
+    async def request(self, path, body):
+        payload = json.dumps(body).encode()
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(
+                f'POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n'.encode() + payload
+            )
+            try:
+                await self.writer.drain()
+                status, body, close = await read_response(self.reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.close()
+                if attempt:
+                    raise
+                continue
+            if close:
+                self.close()
+            return status, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def run_load(url, concurrency, duration, chat_ratio, seed):
+    """Drive ``url`` with ``concurrency`` clients; return {endpoint: [(latency, status), ...]}."""
+    results = {'/calculate': [], '/chat': []}
+    deadline = time.perf_counter() + duration
+
+    async def worker(index):
+        rng = random.Random(seed * 100_003 + index)
+        client = Client(url)
+        try:
+            while time.perf_counter() < deadline:
+                if rng.random() < chat_ratio:
+                    path, body = '/chat', {'message': f'Question {rng.random()}', 'financialData': make_profile(rng)}
+                else:
+                    path, body = '/calculate', make_profile(rng)
+                start = time.perf_counter()
+                try:
+                    status, _ = await client.request(path, body)
+                except (ConnectionError, OSError, asyncio.IncompleteReadError):
+                    status = 0
+                results[path].append((time.perf_counter() - start, status))
+        finally:
+            client.close()
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return results
+
+
+def summarize(results, duration):
+    summary = {}
+    for endpoint, samples in results.items():
+        ok = sorted(latency for latency, status in samples if status == 200)
+        quantiles = statistics.quantiles(ok, n=100) if len(ok) >= 2 else [ok[0] if ok else float('nan')] * 99
+        summary[endpoint] = {
+            'requests': len(samples),
+            'ok_per_second': len(ok) / duration,
+            'p50_ms': quantiles[49] * 1000,
+            'p95_ms': quantiles[94] * 1000,
+            'p99_ms': quantiles[98] * 1000,
+            'shed_503': sum(status == 503 for _, status in samples),
+            'errors': sum(status not in (200, 503) for _, status in samples),
+        }
+    return summary
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((parts.hostname, parts.port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not start')
+
+
+def launch_servers(openai_url):
+    """Start the WSGI and ASGI servers; return ({name: url}, processes)."""
+    env = dict(os.environ, OPENAI_API_KEY='sk-load-test', OPENAI_BASE_URL=openai_url,
+               RESULT_CACHE_BACKEND='none', METRICS_ENABLED='0', PYTHONPATH=ROOT)
+    wsgi_port, asgi_port = free_port(), free_port()
+    commands = {
+        'wsgi': [sys.executable, '-c',
+                 'from financial_planner.app import create_app; '
+                 f'create_app().run(port={wsgi_port}, threaded=True)'],
+        'asgi': [sys.executable, '-m', 'uvicorn', 'financial_planner.asgi:app',
+                 '--port', str(asgi_port), '--log-level', 'warning'],
+    }
+    targets = {'wsgi': f'http://127.0.0.1:{wsgi_port}', 'asgi': f'http://127.0.0.1:{asgi_port}'}
+    processes = [subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+                 for command in commands.values()]
+    for url in targets.values():
+        wait_for(url)
+    return targets, processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', action='append', default=[], metavar='NAME=URL', help='server to load-test')
+    parser.add_argument('--launch', action='store_true', help='start WSGI and ASGI servers and test both')
+    parser.add_argument('--serve-fake-openai', type=int, metavar='PORT', help='only run the fake OpenAI server')
+    parser.add_argument('--openai-delay', type=float, default=1.0, help='simulated OpenAI latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--chat-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.serve_fake_openai is not None:
+        server = start_fake_openai(args.serve_fake_openai, args.openai_delay)
+        print(f'Fake OpenAI at http://127.0.0.1:{server.server_address[1]}/v1 (Ctrl+C to stop)')
+        threading.Event().wait()
+
+    targets = dict(target.split('=', 1) for target in args.target)
+    processes = []
+    if args.launch:
+        fake = start_fake_openai(0, args.openai_delay)
+        launched, processes = launch_servers(f'http://127.0.0.1:{fake.server_address[1]}/v1')
+        targets.update(launched)
+    if not targets:
+        parser.error('give at least one --target or --launch')
+
+    report = {'concurrency': args.concurrency, 'duration': args.duration, 'chat_ratio': args.chat_ratio,
+              'openai_delay': args.openai_delay if args.launch else None, 'targets': {}}
+    try:
+        for name, url in targets.items():
+            results = asyncio.run(run_load(url, args.concurrency, args.duration, args.chat_ratio, args.seed))
+            report['targets'][name] = summary = summarize(results, args.duration)
+            for endpoint, stats in summary.items():
+                print(f"{name:<6} {endpoint:<11} {stats['ok_per_second']:8.1f} req/s"
+                      f"  p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  p99 {stats['p99_ms']:8.1f} ms"
+                      f"  503s {stats['shed_503']:5d}  errors {stats['errors']:5d}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Cold-start benchmark: import time and peak RSS of the app's entry points.
+
+Each target is imported in a fresh interpreter, the way a gunicorn worker or
+a serverless container starts, and the median over ``--repeat`` runs is
+reported. The ``eager-stack`` row imports everything the app used to load at
+import time, for comparison.
+
+Usage (from the repository root):
+
+    python benchmarks/startup.py [--repeat 5] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'numpy': 'import numpy',
+    'engine': 'import financial_planner.planner',
+    'web-module': 'import financial_planner.app',
+    'create-app': 'from financial_planner.app import create_app; create_app()',
+    'eager-stack': 'import flask, numpy, plotly, plotly.graph_objects, openai, dotenv',
+}
+
+_SNIPPET = '''
+import json, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_kb = rss / 1024 if sys.platform == 'darwin' else rss
+except ImportError:
+    rss_kb = None
+print(json.dumps({{'seconds': elapsed, 'max_rss_kb': rss_kb}}))
+'''
+
+
+def measure(code, repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _SNIPPET.format(code=code)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    rss = [run['max_rss_kb'] for run in runs if run['max_rss_kb'] is not None]
+    return {
+        'import_ms': statistics.median(run['seconds'] for run in runs) * 1000,
+        'max_rss_mb': statistics.median(rss) / 1024 if rss else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in TARGETS.items():
+        try:
+            results[name] = measure(code, args.repeat)
+        except subprocess.CalledProcessError as e:
+            results[name] = {'error': e.stderr.strip().splitlines()[-1]}
+        row = results[name]
+        if 'error' in row:
+            print(f"{name:<12} error: {row['error']}")
+        else:
+            rss = f"{row['max_rss_mb']:.1f} MB" if row['max_rss_mb'] is not None else 'n/a'
+            print(f"{name:<12} {row['import_ms']:8.1f} ms  {rss:>10}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
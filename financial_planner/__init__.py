@@ -0,0 +1 @@
+"""Financial Planner web application."""
@@ -1,412 +1,597 @@
-from flask import Flask, render_template, request, jsonify, session
-import plotly
-import plotly.graph_objects as go
-import numpy as np
+from flask import Blueprint, Flask, Response, current_app, g, render_template, request, jsonify, stream_with_context
 import json
-import openai
 import os
-from dotenv import load_dotenv
+import time
 
-# Load environment variables from .env file
-load_dotenv()
+from financial_planner import figures, metrics
+from financial_planner.assumptions import create_assumption_registry
+from financial_planner.cache import cache_key, create_result_cache
+from financial_planner.compression import COMPRESS_MIN_BYTES, COMPRESSIBLE_MIMETYPES, ENCODINGS, compress
+from financial_planner.context import (
+    CONTEXT_TTL,
+    MAX_MESSAGE_TOKENS,
+    build_chat_context,
+    build_chat_messages,
+    context_id_for,
+    decode_context,
+    encode_context,
+    render_chat_context,
+)
+from financial_planner.conversations import (
+    CONVERSATION_COOKIE,
+    create_conversation_store,
+    is_valid_conversation_id,
+    new_conversation_id,
+)
+from financial_planner.delta import apply_changes, calc_id_for, calculate_delta
+from financial_planner.llm import chat_cache_key, get_openai_response, stream_openai_response
+from financial_planner.montecarlo import SIMULATION_ASSUMPTIONS
+from financial_planner.planner import BATCH_CHUNK_SIZE, calculate_batch, calculate_plan
+from financial_planner.projection import project_profile
+from financial_planner.scenarios import DEFAULT_LIST_LIMIT, create_scenario_store
+from financial_planner.sensitivity import baseline_index, sensitivity_grid
+from financial_planner.solver import solve_goal
+from financial_planner.validation import (
+    ChatMessageError,
+    ProfileError,
+    parse_monte_carlo_options,
+    parse_scenario_labels,
+    parse_sensitivity_axes,
+    parse_solve_options,
+    parse_user_profile,
+    parse_user_profiles,
+)
 
-app = Flask(__name__)
-app.secret_key = os.urandom(24)  # For session management
+# Canned follow-ups repeat often, but replies should not outlive the conversation
+CHAT_CACHE_TTL = 600
+CONVERSATION_COOKIE_MAX_AGE = 30 * 24 * 3600
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
 
-# Configure OpenAI
-openai.api_key = os.getenv('OPENAI_API_KEY')
-if not openai.api_key:
-    print("Warning: OPENAI_API_KEY not set in environment variables")
+bp = Blueprint('planner', __name__)
 
-def get_openai_response(messages):
-    """Wrapper function for OpenAI API calls with error handling"""
-    try:
-        if not openai.api_key:
-            raise ValueError("OpenAI API key is not set")
-            
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=300
-        )
-        return response.choices[0].message.content, None
-    except Exception as e:
-        print(f"OpenAI API Error: {str(e)}")
-        return None, str(e)
+def create_app():
+    """Create the Flask application.
 
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-@app.route('/input')
-def input_form():
-    return render_template('input.html')
-
-@app.route('/calculate', methods=['POST'])
-def calculate():
-    data = request.get_json()
+    Loading the .env file and checking the OpenAI key happen here rather
+    than at import time; plotly and openai are only imported when first used
+    (see ``financial_planner.llm`` for the shared chat client).
+    """
+    from dotenv import load_dotenv
     
-    # Extract user data
-    user_profile = {
-        'age': int(data['age']),
-        'current_savings': float(data['current_savings']),
-        'annual_income': float(data['annual_income']),
-        'retirement_age': int(data['retirement_age']),
-        'children': [
-            {'age': int(child['age']), 'education_goal': child['education_goal']}
-            for child in data['children']
-        ]
-    }
+    # Load environment variables from .env file
+    load_dotenv()
     
-    # Generate visualizations
-    plots = generate_plots(user_profile)
+    app = Flask(__name__)
+    # A fixed key keeps signed cookies valid across workers and restarts
+    app.secret_key = os.getenv('FLASK_SECRET_KEY') or os.urandom(24)
     
-    # Generate financial health analysis
-    analysis = analyze_financial_health(user_profile, plots)
-    plots['analysis'] = analysis
+    # Memoized /calculate responses and /chat replies (see RESULT_CACHE_* / CHAT_CACHE_* in README)
+    app.extensions['result_cache'] = create_result_cache()
+    app.extensions['chat_cache'] = create_result_cache('CHAT_CACHE', ttl=CHAT_CACHE_TTL)
     
-    return jsonify(plots)
-
-def analyze_financial_health(user_profile, plots):
-    """Analyze financial health and provide recommendations."""
-    annual_return_rate = 0.06
-    savings_rate = 0.15
-    annual_savings = user_profile['annual_income'] * savings_rate
-    years_to_retirement = user_profile['retirement_age'] - user_profile['age']
+    # Compact per-profile chat contexts written by /calculate and read by /chat
+    app.extensions['context_store'] = create_result_cache('CHAT_CONTEXT', ttl=CONTEXT_TTL)
     
-    # Calculate total monthly obligations
-    monthly_retirement = annual_savings / 12
-    total_monthly = monthly_retirement
+    # Parsed profiles by calc_id, the base that delta /calculate requests patch
+    app.extensions['profile_store'] = create_result_cache('PROFILE_STORE', ttl=CONTEXT_TTL)
     
-    # Education costs analysis
-    education_risks = []
-    if user_profile['children']:
-        college_start_age = 18
-        estimated_annual_college_cost = 35000
-        college_inflation_rate = 0.05
-        
-        for child in user_profile['children']:
-            years_to_college = college_start_age - child['age']
-            future_cost = estimated_annual_college_cost * 4 * (1 + college_inflation_rate) ** years_to_college
-            monthly_required = future_cost / (years_to_college * 12) if years_to_college > 0 else future_cost / 12
-            total_monthly += monthly_required
-            
-            if monthly_required > user_profile['annual_income'] / 24:  # If monthly requirement exceeds half of monthly income
-                education_risks.append(f"Child age {child['age']}: High monthly savings requirement (${monthly_required:,.2f})")
+    # Chat history kept server-side; the browser only holds the conversation ID
+    app.extensions['conversations'] = create_conversation_store()
+    # Saved scenarios, in the instance folder unless SCENARIO_STORE_PATH says otherwise
+    app.extensions['scenarios'] = create_scenario_store(app.instance_path)
     
-    # Calculate retirement savings projection
-    final_savings = user_profile['current_savings']
-    for _ in range(years_to_retirement):
-        final_savings = final_savings * (1 + annual_return_rate) + annual_savings
+    # Named assumption sets from ASSUMPTIONS_FILE, picked per request by the "assumptions" field
+    app.extensions['assumptions'] = create_assumption_registry()
     
-    # Estimated monthly expenses in retirement (using 80% of current income as baseline)
-    monthly_expenses_in_retirement = (user_profile['annual_income'] * 0.8) / 12
-    years_of_retirement_covered = final_savings / (monthly_expenses_in_retirement * 12)
+    if not os.getenv('OPENAI_API_KEY'):
+        print("Warning: OPENAI_API_KEY not set in environment variables")
     
-    # Generate analysis summary
-    analysis = {
-        'summary': '',
-        'risks': [],
-        'recommendations': []
-    }
-    
-    # Risk assessment
-    if years_of_retirement_covered < 20:
-        analysis['risks'].append(f"Your retirement savings may only last {years_of_retirement_covered:.1f} years after retirement")
-    
-    if total_monthly > user_profile['annual_income'] / 12 * 0.5:
-        analysis['risks'].append("Total monthly savings requirement exceeds 50% of your monthly income")
-    
-    analysis['risks'].extend(education_risks)
-    
-    # Recommendations
-    if years_of_retirement_covered < 20:
-        analysis['recommendations'].append(f"Consider increasing your retirement savings rate above the current {savings_rate*100}%")
-    
-    if user_profile['current_savings'] < user_profile['annual_income']:
-        analysis['recommendations'].append("Build an emergency fund of at least 6 months of expenses")
-    
-    if education_risks:
-        analysis['recommendations'].append("Consider starting a 529 college savings plan for each child")
-        analysis['recommendations'].append("Research scholarship and financial aid opportunities")
+    app.register_blueprint(bp)
+    return app
+
+def _sse(payload, event=None):
+    """Format one Server-Sent Events frame."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+def _complete(messages):
+    """Fetch a full reply from OpenAI as UTF-8 bytes, raising on failure so errors are never cached."""
+    assistant_message, error = get_openai_response(messages)
     
-    # Overall summary
-    risk_level = "LOW" if len(analysis['risks']) == 0 else "MODERATE" if len(analysis['risks']) <= 2 else "HIGH"
+    if error:
+        print(f"OpenAI API Error: {error}")
+        raise Exception(error)
+        
+    if not assistant_message:
+        raise Exception("No response received from OpenAI")
     
-    analysis['summary'] = f"""Financial Health Assessment: {risk_level} RISK
+    return assistant_message.encode()
 
-Retirement Outlook:
-- You're saving ${annual_savings:,.2f} annually for retirement
-- Projected savings at retirement: ${final_savings:,.2f}
-- This could cover approximately {years_of_retirement_covered:.1f} years of retirement
+def _stream_chat(messages, chat_cache=None, on_reply=None):
+    """Relay streamed completion fragments to the browser as SSE frames.
 
-Monthly Savings Requirements:
-- Total monthly savings needed: ${total_monthly:,.2f}
-- This represents {(total_monthly/(user_profile['annual_income']/12)*100):.1f}% of your monthly income
+    A cached reply, or one produced by an identical request already in
+    flight, is sent as a single frame; otherwise this request streams from
+    OpenAI and caches the assembled reply for the requests waiting on it.
+    ``on_reply`` is called with the full reply text once it has been sent.
+    """
+    try:
+        reply = None
+        if chat_cache is None:
+            parts = []
+            for delta in stream_openai_response(messages):
+                parts.append(delta)
+                yield _sse({"delta": delta})
+            reply = ''.join(parts).encode()
+        else:
+            key = chat_cache_key(messages)
+            reply = chat_cache.get(key)
+            if reply is None:
+                flight, is_leader = chat_cache.claim(key)
+                if not is_leader:
+                    reply = chat_cache.wait(flight)
+            if reply is not None:
+                yield _sse({"delta": reply.decode()})
+            else:
+                start = time.perf_counter()
+                parts = []
+                try:
+                    for delta in stream_openai_response(messages):
+                        parts.append(delta)
+                        yield _sse({"delta": delta})
+                except BaseException as e:
+                    # Also reached when the browser disconnects; waiters must not hang
+                    error = e if isinstance(e, Exception) else RuntimeError("Reply stream was interrupted")
+                    chat_cache.complete(key, flight, error=error)
+                    raise
+                reply = ''.join(parts).encode()
+                chat_cache.complete(key, flight, reply, time.perf_counter() - start)
+        if on_reply is not None:
+            on_reply(reply.decode())
+        yield _sse({"success": True}, event="done")
+    except Exception as e:
+        print(f"Chat Error: {str(e)}")
+        yield _sse({"success": False, "error": str(e)}, event="error")
 
-{"" if not user_profile['children'] else f"Education Planning:\n- You have {len(user_profile['children'])} children to plan for\n- Total education costs will be a significant portion of your savings goals"}"""
-    
-    return analysis
+@bp.before_app_request
+def _start_request():
+    g.trace_start = metrics.start_trace()
+    g.profiler = None
+    if metrics.profiling_requested(request.headers.get('X-Profile')):
+        g.profiler = metrics.start_profile()
 
-def generate_plots(user_profile):
-    plots = {}
-    
-    # 1. Retirement Planning Visualization
-    current_age = user_profile['age']
-    retirement_age = user_profile['retirement_age']
-    current_savings = user_profile['current_savings']
-    annual_income = user_profile['annual_income']
+@bp.after_app_request
+def _finish_request(response):
+    """Record request latency, report stage timings and save a requested profile."""
+    if g.get('trace_start') is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        spans = metrics.finish_trace(g.trace_start, endpoint, request.method, response.status_code)
+        g.trace_start = None
+        if spans:
+            response.headers['Server-Timing'] = metrics.server_timing(spans)
+    if g.get('profiler') is not None:
+        path = metrics.stop_profile(g.profiler, request.endpoint.rsplit('.', 1)[-1] if request.endpoint else 'unmatched')
+        g.profiler = None
+        response.headers['X-Profile'] = os.path.basename(path)
+    return response
+
+@bp.after_app_request
+def _compress_response(response):
+    """gzip or brotli encode large responses; registered after ``_finish_request`` so it runs first."""
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+    with metrics.span('compress'):
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+@bp.app_errorhandler(ProfileError)
+def _invalid_profile(e):
+    """Structured 400 for profiles rejected by ``financial_planner.validation``."""
+    return jsonify(e.to_dict()), 400
+
+@bp.teardown_app_request
+def _teardown_request(exc):
+    # after_request is skipped when a view raises; never leave the profiler running
+    if g.get('profiler') is not None:
+        metrics.stop_profile(g.profiler)
+        g.profiler = None
+
+def _with_conversation_cookie(response, conversation_id, new_conversation):
+    """Hand a newly started conversation's opaque ID to the browser."""
+    if new_conversation:
+        response.set_cookie(
+            CONVERSATION_COOKIE,
+            conversation_id,
+            max_age=CONVERSATION_COOKIE_MAX_AGE,
+            httponly=True,
+            samesite='Lax',
+        )
+    return response
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+@bp.route('/input')
+def input_form():
+    return render_template('input.html')
+
+def _assumptions(data):
+    """The assumption set a request body names in ``assumptions``; the default set if it has none."""
+    spec = data.get('assumptions') if isinstance(data, dict) else None
+    return current_app.extensions['assumptions'].resolve(spec)
+
+def _remember_profile(user_profile, assumptions):
+    """Store a profile's chat context and delta base; return ``(context_id, calc_id, projection)``.
+
+    ``projection`` is None unless building the chat context computed it.
+    """
+    # Store the compact chat context once per profile; /chat refers to it by ID
+    projection = None
+    context_id = calc_id = None
+    context_store = current_app.extensions['context_store']
+    if context_store is not None:
+        def build_context():
+            nonlocal projection
+            projection = project_profile(user_profile, assumptions=assumptions)
+            return encode_context(build_chat_context(user_profile, projection, assumptions))
+        context_id = context_id_for(user_profile, assumptions)
+        with metrics.span('context'):
+            context_store.get_or_compute(context_id, build_context)
     
-    annual_return_rate = 0.06
-    savings_rate = 0.15
-    annual_savings = annual_income * savings_rate
+    # The assumption values are kept too, so later deltas project like the base did
+    profile_store = current_app.extensions['profile_store']
+    if profile_store is not None:
+        calc_id = calc_id_for(user_profile, assumptions)
+        profile_store.get_or_compute(
+            calc_id, lambda: json.dumps({'profile': user_profile, 'assumptions': assumptions.values}).encode()
+        )
+    return context_id, calc_id, projection
+
+@bp.route('/calculate', methods=['POST'])
+def calculate():
+    data = request.get_json()
+    if isinstance(data, dict) and data.get('calc_id') is not None:
+        return _calculate_delta(data)
     
-    years = np.arange(current_age, retirement_age + 1)
-    savings = []
-    current = current_savings
+    # Extract user data; invalid profiles are answered by _invalid_profile
+    user_profile = parse_user_profile(data)
+    assumptions = _assumptions(data)
+    options = parse_monte_carlo_options(data.get('monte_carlo'))
+    context_id, calc_id, projection = _remember_profile(user_profile, assumptions)
     
-    for _ in range(len(years)):
-        savings.append(current)
-        current = current * (1 + annual_return_rate) + annual_savings
+    def compute():
+        plots = calculate_plan(user_profile, options, projection, assumptions)
+        plots['context_id'] = context_id
+        plots['calc_id'] = calc_id
+        with metrics.span('encode'):
+            return figures.dumps(plots)
     
-    fig1 = go.Figure()
-    fig1.add_trace(go.Scatter(
-        x=years,
-        y=savings,
-        mode='lines+markers',
-        name='Projected Savings',
-        line=dict(color='#00ff00', width=3),
-        marker=dict(size=8, symbol='circle')
-    ))
+    # Unseeded Monte Carlo runs are random by design, so only cache reproducible results
+    result_cache = current_app.extensions['result_cache']
+    if result_cache is None or (options is not None and options['seed'] is None):
+        return Response(compute(), mimetype='application/json', headers={'X-Cache': 'MISS'})
     
-    fig1.update_layout(
-        title='Projected Retirement Savings Growth',
-        title_x=0.5,
-        xaxis_title='Age',
-        yaxis_title='Savings ($)',
-        showlegend=True,
-        template='plotly_dark',
-        plot_bgcolor='rgba(0,0,0,0)',
+    # Keyed by the assumption values' digest: changing one set only misses its own results
+    key = cache_key(
+        user_profile,
+        assumptions.digest,
+        {**options, **SIMULATION_ASSUMPTIONS} if options is not None else None,
     )
+    body, cache_status = result_cache.get_or_compute(key, compute)
+    return Response(body, mimetype='application/json', headers={'X-Cache': cache_status})
+
+def _calculate_delta(data):
+    """Apply ``changes`` to the profile stored under ``calc_id`` and return a figure patch."""
+    if data.get('monte_carlo'):
+        return jsonify({'error': 'Monte Carlo results need a full /calculate request'}), 400
+    calc_id = data.get('calc_id')
+    if not isinstance(calc_id, str) or not calc_id:
+        raise ProfileError([{'field': 'calc_id', 'message': 'must be a non-empty string'}])
+    profile_store = current_app.extensions['profile_store']
+    stored = profile_store.get(calc_id) if profile_store is not None else None
+    if stored is None:
+        # Unknown or expired; the browser falls back to sending the full profile
+        return jsonify({'error': 'Unknown calc_id, send the full profile'}), 404
+    stored = json.loads(stored)
+    base_profile = stored['profile']
+    assumptions = current_app.extensions['assumptions'].from_values(stored['assumptions'])
+    user_profile = apply_changes(base_profile, data.get('changes', {}))
     
-    plots['retirement'] = json.loads(fig1.to_json())
+    context_id, calc_id, projection = _remember_profile(user_profile, assumptions)
+    result = calculate_delta(base_profile, user_profile, projection, assumptions=assumptions)
+    result['context_id'] = context_id
+    result['calc_id'] = calc_id
+    with metrics.span('encode'):
+        body = figures.dumps(result)
+    return Response(body, mimetype='application/json')
+
+@bp.route('/assumptions')
+def list_assumptions():
+    """The named assumption sets with their current version, digest and values."""
+    return jsonify({'assumptions': current_app.extensions['assumptions'].describe()})
+
+@bp.route('/cache/stats')
+def cache_stats():
+    """Hit rate, saved latency and eviction counters per endpoint, for sizing the caches."""
+    caches = {'calculate': 'result_cache', 'chat': 'chat_cache', 'chat_context': 'context_store'}
+    return jsonify({
+        endpoint: current_app.extensions[name].stats() if current_app.extensions[name] is not None else None
+        for endpoint, name in caches.items()
+    })
+
+@bp.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: request and stage latency histograms and OpenAI call outcomes."""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/calculate/batch', methods=['POST'])
+def calculate_batch_endpoint():
+    """Stream newline-delimited JSON results for a list of profiles."""
+    data = request.get_json()
+    if isinstance(data, dict):
+        profiles = data.get('profiles', [])
+        include_figures = bool(data.get('include_figures', False))
+    else:
+        profiles = data
+        include_figures = False
+    # Validate everything before the first line is streamed, so a bad entry is still a 400
+    with metrics.span('parse'):
+        user_profiles = parse_user_profiles(profiles)
+    assumptions = _assumptions(data)
     
-    # 2. Education Planning Visualization
-    if user_profile['children']:
-        children_data = user_profile['children']
-        college_start_age = 18
-        years_to_college = [(college_start_age - child['age']) for child in children_data]
-        estimated_annual_college_cost = 35000
-        college_inflation_rate = 0.05
-        
-        current_costs = [estimated_annual_college_cost * 4] * len(children_data)
-        projected_costs = [
-            estimated_annual_college_cost * 4 * (1 + college_inflation_rate) ** years 
-            for years in years_to_college
-        ]
-        
-        fig2 = go.Figure()
-        
-        for i, (current, projected) in enumerate(zip(current_costs, projected_costs)):
-            fig2.add_trace(go.Bar(
-                name=f'Child {i+1} Current',
-                x=[f'Child {i+1}'],
-                y=[current],
-                marker_color='#3366cc'
-            ))
-            fig2.add_trace(go.Bar(
-                name=f'Child {i+1} Projected',
-                x=[f'Child {i+1}'],
-                y=[projected],
-                marker_color='#dc3912'
-            ))
-        
-        fig2.update_layout(
-            title='Projected 4-Year College Costs by Child',
-            title_x=0.5,
-            barmode='group',
-            template='plotly_dark',
-            plot_bgcolor='rgba(0,0,0,0)',
-        )
-        
-        plots['education'] = json.loads(fig2.to_json())
-        
-        # 3. Monthly Savings Requirements
-        retirement_monthly = annual_savings / 12
-        college_monthly = []
-        
-        for years in years_to_college:
-            future_cost = estimated_annual_college_cost * 4 * (1 + college_inflation_rate) ** years
-            monthly_required = future_cost / (years * 12) if years > 0 else future_cost / 12
-            college_monthly.append(monthly_required)
-        
-        goals = ['Retirement'] + [f'Child {i+1} Education' for i in range(len(children_data))]
-        monthly_savings = [retirement_monthly] + college_monthly
-        
-        fig3 = go.Figure()
-        fig3.add_trace(go.Bar(
-            x=goals,
-            y=monthly_savings,
-            marker=dict(
-                color=monthly_savings,
-                colorscale='Viridis',
-            ),
-            text=[f'${x:,.0f}' for x in monthly_savings],
-            textposition='inside',
+    def generate():
+        lines = []
+        for result in calculate_batch(profiles, include_figures, user_profiles=user_profiles, assumptions=assumptions):
+            lines.append(figures.dumps(result))
+            if len(lines) == BATCH_CHUNK_SIZE:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@bp.route('/solve', methods=['POST'])
+def solve():
+    """Solve for the savings rate, retirement age or per-child college saving that meets a target.
+
+    The body is a ``/calculate`` profile plus ``goal`` (``savings_rate``,
+    ``retirement_age`` or ``college_contribution``) and optionally
+    ``target_years`` and ``last_until`` (null to skip the longevity check).
+    """
+    data = request.get_json()
+    user_profile = parse_user_profile(data)
+    assumptions = _assumptions(data)
+    options = parse_solve_options(data, user_profile)
+    try:
+        with metrics.span('solve'):
+            result = solve_goal(user_profile, data.get('goal', 'savings_rate'), **options, assumptions=assumptions)
+    except ValueError as e:
+        # An unknown goal
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+@bp.route('/sensitivity', methods=['POST'])
+def sensitivity():
+    """Final savings and years covered over a grid of return rates, savings rates and retirement ages.
+
+    The body is a ``/calculate`` profile plus optional ``return_rates``,
+    ``savings_rates`` and ``retirement_ages`` axes (see
+    ``parse_sensitivity_axes``). The heatmap shows the retirement age nearest
+    the profile's own.
+    """
+    data = request.get_json()
+    user_profile = parse_user_profile(data)
+    assumptions = _assumptions(data)
+    axes = parse_sensitivity_axes(data, user_profile)
+    with metrics.span('projection'):
+        grid = sensitivity_grid(user_profile, **axes, assumptions=assumptions)
+
+    baseline = baseline_index(grid, user_profile, assumptions)
+    with metrics.span('figures'):
+        heatmap = figures.compact_figure(figures.sensitivity_figure(
+            grid['return_rates'],
+            grid['savings_rates'],
+            grid['years_of_retirement_covered'][:, :, baseline[2]],
+            int(grid['retirement_ages'][baseline[2]]),
         ))
+    with metrics.span('encode'):
+        body = figures.dumps({'heatmap': heatmap, 'grid': grid, 'baseline_index': baseline})
+    return Response(body, mimetype='application/json')
+
+@bp.route('/scenarios', methods=['POST'])
+def save_scenarios():
+    """Save one profile, or ``{"scenarios": [...]}`` in one transaction, with optional ``user_id`` and ``name``."""
+    data = request.get_json()
+    if isinstance(data, dict) and 'scenarios' in data:
+        entries = data['scenarios']
+        user_profiles = parse_user_profiles(entries, 'scenarios')
+        field = 'scenarios'
+    else:
+        entries = [data]
+        user_profiles = [parse_user_profile(data)]
+        field = None
+    names = [entry.get('name') for entry in entries]
+    parse_scenario_labels(data.get('user_id'), names, field)
+    ids = current_app.extensions['scenarios'].save_many(user_profiles, data.get('user_id'), names, _assumptions(data))
+    return jsonify({'ids': ids}), 201
+
+@bp.route('/scenarios')
+def list_scenarios():
+    """Summaries of saved scenarios, newest first, filtered by ``user_id``, ``risk_level``, ``since`` and ``until``."""
+    args = request.args
+    scenarios = current_app.extensions['scenarios'].list(
+        user_id=args.get('user_id'),
+        risk_level=args.get('risk_level'),
+        since=args.get('since', type=float),
+        until=args.get('until', type=float),
+        limit=args.get('limit', DEFAULT_LIST_LIMIT, type=int),
+    )
+    return jsonify({'scenarios': scenarios})
+
+@bp.route('/scenarios/<int:scenario_id>')
+def get_scenario(scenario_id):
+    scenarios = current_app.extensions['scenarios'].get_many([scenario_id])
+    if not scenarios:
+        return jsonify({'error': f'Scenario {scenario_id} not found'}), 404
+    return Response(figures.dumps(scenarios[0]), mimetype='application/json')
+
+@bp.route('/scenarios/compare')
+def compare_scenarios():
+    """Overlay the stored retirement curves of ``?ids=1,2,3`` without recomputing them."""
+    try:
+        ids = [int(scenario_id) for scenario_id in request.args.get('ids', '').split(',') if scenario_id]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of scenario IDs'}), 400
+    scenarios = current_app.extensions['scenarios'].get_many(ids)
+    missing = sorted(set(ids) - {scenario['id'] for scenario in scenarios})
+    if missing:
+        return jsonify({'error': f'Scenarios not found: {missing}'}), 404
+    body = {
+        'figure': figures.compact_figure(figures.comparison_figure(scenarios)),
+        'scenarios': [
+            {key: value for key, value in scenario.items() if key not in ('ages', 'curve')}
+            for scenario in scenarios
+        ],
+    }
+    return Response(figures.dumps(body), mimetype='application/json')
+
+def prepare_chat(app, data, conversation_id):
+    """Validate a /chat body and build its prompt.
+
+    Shared by the Flask view and the ASGI handler (``financial_planner.asgi``).
+    ``conversation_id`` is the cookie value, if any. Returns ``(messages,
+    user_message, conversation_id, new_conversation)``; a new ID is issued
+    when the cookie is missing or invalid.
+    """
+    if not data:
+        raise ValueError("No data received")
         
-        fig3.update_layout(
-            title='Required Monthly Savings by Financial Goal',
-            title_x=0.5,
-            template='plotly_dark',
-            plot_bgcolor='rgba(0,0,0,0)',
-        )
+    user_message = data.get('message', '')
+    if not user_message:
+        raise ValueError("No message received")
+    # Sent in full and stored in the history, so it must fit the prompt budget
+    if not isinstance(user_message, str) or len(user_message) > MAX_MESSAGE_TOKENS * 4:
+        raise ChatMessageError([{
+            'field': 'message', 'message': f'must be text of at most {MAX_MESSAGE_TOKENS * 4:,} characters',
+        }])
         
-        plots['monthly'] = json.loads(fig3.to_json())
+    # Form data is validated before any history, context or OpenAI work
+    financial_data = data.get('financialData')
+    user_profile = parse_user_profile(financial_data, prefix='financialData.') if financial_data else None
+    assumptions = app.extensions['assumptions'].resolve(data.get('assumptions'))
+    
+    # Load the bounded history for this browser's conversation, starting one if needed
+    new_conversation = not is_valid_conversation_id(conversation_id)
+    if new_conversation:
+        conversation_id = new_conversation_id()
+    with metrics.span('history'):
+        history = app.extensions['conversations'].history(conversation_id)
     
-    return plots
+    # Use the context stored by /calculate; rebuild it from the form data only if it is gone
+    with metrics.span('context'):
+        context = ""
+        context_store = app.extensions['context_store']
+        stored = context_store.get(data['contextId']) if context_store is not None and data.get('contextId') else None
+        if stored is not None and decode_context(stored) is not None:
+            context = render_chat_context(decode_context(stored))
+        elif user_profile is not None:
+            projection = project_profile(user_profile, assumptions=assumptions)
+            context = render_chat_context(build_chat_context(user_profile, projection, assumptions))
+    
+    # Prepare the conversation for GPT within the prompt token budget
+    with metrics.span('prompt'):
+        messages = build_chat_messages(context, history, user_message)
+    return messages, user_message, conversation_id, new_conversation
+
+def record_chat_turn(app, conversation_id, user_message, assistant_message):
+    app.extensions['conversations'].append(
+        conversation_id,
+        {"role": "user", "content": user_message},
+        {"role": "assistant", "content": assistant_message},
+    )
+
+def chat_error(e):
+    """The /chat response body for a failed request; ``chat_error_status`` gives its status code."""
+    error_msg = str(e)
+    print(f"Chat Error: {error_msg}")
+    if isinstance(e, ChatMessageError):
+        return {
+            "response": f"Your message could not be sent: {error_msg}. Please shorten it and try again.",
+            "success": False,
+            "error": error_msg,
+            "errors": e.errors,
+        }
+    if isinstance(e, ProfileError):
+        return {
+            "response": f"Some of your financial details are invalid: {error_msg}. Please correct them and try again.",
+            "success": False,
+            "error": error_msg,
+            "errors": e.errors,
+        }
+    return {
+        "response": f"I apologize, but I encountered an error: {error_msg}. Please make sure you have set up your OpenAI API key and try again.",
+        "success": False,
+        "error": error_msg
+    }
+
+def chat_error_status(e):
+    # Upstream failures keep the historical 200 so the widget shows the apology
+    return 400 if isinstance(e, ProfileError) else 200
 
-@app.route('/chat', methods=['POST'])
+@bp.route('/chat', methods=['POST'])
 def chat():
     try:
+        app = current_app._get_current_object()
         data = request.get_json()
-        if not data:
-            raise ValueError("No data received")
-            
-        user_message = data.get('message', '')
-        if not user_message:
-            raise ValueError("No message received")
-            
-        financial_data = data.get('financialData', {})
-        
-        # Initialize or get chat history
-        if 'chat_history' not in session:
-            session['chat_history'] = []
-        
-        # Prepare context from financial data
-        context = ""
-        if financial_data:
-            try:
-                # Calculate key financial metrics
-                current_age = financial_data.get('age')
-                retirement_age = financial_data.get('retirement_age')
-                current_savings = float(financial_data.get('current_savings', 0))
-                annual_income = float(financial_data.get('annual_income', 0))
-                years_to_retirement = retirement_age - current_age
-                
-                # Investment and savings calculations
-                annual_return_rate = 0.06
-                savings_rate = 0.15
-                annual_savings = annual_income * savings_rate
-                monthly_retirement_savings = annual_savings / 12
-                
-                # Project retirement savings
-                final_savings = current_savings
-                for _ in range(years_to_retirement):
-                    final_savings = final_savings * (1 + annual_return_rate) + annual_savings
-                
-                # Education planning calculations
-                children = financial_data.get('children', [])
-                education_costs = []
-                college_start_age = 18
-                estimated_annual_college_cost = 35000
-                college_inflation_rate = 0.05
-                
-                for child in children:
-                    years_to_college = college_start_age - child['age']
-                    future_cost = estimated_annual_college_cost * 4 * (1 + college_inflation_rate) ** years_to_college
-                    monthly_required = future_cost / (years_to_college * 12) if years_to_college > 0 else future_cost / 12
-                    education_costs.append({
-                        'age': child['age'],
-                        'years_to_college': years_to_college,
-                        'total_cost': future_cost,
-                        'monthly_savings_needed': monthly_required
-                    })
-                
-                # Monthly expenses in retirement (80% of current income)
-                monthly_expenses_in_retirement = (annual_income * 0.8) / 12
-                years_of_retirement_covered = final_savings / (monthly_expenses_in_retirement * 12)
-                
-                context = f"""
-                Financial Context:
-                Personal Information:
-                - Current Age: {current_age}
-                - Annual Income: ${annual_income:,.2f}
-                - Current Savings: ${current_savings:,.2f}
-                - Target Retirement Age: {retirement_age}
-                - Years until retirement: {years_to_retirement}
-                
-                Retirement Planning:
-                - Projected retirement savings: ${final_savings:,.2f}
-                - Years of retirement covered: {years_of_retirement_covered:.1f}
-                - Monthly retirement savings needed: ${monthly_retirement_savings:,.2f}
-                - Expected monthly expenses in retirement: ${monthly_expenses_in_retirement:,.2f}
-                - Assumed annual return rate: {annual_return_rate*100}%
-                - Current savings rate: {savings_rate*100}%
-                
-                Education Planning:
-                - Number of Children: {len(children)}
-                {chr(10).join([f'- Child {i+1}: Age {cost["age"]}, Years to college: {cost["years_to_college"]}, Total cost: ${cost["total_cost"]:,.2f}, Monthly savings needed: ${cost["monthly_savings_needed"]:,.2f}' for i, cost in enumerate(education_costs)])}
-                
-                Risk Assessment:
-                - {"HIGH" if years_of_retirement_covered < 20 else "MODERATE" if years_of_retirement_covered < 25 else "LOW"} retirement risk
-                - {"HIGH" if monthly_retirement_savings > annual_income/24 else "MODERATE" if monthly_retirement_savings > annual_income/36 else "LOW"} monthly savings burden
-                """
-            except (TypeError, ValueError) as e:
-                print(f"Error formatting financial data: {str(e)}")
-                context = "Financial data available but could not be formatted."
+        messages, user_message, conversation_id, new_conversation = prepare_chat(
+            app, data, request.cookies.get(CONVERSATION_COOKIE)
+        )
         
-        # Prepare the conversation for GPT
-        messages = [
-            {"role": "system", "content": f"""You are an expert financial planning assistant. 
-            Use this detailed context about the user's financial situation to provide specific, data-driven advice:
-            {context}
-            
-            Important guidelines:
-            1. Reference specific numbers from the context when giving advice
-            2. Explain the reasoning behind your recommendations
-            3. Consider both retirement and education planning in your answers
-            4. Highlight any risks identified in the financial analysis
-            5. Provide actionable steps with clear numbers and timeframes
-            6. Format all monetary values as $1,234.56
-            7. Consider the user's current age, income, and savings rate in your advice
-            8. If relevant, discuss both short-term and long-term implications
-            9. Provide specific savings targets when applicable
-            10. Acknowledge both retirement and education goals in your planning"""},
-            *[{"role": msg["role"], "content": msg["content"]} for msg in session['chat_history'][-5:]],
-            {"role": "user", "content": user_message}
-        ]
+        def record_turn(assistant_message):
+            record_chat_turn(app, conversation_id, user_message, assistant_message)
         
-        # Get response from OpenAI
-        assistant_message, error = get_openai_response(messages)
+        # Stream the reply as Server-Sent Events when the client asks for it
+        if data.get('stream'):
+            # The history lives server-side, so the turn is recorded once the reply has streamed
+            response = Response(
+                stream_with_context(_stream_chat(messages, app.extensions['chat_cache'], record_turn)),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
+            return _with_conversation_cookie(response, conversation_id, new_conversation)
         
-        if error:
-            print(f"OpenAI API Error: {error}")
-            raise Exception(error)
-            
-        if not assistant_message:
-            raise Exception("No response received from OpenAI")
+        # Get response from OpenAI, sharing cached or in-flight replies to the same prompt
+        chat_cache = app.extensions['chat_cache']
+        with metrics.span('reply'):
+            if chat_cache is not None:
+                reply, cache_status = chat_cache.get_or_compute(chat_cache_key(messages), lambda: _complete(messages))
+            else:
+                reply, cache_status = _complete(messages), 'MISS'
+        assistant_message = reply.decode()
         
         # Update chat history
-        session['chat_history'].extend([
-            {"role": "user", "content": user_message},
-            {"role": "assistant", "content": assistant_message}
-        ])
+        record_turn(assistant_message)
         
-        return jsonify({
+        response = jsonify({
             "response": assistant_message,
             "success": True
         })
+        response.headers['X-Cache'] = cache_status
+        return _with_conversation_cookie(response, conversation_id, new_conversation)
         
     except Exception as e:
-        error_msg = str(e)
-        print(f"Chat Error: {error_msg}")
-        return jsonify({
-            "response": f"I apologize, but I encountered an error: {error_msg}. Please make sure you have set up your OpenAI API key and try again.",
-            "success": False,
-            "error": error_msg
-        })
+        return jsonify(chat_error(e)), chat_error_status(e)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,332 @@
+"""ASGI serving mode: ``uvicorn financial_planner.asgi:app``.
+
+Under the WSGI server every request holds a worker thread until it finishes,
+so slow OpenAI calls in /chat block the threads that fast /calculate
+requests need. Here ``/chat`` is handled natively on the event loop. Its
+preparation (history, context, prompt) and the history write run in a
+worker thread, but the OpenAI call itself is awaited and holds no thread.
+
+Every other route is served by the Flask app through a small WSGI bridge
+running in worker threads:
+
+- The CPU-bound routes (``CPU_BOUND_PATHS``) run in a pool of
+  ``CALCULATE_WORKERS`` threads. At most ``CALCULATE_QUEUE_SIZE`` more
+  requests may wait for it, and beyond that the server answers 503 with
+  ``Retry-After`` instead of queueing without bound.
+- The remaining routes run in a separate pool, so slow pages and cache
+  lookups never wait behind projections.
+
+Request bodies longer than ``MAX_BODY_BYTES`` are refused with 413 before
+they are read into memory. Identical chats in flight share one upstream
+call; the followers await it on the event loop (``ResultCache.wait_async``).
+
+Only the standard library is used; any ASGI server can run ``app``.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.http import dump_cookie, parse_cookie
+
+from financial_planner import metrics
+from financial_planner.app import (
+    CONVERSATION_COOKIE_MAX_AGE,
+    SSE_HEADERS,
+    _sse,
+    chat_error,
+    chat_error_status,
+    create_app,
+    prepare_chat,
+    record_chat_turn,
+)
+from financial_planner.conversations import CONVERSATION_COOKIE
+from financial_planner.llm import chat_cache_key, get_openai_response_async, stream_openai_response_async
+
+CALCULATE_WORKERS = int(os.getenv('CALCULATE_WORKERS', os.cpu_count() or 1))
+CALCULATE_QUEUE_SIZE = int(os.getenv('CALCULATE_QUEUE_SIZE', 4 * CALCULATE_WORKERS))
+IO_WORKERS = int(os.getenv('ASGI_IO_WORKERS', 16))
+# Largest request body read into memory; over 100,000 profiles for /calculate/batch
+MAX_BODY_BYTES = int(os.getenv('ASGI_MAX_BODY_BYTES', 16 * 1024 * 1024))
+
+CPU_BOUND_PATHS = frozenset(('/calculate', '/calculate/batch', '/solve', '/sensitivity'))
+
+
+class BodyTooLarge(Exception):
+    """The request body is longer than ``MAX_BODY_BYTES``."""
+
+
+async def _read_body(receive, scope, max_bytes=MAX_BODY_BYTES):
+    """The complete request body; raises ``BodyTooLarge`` as soon as it is known to exceed ``max_bytes``."""
+    declared = _header(scope, b'content-length')
+    if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+        raise BodyTooLarge
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ConnectionError("Client disconnected before sending the request body")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > max_bytes:
+            raise BodyTooLarge
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+def _too_large(max_bytes):
+    return json.dumps({'error': f'Request body is larger than {max_bytes:,} bytes'}).encode()
+
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+async def _send_response(send, status, body, headers=()):
+    headers = [*headers, ('Content-Length', str(len(body)))]
+    await send({'type': 'http.response.start', 'status': status, 'headers': _encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def wsgi_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP ``scope`` and its complete request body."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class PlannerASGI:
+    """ASGI application serving /chat natively and the other routes through ``flask_app``."""
+
+    def __init__(self, flask_app, calculate_workers=CALCULATE_WORKERS, calculate_queue_size=CALCULATE_QUEUE_SIZE,
+                 io_workers=IO_WORKERS, max_body_bytes=MAX_BODY_BYTES):
+        self.flask_app = flask_app
+        self.max_body_bytes = max_body_bytes
+        self.calculate_pool = ThreadPoolExecutor(calculate_workers, thread_name_prefix='calculate')
+        self.io_pool = ThreadPoolExecutor(io_workers, thread_name_prefix='wsgi')
+        self.max_calculate_requests = calculate_workers + calculate_queue_size
+        # Only touched on the event loop thread, so no lock is needed
+        self.calculate_requests = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+        elif scope['path'] == '/chat' and scope['method'] == 'POST':
+            await self._chat(scope, receive, send)
+        elif scope['path'] in CPU_BOUND_PATHS:
+            if self.calculate_requests >= self.max_calculate_requests:
+                body = json.dumps({'error': 'Server is busy, please retry shortly'}).encode()
+                await _send_response(send, 503, body, [('Content-Type', 'application/json'), ('Retry-After', '1')])
+                return
+            self.calculate_requests += 1
+            try:
+                await self._call_wsgi(scope, receive, send, self.calculate_pool)
+            finally:
+                self.calculate_requests -= 1
+        else:
+            await self._call_wsgi(scope, receive, send, self.io_pool)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.calculate_pool.shutdown(wait=False, cancel_futures=True)
+                self.io_pool.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _call_wsgi(self, scope, receive, send, executor):
+        """Run the Flask app for one request in ``executor``, relaying the body as it is produced."""
+        try:
+            body = await _read_body(receive, scope, self.max_body_bytes)
+        except BodyTooLarge:
+            await _send_response(send, 413, _too_large(self.max_body_bytes), [('Content-Type', 'application/json')])
+            return
+        environ = wsgi_environ(scope, body)
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['start'] = {
+                    'type': 'http.response.start',
+                    'status': int(status.split(' ', 1)[0]),
+                    'headers': _encode_headers(headers),
+                }
+
+            result = self.flask_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if 'start' in response:
+                        send_from_thread(response.pop('start'))
+                    if chunk:
+                        send_from_thread({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                if 'start' in response:
+                    send_from_thread(response.pop('start'))
+                send_from_thread({'type': 'http.response.body', 'body': b''})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        await loop.run_in_executor(executor, run)
+
+    async def _chat(self, scope, receive, send):
+        trace_start = metrics.start_trace()
+        cookie = parse_cookie(_header(scope, b'cookie') or '').get(CONVERSATION_COOKIE)
+        try:
+            data = json.loads(await _read_body(receive, scope, self.max_body_bytes) or b'null')
+            messages, user_message, conversation_id, new_conversation = await asyncio.to_thread(
+                prepare_chat, self.flask_app, data, cookie
+            )
+        except BodyTooLarge:
+            await self._finish_chat(send, trace_start, _too_large(self.max_body_bytes), status=413)
+            return
+        except Exception as e:
+            await self._finish_chat(send, trace_start, json.dumps(chat_error(e)).encode(), status=chat_error_status(e))
+            return
+
+        headers = []
+        if new_conversation:
+            headers.append(('Set-Cookie', dump_cookie(
+                CONVERSATION_COOKIE, conversation_id, max_age=CONVERSATION_COOKIE_MAX_AGE,
+                httponly=True, samesite='Lax',
+            )))
+
+        async def record_turn(assistant_message):
+            await asyncio.to_thread(record_chat_turn, self.flask_app, conversation_id, user_message, assistant_message)
+
+        chat_cache = self.flask_app.extensions['chat_cache']
+        if data.get('stream'):
+            headers.extend([('Content-Type', 'text/event-stream'), *SSE_HEADERS.items()])
+            if trace_start is not None:
+                metrics.finish_trace(trace_start, '/chat', 'POST', 200)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': _encode_headers(headers)})
+            async for frame in _stream_chat_async(messages, chat_cache, record_turn):
+                await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        try:
+            with metrics.span('reply'):
+                if chat_cache is not None:
+                    reply, cache_status = await chat_cache.get_or_compute_async(
+                        chat_cache_key(messages), lambda: _complete_async(messages)
+                    )
+                else:
+                    reply, cache_status = await _complete_async(messages), 'MISS'
+            assistant_message = reply.decode()
+            await record_turn(assistant_message)
+        except Exception as e:
+            await self._finish_chat(send, trace_start, json.dumps(chat_error(e)).encode(), headers)
+            return
+        body = json.dumps({"response": assistant_message, "success": True}).encode()
+        await self._finish_chat(send, trace_start, body, [*headers, ('X-Cache', cache_status)])
+
+    async def _finish_chat(self, send, trace_start, body, headers=(), status=200):
+        headers = [('Content-Type', 'application/json'), *headers]
+        if trace_start is not None:
+            spans = metrics.finish_trace(trace_start, '/chat', 'POST', status)
+            if spans:
+                headers.append(('Server-Timing', metrics.server_timing(spans)))
+        await _send_response(send, status, body, headers)
+
+
+async def _complete_async(messages):
+    """``app._complete`` awaited on the event loop."""
+    assistant_message, error = await get_openai_response_async(messages)
+    if error:
+        raise Exception(error)
+    if not assistant_message:
+        raise Exception("No response received from OpenAI")
+    return assistant_message.encode()
+
+
+async def _stream_chat_async(messages, chat_cache=None, on_reply=None):
+    """``app._stream_chat`` as an async generator; ``on_reply`` is a coroutine function."""
+    try:
+        reply = None
+        flight = key = None
+        if chat_cache is not None:
+            key = chat_cache_key(messages)
+            reply = chat_cache.get(key)
+            if reply is None:
+                flight, is_leader = chat_cache.claim(key)
+                if not is_leader:
+                    reply = await chat_cache.wait_async(flight)
+                    flight = None
+        if reply is not None:
+            yield _sse({"delta": reply.decode()})
+        else:
+            start = time.perf_counter()
+            parts = []
+            try:
+                async for delta in stream_openai_response_async(messages):
+                    parts.append(delta)
+                    yield _sse({"delta": delta})
+            except BaseException as e:
+                # Also reached when the client disconnects; waiters must not hang
+                if flight is not None:
+                    error = e if isinstance(e, Exception) else RuntimeError("Reply stream was interrupted")
+                    chat_cache.complete(key, flight, error=error)
+                raise
+            reply = ''.join(parts).encode()
+            if flight is not None:
+                chat_cache.complete(key, flight, reply, time.perf_counter() - start)
+        if on_reply is not None:
+            await on_reply(reply.decode())
+        yield _sse({"success": True}, event="done")
+    except Exception as e:
+        print(f"Chat Error: {str(e)}")
+        yield _sse({"success": False, "error": str(e)}, event="error")
+
+
+def create_asgi_app():
+    return PlannerASGI(create_app())
+
+
+app = create_asgi_app()
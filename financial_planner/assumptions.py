@@ -0,0 +1,249 @@
+"""Model assumptions: named, versioned sets and their precomputed growth tables.
+
+Every projection depends on a handful of constants (return rate, savings
+rate, college cost and inflation, retirement spending). The built-in values
+below form the ``default`` set. An ``AssumptionRegistry`` adds named sets
+from a JSON file (``ASSUMPTIONS_FILE``), for example::
+
+    {"default": {"annual_return_rate": 0.05}, "conservative": {"annual_return_rate": 0.04, "inflation_rate": 0.03}}
+
+Each set lists only what differs from the built-in values. A request picks
+a set by name or overrides single values (``{"annual_return_rate": 0.05}``,
+optionally with a ``base`` set name). Editing the file is picked up on the
+next request. A set whose values changed gets the next ``version``.
+
+Results are cached under a set's ``digest``, a hash of its values, so
+changing one set only misses the cached results computed with it. Growth
+factors ``(1 + r) ** n`` and annuity factors for every horizon from 0 to
+``TABLE_YEARS`` years are built once per rate and shared by every set with
+that rate. A changed rate builds its own tables, and the tables of the
+rates that did not change are reused. Projections slice or index these
+tables instead of raising to a power on every call.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+from financial_planner.cache import cache_key
+
+ANNUAL_RETURN_RATE = 0.06
+SAVINGS_RATE = 0.15
+COLLEGE_START_AGE = 18
+ESTIMATED_ANNUAL_COLLEGE_COST = 35000
+COLLEGE_INFLATION_RATE = 0.05
+RETIREMENT_EXPENSE_RATIO = 0.8
+INFLATION_RATE = 0.025
+LIFE_EXPECTANCY = 95
+COLLEGE_YEARS = 4
+
+# The model constants a set can change; results depend on these as much as on the profile.
+# LIFE_EXPECTANCY is fixed, since profile validation bounds every age by it.
+ASSUMPTIONS = {
+    'annual_return_rate': ANNUAL_RETURN_RATE,
+    'savings_rate': SAVINGS_RATE,
+    'college_start_age': COLLEGE_START_AGE,
+    'estimated_annual_college_cost': ESTIMATED_ANNUAL_COLLEGE_COST,
+    'college_inflation_rate': COLLEGE_INFLATION_RATE,
+    'retirement_expense_ratio': RETIREMENT_EXPENSE_RATIO,
+    'inflation_rate': INFLATION_RATE,
+}
+
+# Rates that compound, and so get growth tables
+RATE_FIELDS = ('annual_return_rate', 'college_inflation_rate', 'inflation_rate')
+
+# Longer than any ledger: age 18 to LIFE_EXPECTANCY, plus a year past a late retirement
+TABLE_YEARS = 100
+
+DEFAULT_SET = 'default'
+# Per-request override sets kept, with their digests, for reuse by later requests
+MAX_CUSTOM_SETS = 64
+
+
+@lru_cache(maxsize=256)
+def growth_table(rate, steps_per_year=1):
+    """Read-only ``(1 + rate) ** (k / steps_per_year)`` for k = 0 .. ``TABLE_YEARS * steps_per_year``."""
+    step = (1 + rate) ** (1 / steps_per_year)
+    table = step ** np.arange(TABLE_YEARS * steps_per_year + 1)
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=256)
+def annuity_table(rate):
+    """Read-only value after n = 0 .. ``TABLE_YEARS`` years of a payment of 1 at each year end."""
+    if rate == 0:
+        table = np.arange(TABLE_YEARS + 1, dtype=float)
+    else:
+        table = (growth_table(rate) - 1) / rate
+    table.setflags(write=False)
+    return table
+
+
+def growth_factors(rate, count, steps_per_year=1):
+    """The first ``count`` growth factors of ``growth_table``, computed directly past its end."""
+    table = growth_table(float(rate), steps_per_year)
+    if count <= len(table):
+        return table[:count]
+    return ((1 + rate) ** (1 / steps_per_year)) ** np.arange(count)
+
+
+def annuity_factors(rate, years):
+    """Annuity factors for ``years`` (an integer or an array of them, each zero or more)."""
+    table = annuity_table(float(rate))
+    years = np.asarray(years)
+    if years.size and years.max() >= len(table):
+        if rate == 0:
+            return years.astype(float)
+        return ((1 + rate) ** years - 1) / rate
+    return table[years]
+
+
+class AssumptionSet:
+    """One version of a named set of assumptions; attributes mirror the ``ASSUMPTIONS`` keys."""
+
+    def __init__(self, name, values, version=1):
+        self.name = name
+        self.version = version
+        self.values = dict(values)
+        self.digest = cache_key('assumptions', self.values)
+        self.annual_return_rate = values['annual_return_rate']
+        self.savings_rate = values['savings_rate']
+        self.college_start_age = values['college_start_age']
+        self.estimated_annual_college_cost = values['estimated_annual_college_cost']
+        self.college_inflation_rate = values['college_inflation_rate']
+        self.retirement_expense_ratio = values['retirement_expense_ratio']
+        self.inflation_rate = values['inflation_rate']
+
+    def warm(self):
+        """Build the yearly growth and annuity tables of this set's rates ahead of the first request."""
+        for field in RATE_FIELDS:
+            growth_table(float(self.values[field]))
+        annuity_table(float(self.annual_return_rate))
+
+    def describe(self):
+        return {'name': self.name, 'version': self.version, 'digest': self.digest, 'values': self.values}
+
+
+DEFAULT_ASSUMPTIONS = AssumptionSet(DEFAULT_SET, ASSUMPTIONS)
+
+
+class AssumptionRegistry:
+    """Named assumption sets, optionally loaded from a JSON file and reloaded when it changes."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._sets = {DEFAULT_SET: DEFAULT_ASSUMPTIONS}
+        self._custom = OrderedDict()
+        self._mtime = None
+        self._lock = threading.Lock()
+        DEFAULT_ASSUMPTIONS.warm()
+        if path:
+            self.load(path)
+
+    def register(self, name, overrides):
+        """Set ``name`` to the built-in values plus validated ``overrides``; return the new set.
+
+        Re-registering the same values keeps the current version.
+        """
+        values = {**ASSUMPTIONS, **overrides}
+        with self._lock:
+            current = self._sets.get(name)
+            if current is not None and current.values == values:
+                return current
+            assumptions = AssumptionSet(name, values, current.version + 1 if current is not None else 1)
+            self._sets[name] = assumptions
+        assumptions.warm()
+        return assumptions
+
+    def load(self, path):
+        """Replace the named sets with those in the JSON file at ``path``.
+
+        Raises ``AssumptionsError`` if the file is invalid; sets left out of
+        it are dropped, and ``default`` falls back to the built-in values.
+        """
+        # validation imports the built-in values from this module
+        from financial_planner.validation import AssumptionsError, parse_assumption_sets
+        mtime = os.stat(path).st_mtime_ns
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except ValueError as e:
+            raise AssumptionsError([{'field': path, 'message': f'is not valid JSON ({e})'}])
+        sets = parse_assumption_sets(data)
+        sets.setdefault(DEFAULT_SET, {})
+        for name, overrides in sets.items():
+            self.register(name, overrides)
+        with self._lock:
+            for name in set(self._sets) - set(sets):
+                del self._sets[name]
+            self._mtime = mtime
+
+    def refresh(self):
+        """Reload the file if it changed since it was last read; a broken edit keeps the current sets."""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            # Reported once per edit rather than on every request
+            self._mtime = mtime
+            self.load(self.path)
+        except (OSError, ValueError) as e:
+            print(f"Keeping the current assumption sets, could not reload {self.path}: {e}")
+
+    def get(self, name=DEFAULT_SET):
+        """The current version of the set called ``name``; raises ``AssumptionsError`` if unknown."""
+        assumptions = self._sets.get(name) if isinstance(name, str) else None
+        if assumptions is None:
+            from financial_planner.validation import AssumptionsError
+            raise AssumptionsError([{'field': 'assumptions', 'message': f'unknown assumption set {name!r}'}])
+        return assumptions
+
+    def resolve(self, spec=None):
+        """The set a request asks for: None (``default``), a set name, or an object of overrides.
+
+        An object may name its ``base`` set; other keys override that set's
+        values. Raises ``AssumptionsError`` for an unknown set or a bad value.
+        """
+        from financial_planner.validation import AssumptionsError, parse_assumptions
+        self.refresh()
+        if spec is None or isinstance(spec, str):
+            return self.get(DEFAULT_SET if spec is None else spec)
+        if not isinstance(spec, dict):
+            raise AssumptionsError([{'field': 'assumptions', 'message': 'must be a set name or an object'}])
+        base = self.get(spec.get('base', DEFAULT_SET))
+        overrides = parse_assumptions({key: value for key, value in spec.items() if key != 'base'})
+        if not overrides:
+            return base
+        return self.from_values({**base.values, **overrides})
+
+    def from_values(self, values):
+        """The named set with exactly ``values``, or an unnamed ``custom`` set reused by digest."""
+        digest = cache_key('assumptions', values)
+        with self._lock:
+            for assumptions in self._sets.values():
+                if assumptions.digest == digest:
+                    return assumptions
+            assumptions = self._custom.get(digest)
+            if assumptions is not None:
+                self._custom.move_to_end(digest)
+                return assumptions
+            assumptions = AssumptionSet('custom', values, version=0)
+            self._custom[digest] = assumptions
+            if len(self._custom) > MAX_CUSTOM_SETS:
+                self._custom.popitem(last=False)
+            return assumptions
+
+    def describe(self):
+        """Every named set's current version, digest and values."""
+        return {name: assumptions.describe() for name, assumptions in sorted(self._sets.items())}
+
+
+def create_assumption_registry():
+    """Build the registry from ASSUMPTIONS_FILE, if set; an unreadable or invalid file fails fast."""
+    return AssumptionRegistry(os.getenv('ASSUMPTIONS_FILE') or None)
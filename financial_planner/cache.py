@@ -0,0 +1,333 @@
+"""Memoizing caches for /calculate results and /chat replies.
+
+Entries are keyed on a canonical hash of everything the result depends on
+(for /calculate, the parsed user profile plus the model assumptions) and
+hold serialized bytes, so a hit skips both the work and the response
+encoding. Identical requests that arrive while the first is still being
+computed wait for its result instead of repeating the work. Two backends
+are provided:
+
+- ``MemoryBackend``: an in-process LRU, the default.
+- ``SQLiteBackend``: a file shared by every worker process on the host.
+
+Both expire entries after a TTL and evict least-recently-used entries once
+the entry count or total size limit is reached.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def cache_key(*parts):
+    """Return a stable hash for JSON-serializable parts, independent of dict ordering."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU store with TTL and entry/byte limits."""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return ``(value, cost, expired)``; value is None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, 0.0, False
+            value, cost, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None, 0.0, True
+            self._entries.move_to_end(key)
+            return value, cost, False
+
+    def set(self, key, value, cost=0.0):
+        """Store a value and return how many entries were evicted to make room."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, cost, time.monotonic() + self.ttl)
+            self._bytes += len(value)
+            evicted = 0
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size(self):
+        return len(self._entries), self._bytes
+
+    def _remove(self, key):
+        value = self._entries.pop(key)[0]
+        self._bytes -= len(value)
+
+
+class SQLiteBackend:
+    """LRU store in a SQLite file so several worker processes can share results."""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' key TEXT PRIMARY KEY, value BLOB NOT NULL, cost REAL NOT NULL,'
+                ' expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS results_accessed_at ON results (accessed_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, cost, expires_at FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None, 0.0, False
+            if row[2] < now:
+                conn.execute('DELETE FROM results WHERE key = ?', (key,))
+                return None, 0.0, True
+            conn.execute('UPDATE results SET accessed_at = ? WHERE key = ?', (now, key))
+            return bytes(row[0]), row[1], False
+
+    def set(self, key, value, cost=0.0):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO results (key, value, cost, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, value, cost, now + self.ttl, now),
+            )
+            conn.execute('DELETE FROM results WHERE expires_at < ?', (now,))
+            evicted = 0
+            count, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM results').fetchone()
+            while count > 1 and (count > self.max_entries or total > self.max_bytes):
+                oldest = conn.execute(
+                    'SELECT key, LENGTH(value) FROM results ORDER BY accessed_at LIMIT 1'
+                ).fetchone()
+                conn.execute('DELETE FROM results WHERE key = ?', (oldest[0],))
+                count -= 1
+                total -= oldest[1]
+                evicted += 1
+            return evicted
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM results')
+
+    def size(self):
+        with self._connect() as conn:
+            return tuple(conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM results').fetchone())
+
+
+class _Flight:
+    """A computation in progress that identical requests can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.cost = 0.0
+        self.error = None
+        # (loop, future) of each ``wait_async`` caller, resolved when the flight completes
+        self.futures = []
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ResultCache:
+    """Counts hits, misses, coalesced requests and evictions around a storage backend.
+
+    ``saved_seconds`` adds up the original compute time of every result
+    served from the cache or shared with a coalesced request.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = self.misses = self.coalesced = self.expirations = self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key):
+        value, cost, expired = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                self.expirations += expired
+            else:
+                self.hits += 1
+                self.saved_seconds += cost
+        return value
+
+    def set(self, key, value, cost=0.0):
+        evicted = self.backend.set(key, value, cost)
+        with self._lock:
+            self.evictions += evicted
+
+    def claim(self, key):
+        """Register interest in computing ``key``; return ``(flight, is_leader)``.
+
+        The leader must compute the value and call ``complete``; everyone
+        else should ``wait`` on the returned flight.
+        """
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                return flight, False
+            flight = self._inflight[key] = _Flight()
+            return flight, True
+
+    def complete(self, key, flight, value=None, cost=0.0, error=None):
+        """Publish the leader's result (cached unless it failed) and wake any waiters."""
+        flight.value, flight.cost, flight.error = value, cost, error
+        if error is None and value:
+            self.set(key, value, cost)
+        with self._lock:
+            del self._inflight[key]
+            flight.done.set()
+            futures, flight.futures = flight.futures, []
+        for loop, future in futures:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # The waiter's loop has closed, so nobody is left to wake
+                pass
+
+    def wait(self, flight):
+        """Block until a leader completes and return its value, re-raising its error."""
+        flight.done.wait()
+        return self._shared(flight)
+
+    async def wait_async(self, flight):
+        """``wait`` on the event loop: awaits a future the leader resolves, holding no thread."""
+        with self._lock:
+            future = None
+            if not flight.done.is_set():
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                flight.futures.append((loop, future))
+        if future is not None:
+            await future
+        return self._shared(flight)
+
+    def _shared(self, flight):
+        if flight.error is not None:
+            raise flight.error
+        with self._lock:
+            self.coalesced += 1
+            self.saved_seconds += flight.cost
+        return flight.value
+
+    def get_or_compute(self, key, compute):
+        """Return ``(value, status)`` where status is 'HIT', 'MISS' or 'COALESCED'."""
+        value = self.get(key)
+        if value is not None:
+            return value, 'HIT'
+        flight, is_leader = self.claim(key)
+        if not is_leader:
+            return self.wait(flight), 'COALESCED'
+        start = time.perf_counter()
+        try:
+            value = compute()
+        except Exception as e:
+            self.complete(key, flight, error=e)
+            raise
+        self.complete(key, flight, value, time.perf_counter() - start)
+        return value, 'MISS'
+
+    async def get_or_compute_async(self, key, compute):
+        """``get_or_compute`` for a coroutine function ``compute``.
+
+        Another request's computation is awaited with ``wait_async``, so
+        coalesced requests hold no thread.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, 'HIT'
+        flight, is_leader = self.claim(key)
+        if not is_leader:
+            return await self.wait_async(flight), 'COALESCED'
+        start = time.perf_counter()
+        try:
+            value = await compute()
+        except BaseException as e:
+            # Cancellation must also release the waiters
+            self.complete(key, flight, error=e if isinstance(e, Exception) else RuntimeError("Computation was cancelled"))
+            raise
+        self.complete(key, flight, value, time.perf_counter() - start)
+        return value, 'MISS'
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        entries, size_bytes = self.backend.size()
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'saved_seconds': self.saved_seconds,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': size_bytes,
+        }
+
+
+def create_result_cache(prefix='RESULT_CACHE', ttl=DEFAULT_TTL):
+    """Build a cache from ``<prefix>_*`` environment variables, or None if disabled.
+
+    ``<prefix>_BACKEND`` selects ``memory`` (default), ``sqlite`` or ``none``;
+    ``_PATH``, ``_TTL``, ``_MAX_ENTRIES`` and ``_MAX_BYTES`` tune it.
+    """
+    backend_name = os.getenv(f'{prefix}_BACKEND', 'memory').lower()
+    options = {
+        'ttl': float(os.getenv(f'{prefix}_TTL', ttl)),
+        'max_entries': int(os.getenv(f'{prefix}_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        'max_bytes': int(os.getenv(f'{prefix}_MAX_BYTES', DEFAULT_MAX_BYTES)),
+    }
+    if backend_name == 'none':
+        return None
+    if backend_name == 'sqlite':
+        return ResultCache(SQLiteBackend(os.getenv(f'{prefix}_PATH', f'{prefix.lower()}.sqlite3'), **options))
+    if backend_name == 'memory':
+        return ResultCache(MemoryBackend(**options))
+    raise ValueError(f"Unknown {prefix}_BACKEND: {backend_name}")
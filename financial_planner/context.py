@@ -0,0 +1,143 @@
+"""Compact chat context and token-budgeted prompt building for /chat.
+
+``/calculate`` distills each profile into a small versioned context dict,
+stores it server-side under a ``context_id`` and returns the ID. ``/chat``
+loads the stored context instead of re-deriving the projection from the
+posted form data on every message, renders it as a few dense lines and
+fits the conversation history into a fixed prompt token budget.
+"""
+import json
+import os
+
+from financial_planner.cache import cache_key
+from financial_planner.projection import DEFAULT_ASSUMPTIONS, LIFE_EXPECTANCY
+
+# Bump when the context fields or their rendering change; old stored contexts are then ignored
+CONTEXT_VERSION = 3
+CONTEXT_TTL = 24 * 3600
+
+PROMPT_TOKEN_BUDGET = int(os.getenv('CHAT_PROMPT_TOKENS', 1500))
+# Room kept for the one-line digest of history that no longer fits
+HISTORY_SUMMARY_TOKENS = 80
+# Longest user message; the rest of the budget holds the system prompt, the context and history
+MAX_MESSAGE_TOKENS = PROMPT_TOKEN_BUDGET // 3
+
+SYSTEM_PROMPT = (
+    "You are an expert financial planning assistant. Give specific, data-driven advice "
+    "based on the user's numbers below: cite figures, explain your reasoning, cover both "
+    "retirement and education goals, flag the risks shown, and give actionable steps with "
+    "amounts and timeframes. Format money as $1,234.56."
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def context_id_for(user_profile, assumptions=DEFAULT_ASSUMPTIONS):
+    """Deterministic ID, so cached /calculate responses stay valid for the stored context."""
+    return cache_key('chat-context', CONTEXT_VERSION, user_profile, assumptions.digest)
+
+
+def build_chat_context(user_profile, projection, assumptions=DEFAULT_ASSUMPTIONS):
+    """Distill a profile and its projection (under ``assumptions``) into the compact dict stored for /chat."""
+    return {
+        'version': CONTEXT_VERSION,
+        'age': user_profile['age'],
+        'retirement_age': user_profile['retirement_age'],
+        'annual_income': user_profile['annual_income'],
+        'current_savings': user_profile['current_savings'],
+        'years_to_retirement': projection['years_to_retirement'],
+        'final_savings': projection['final_savings'],
+        'years_covered': projection['years_of_retirement_covered'],
+        'monthly_retirement': projection['monthly_retirement'],
+        'monthly_expenses': projection['monthly_expenses_in_retirement'],
+        'depletion_age': projection['depletion_age'],
+        'savings_rate': assumptions.savings_rate,
+        'return_rate': assumptions.annual_return_rate,
+        # One [age, years to college, total cost, monthly savings needed] row per child
+        'children': [
+            [child['age'], int(years), float(cost), float(monthly)]
+            for child, years, cost, monthly in zip(
+                user_profile['children'],
+                projection['years_to_college'],
+                projection['projected_costs'],
+                projection['college_monthly'],
+            )
+        ],
+    }
+
+
+def render_chat_context(context):
+    """Render a stored context as the dense text block placed in the system prompt."""
+    income = context['annual_income']
+    years_covered = context['years_covered']
+    monthly_retirement = context['monthly_retirement']
+    retirement_risk = "HIGH" if years_covered < 20 else "MODERATE" if years_covered < 25 else "LOW"
+    burden = "HIGH" if monthly_retirement > income/24 else "MODERATE" if monthly_retirement > income/36 else "LOW"
+
+    lines = [
+        f"Profile: age {context['age']}, income ${income:,.2f}/yr, savings ${context['current_savings']:,.2f}, "
+        f"retiring at {context['retirement_age']} ({context['years_to_retirement']} years away)",
+        f"Retirement: projected ${context['final_savings']:,.2f} at retirement, covering {years_covered:.1f} years; "
+        f"saving ${monthly_retirement:,.2f}/month ({context['savings_rate']*100:.0f}% of income, "
+        f"{context['return_rate']*100:.0f}% "
+        f"assumed return); retirement expenses ${context['monthly_expenses']:,.2f}/month, "
+        + (f"savings last beyond age {LIFE_EXPECTANCY}" if context['depletion_age'] is None
+           else f"savings run out at age {context['depletion_age']:.0f}"),
+        f"Children: {len(context['children'])}",
+    ]
+    lines.extend(
+        f"- Child {i+1}: age {age}, {years} years to college, total cost ${cost:,.2f}, needs ${monthly:,.2f}/month"
+        for i, (age, years, cost, monthly) in enumerate(context['children'])
+    )
+    lines.append(f"Risk: {retirement_risk} retirement risk, {burden} monthly savings burden")
+    return "\n".join(lines)
+
+
+def encode_context(context):
+    return json.dumps(context, separators=(',', ':')).encode()
+
+
+def decode_context(body):
+    """Return the stored context dict, or None if it was written by another context version."""
+    context = json.loads(body)
+    return context if context.get('version') == CONTEXT_VERSION else None
+
+
+def _summarize(messages, max_tokens):
+    """One-line digest of the user's earlier questions, trimmed to ``max_tokens``."""
+    questions = [' '.join(m['content'].split())[:80] for m in messages if m['role'] == 'user']
+    if not questions:
+        return None
+    summary = "Earlier in this conversation the user asked about: " + "; ".join(questions)
+    return summary[:max_tokens * 4]
+
+
+def build_chat_messages(context_text, history, user_message, token_budget=PROMPT_TOKEN_BUDGET):
+    """Assemble the OpenAI messages, keeping the newest history that fits ``token_budget``.
+
+    Older turns that do not fit are folded into a short digest of the
+    user's earlier questions rather than dropped silently. ``user_message``
+    is always sent in full, so callers reject messages longer than
+    ``MAX_MESSAGE_TOKENS`` first.
+    """
+    system = f"{SYSTEM_PROMPT}\n\n{context_text}" if context_text else SYSTEM_PROMPT
+    remaining = token_budget - estimate_tokens(system) - estimate_tokens(user_message) - HISTORY_SUMMARY_TOKENS
+
+    kept = []
+    for message in reversed(history):
+        cost = estimate_tokens(message['content'])
+        if cost > remaining:
+            break
+        kept.append({"role": message["role"], "content": message["content"]})
+        remaining -= cost
+    kept.reverse()
+
+    dropped = history[:len(history) - len(kept)]
+    summary = _summarize(dropped, HISTORY_SUMMARY_TOKENS) if dropped else None
+    if summary:
+        system = f"{system}\n\n{summary}"
+
+    return [{"role": "system", "content": system}, *kept, {"role": "user", "content": user_message}]
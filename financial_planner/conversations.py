@@ -0,0 +1,135 @@
+"""Server-side chat history store.
+
+The browser only holds an opaque conversation ID cookie; the messages live
+here, in a bounded ring buffer per conversation, so each request reads and
+writes a fixed amount of data no matter how long the conversation runs.
+
+- ``MemoryConversationStore``: per process, least-recently-used
+  conversations are dropped beyond ``max_conversations``.
+- ``SQLiteConversationStore``: shared by every worker process on the host
+  and survives restarts; messages older than ``ttl`` are dropped.
+"""
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+CONVERSATION_COOKIE = 'conversation_id'
+DEFAULT_MAX_MESSAGES = 20
+DEFAULT_MAX_CONVERSATIONS = 10000
+DEFAULT_TTL = 30 * 24 * 3600
+
+_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+def new_conversation_id():
+    return secrets.token_urlsafe(18)
+
+
+def is_valid_conversation_id(conversation_id):
+    return bool(conversation_id) and _ID_PATTERN.match(conversation_id) is not None
+
+
+class MemoryConversationStore:
+    """In-process store keeping the last ``max_messages`` messages of each conversation."""
+
+    def __init__(self, max_messages=DEFAULT_MAX_MESSAGES, max_conversations=DEFAULT_MAX_CONVERSATIONS):
+        self.max_messages = max_messages
+        self.max_conversations = max_conversations
+        self._conversations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def history(self, conversation_id):
+        with self._lock:
+            messages = self._conversations.get(conversation_id)
+            if messages is None:
+                return []
+            self._conversations.move_to_end(conversation_id)
+            return list(messages)
+
+    def append(self, conversation_id, *messages):
+        with self._lock:
+            buffer = self._conversations.get(conversation_id)
+            if buffer is None:
+                buffer = self._conversations[conversation_id] = deque(maxlen=self.max_messages)
+                while len(self._conversations) > self.max_conversations:
+                    self._conversations.popitem(last=False)
+            else:
+                self._conversations.move_to_end(conversation_id)
+            buffer.extend({"role": m["role"], "content": m["content"]} for m in messages)
+
+
+class SQLiteConversationStore:
+    """Conversations in a SQLite file, trimmed to the last ``max_messages`` on every append.
+
+    Messages older than ``ttl`` seconds are left out of ``history`` and
+    deleted by the next append, so abandoned conversations do not pile up.
+    """
+
+    def __init__(self, path, max_messages=DEFAULT_MAX_MESSAGES, ttl=DEFAULT_TTL):
+        self.path = path
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS messages ('
+                ' conversation_id TEXT NOT NULL, seq INTEGER NOT NULL,'
+                ' role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL,'
+                ' PRIMARY KEY (conversation_id, seq))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS messages_created_at ON messages (created_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def history(self, conversation_id):
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT role, content FROM messages WHERE conversation_id = ? AND created_at >= ?'
+                ' ORDER BY seq DESC LIMIT ?',
+                (conversation_id, time.time() - self.ttl, self.max_messages),
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
+
+    def append(self, conversation_id, *messages):
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock before reading the last seq, so concurrent appends cannot share one
+            conn.execute('BEGIN IMMEDIATE')
+            last = conn.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM messages WHERE conversation_id = ?', (conversation_id,)
+            ).fetchone()[0]
+            conn.executemany(
+                'INSERT INTO messages (conversation_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(conversation_id, last + i, m["role"], m["content"], now) for i, m in enumerate(messages, 1)],
+            )
+            conn.execute(
+                'DELETE FROM messages WHERE conversation_id = ? AND seq <= ?',
+                (conversation_id, last + len(messages) - self.max_messages),
+            )
+            conn.execute('DELETE FROM messages WHERE created_at < ?', (now - self.ttl,))
+
+
+def create_conversation_store():
+    """Build the store from CHAT_HISTORY_* environment variables."""
+    backend_name = os.getenv('CHAT_HISTORY_BACKEND', 'memory').lower()
+    max_messages = int(os.getenv('CHAT_HISTORY_MAX_MESSAGES', DEFAULT_MAX_MESSAGES))
+    if backend_name == 'sqlite':
+        return SQLiteConversationStore(
+            os.getenv('CHAT_HISTORY_PATH', 'chat_history.sqlite3'),
+            max_messages,
+            float(os.getenv('CHAT_HISTORY_TTL', DEFAULT_TTL)),
+        )
+    if backend_name == 'memory':
+        return MemoryConversationStore(max_messages)
+    raise ValueError(f"Unknown CHAT_HISTORY_BACKEND: {backend_name}")
@@ -0,0 +1,123 @@
+"""Delta /calculate: patch only the chart traces an edited field changes.
+
+In an interactive session users mostly change one field at a time. Every
+full ``/calculate`` response carries a ``calc_id``, and the parsed profile
+is kept server-side under it, with the assumption values it was projected
+with. The browser can then post
+``{"calc_id": ..., "changes": {...}}`` with just the edited fields. The
+server merges them into the stored profile, rebuilds only the traces they
+affect and returns a ``patch`` that ``input.html`` merges into its copy of
+each figure before calling ``Plotly.react``:
+
+- Every field moves the ledger, so the retirement balances (``y``) are
+  always resent. The ages (``x``) are resent only when ``age`` or
+  ``retirement_age`` change, or when the series is long enough to be
+  decimated.
+- A change in children's ages resends the cost bars of each child whose
+  age differs at the same position and drops the bars of removed children.
+  It also resends the monthly-savings bars, as does ``annual_income``.
+
+``patch[name]`` is None when the figure goes away (no children left).
+Otherwise it holds ``traces``, a list of ``[index, fields]`` pairs to merge
+into the trace at ``index`` (a new trace past the end), and ``length``, the
+trace count to keep. A figure the browser does not have yet also comes with
+its ``layout``.
+"""
+from financial_planner import figures
+from financial_planner.cache import cache_key
+from financial_planner.metrics import span
+from financial_planner.planner import analyze_financial_health
+from financial_planner.projection import DEFAULT_ASSUMPTIONS, project_profile
+from financial_planner.validation import ProfileError, parse_user_profile
+
+PATCH_FIELDS = ('age', 'current_savings', 'annual_income', 'retirement_age', 'children')
+
+
+def calc_id_for(user_profile, assumptions=DEFAULT_ASSUMPTIONS):
+    """Deterministic ID of a parsed profile and its assumptions, so cached /calculate responses stay valid."""
+    return cache_key('calc', user_profile, assumptions.digest)
+
+
+def apply_changes(base_profile, changes):
+    """Merge posted ``changes`` into a stored parsed profile and validate the result.
+
+    Raises ``ProfileError``, with fields named ``changes.<field>``.
+    """
+    if not isinstance(changes, dict):
+        raise ProfileError([{'field': 'changes', 'message': 'must be an object'}])
+    unknown = sorted(set(changes) - set(PATCH_FIELDS))
+    if unknown:
+        raise ProfileError([{'field': f'changes.{field}', 'message': 'cannot be changed'} for field in unknown])
+    return parse_user_profile({**base_profile, **changes}, prefix='changes.')
+
+
+def changed_fields(base_profile, user_profile):
+    """The ``PATCH_FIELDS`` that affect the results; an education goal alone changes nothing."""
+    changed = {
+        field for field in ('age', 'current_savings', 'annual_income', 'retirement_age')
+        if base_profile[field] != user_profile[field]
+    }
+    if [child['age'] for child in base_profile['children']] != [child['age'] for child in user_profile['children']]:
+        changed.add('children')
+    return changed
+
+
+def figure_patch(base_profile, user_profile, projection, max_points=figures.MAX_POINTS):
+    """Build the trace patch that turns ``base_profile``'s figures into ``user_profile``'s."""
+    changed = changed_fields(base_profile, user_profile)
+    if not changed:
+        return {}
+
+    traces = []
+    series = ((projection['years'], projection['savings']), (projection['drawdown_years'], projection['drawdown']))
+    for index, (x, y) in enumerate(series):
+        trace = {'type': 'scatter', 'x': x, 'y': y}
+        figures.compact_figure({'data': [trace]}, max_points)
+        # Decimation picks the ages by the balances, so both are resent together
+        if not changed & {'age', 'retirement_age'} and len(y) <= max_points:
+            del trace['x']
+        traces.append([index, trace])
+    # Two traces; a Monte Carlo fan from an earlier full response is dropped
+    patch = {'retirement': {'traces': traces, 'length': 2}}
+
+    base_children, children = base_profile['children'], user_profile['children']
+    if not children:
+        if base_children:
+            patch['education'] = patch['monthly'] = None
+        return patch
+
+    if 'children' in changed:
+        current_costs = projection['current_costs'].tolist()
+        projected_costs = projection['projected_costs'].tolist()
+        traces = []
+        for i, child in enumerate(children):
+            if i < len(base_children) and base_children[i]['age'] == child['age']:
+                continue
+            for j, trace in enumerate(figures.education_traces(i, current_costs[i], projected_costs[i])):
+                traces.append([2 * i + j, trace])
+        patch['education'] = {'traces': traces, 'length': 2 * len(children)}
+        if not base_children:
+            patch['education']['layout'] = figures.education_layout()
+
+    if changed & {'annual_income', 'children'}:
+        monthly = figures.monthly_figure(projection['monthly_retirement'], projection['college_monthly'])
+        patch['monthly'] = {'traces': [[0, monthly['data'][0]]], 'length': 1}
+        if not base_children:
+            patch['monthly']['layout'] = monthly['layout']
+    return patch
+
+
+def calculate_delta(base_profile, user_profile, projection=None, max_points=figures.MAX_POINTS,
+                    assumptions=DEFAULT_ASSUMPTIONS):
+    """Return the delta ``/calculate`` response: the figure ``patch`` and the new ``analysis``.
+
+    ``assumptions`` must be the set the base figures were computed with.
+    """
+    if projection is None:
+        with span('projection'):
+            projection = project_profile(user_profile, assumptions=assumptions)
+    with span('figures'):
+        patch = figure_patch(base_profile, user_profile, projection, max_points)
+    with span('analysis'):
+        analysis = analyze_financial_health(user_profile, None, projection, assumptions=assumptions)
+    return {'patch': patch, 'analysis': analysis}
@@ -0,0 +1,227 @@
+"""Lightweight Plotly figure specs for the /calculate charts.
+
+Builds the same ``{'data': [...], 'layout': {...}}`` dicts that
+``input.html`` passes to ``Plotly.newPlot``, but as plain dicts instead of
+validated ``plotly.graph_objects`` figures. Numeric series stay NumPy arrays
+until ``dumps`` encodes the whole response in a single pass, with orjson when
+it is installed.
+
+``compact_figure`` keeps long series cheap to send and to draw. It reduces
+line traces to ``MAX_POINTS`` points by min/max decimation, which keeps every
+peak and trough that would show at chart resolution. It also sends long
+numeric arrays as Plotly typed arrays (base64 ``bdata`` plus ``dtype``),
+which plotly.js 2.28+ decodes without parsing JSON numbers.
+"""
+import base64
+import json
+import os
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+# Points kept per line trace: about two per pixel column of a full-width chart
+MAX_POINTS = int(os.getenv('FIGURE_MAX_POINTS', 2000))
+# Numeric arrays with at least this many values are sent as typed arrays
+TYPED_ARRAY_MIN_LENGTH = int(os.getenv('FIGURE_TYPED_ARRAY_MIN_LENGTH', 256))
+
+# The parts of Plotly's built-in ``plotly_dark`` template that these charts use
+DARK_TEMPLATE = {
+    'layout': {
+        'colorway': ['#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A',
+                     '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52'],
+        'font': {'color': '#f2f5fa'},
+        'hovermode': 'closest',
+        'paper_bgcolor': 'rgb(17,17,17)',
+        'plot_bgcolor': 'rgb(17,17,17)',
+        'xaxis': {'gridcolor': '#283442', 'linecolor': '#506784', 'ticks': '', 'title': {'standoff': 15},
+                  'zerolinecolor': '#283442', 'automargin': True, 'zerolinewidth': 2},
+        'yaxis': {'gridcolor': '#283442', 'linecolor': '#506784', 'ticks': '', 'title': {'standoff': 15},
+                  'zerolinecolor': '#283442', 'automargin': True, 'zerolinewidth': 2},
+    }
+}
+
+
+def _layout(title, **extra):
+    layout = {'title': {'text': title, 'x': 0.5}, 'template': DARK_TEMPLATE, 'plot_bgcolor': 'rgba(0,0,0,0)'}
+    layout.update(extra)
+    return layout
+
+
+def retirement_figure(years, savings, simulation=None, drawdown=None):
+    data = [{
+        'type': 'scatter',
+        'x': years,
+        'y': savings,
+        'mode': 'lines+markers',
+        'name': 'Projected Savings',
+        'line': {'color': '#00ff00', 'width': 3},
+        'marker': {'size': 8, 'symbol': 'circle'},
+    }]
+    if drawdown is not None:
+        # Ledger balance from retirement to life expectancy
+        drawdown_years, balances = drawdown
+        data.append({'type': 'scatter', 'x': drawdown_years, 'y': balances, 'mode': 'lines',
+                     'name': 'Retirement Drawdown', 'line': {'color': '#ffaa00', 'width': 3}})
+    if simulation is not None:
+        # Monte Carlo fan: p5-p95 band with the median path on top
+        band_line = {'color': 'rgba(0,170,255,0.4)', 'width': 1}
+        ages = simulation['ages']
+        data.append({'type': 'scatter', 'x': ages, 'y': simulation['p95'], 'mode': 'lines',
+                     'name': '95th percentile', 'line': band_line})
+        data.append({'type': 'scatter', 'x': ages, 'y': simulation['p5'], 'mode': 'lines',
+                     'name': '5th percentile', 'fill': 'tonexty', 'fillcolor': 'rgba(0,170,255,0.2)',
+                     'line': band_line})
+        data.append({'type': 'scatter', 'x': ages, 'y': simulation['p50'], 'mode': 'lines',
+                     'name': 'Median (Monte Carlo)', 'line': {'color': '#00aaff', 'width': 2, 'dash': 'dash'}})
+    return {
+        'data': data,
+        'layout': _layout(
+            'Projected Retirement Savings Growth',
+            xaxis={'title': {'text': 'Age'}},
+            yaxis={'title': {'text': 'Savings ($)'}},
+            showlegend=True,
+        ),
+    }
+
+
+def education_traces(index, current, projected):
+    """The current and projected cost bars of child ``index`` (0-based)."""
+    label = f'Child {index+1}'
+    return [
+        {'type': 'bar', 'name': f'{label} Current', 'x': [label], 'y': [current], 'marker': {'color': '#3366cc'}},
+        {'type': 'bar', 'name': f'{label} Projected', 'x': [label], 'y': [projected], 'marker': {'color': '#dc3912'}},
+    ]
+
+
+def education_layout():
+    return _layout('Projected 4-Year College Costs by Child', barmode='group')
+
+
+def education_figure(current_costs, projected_costs):
+    data = []
+    for i, (current, projected) in enumerate(zip(current_costs.tolist(), projected_costs.tolist())):
+        data.extend(education_traces(i, current, projected))
+    return {'data': data, 'layout': education_layout()}
+
+
+def monthly_figure(retirement_monthly, college_monthly):
+    monthly_savings = np.concatenate(([retirement_monthly], college_monthly))
+    goals = ['Retirement'] + [f'Child {i+1} Education' for i in range(len(college_monthly))]
+    return {
+        'data': [{
+            'type': 'bar',
+            'x': goals,
+            'y': monthly_savings,
+            'marker': {'color': monthly_savings, 'colorscale': 'Viridis'},
+            'text': [f'${x:,.0f}' for x in monthly_savings.tolist()],
+            'textposition': 'inside',
+        }],
+        'layout': _layout('Required Monthly Savings by Financial Goal'),
+    }
+
+
+def comparison_figure(scenarios):
+    """Overlay the saved balance curves of several scenarios on one chart."""
+    data = [
+        {'type': 'scatter', 'x': scenario['ages'], 'y': scenario['curve'], 'mode': 'lines',
+         'name': scenario['name'] or f"Scenario {scenario['id']}"}
+        for scenario in scenarios
+    ]
+    return {
+        'data': data,
+        'layout': _layout(
+            'Projected Savings by Scenario',
+            xaxis={'title': {'text': 'Age'}},
+            yaxis={'title': {'text': 'Savings ($)'}},
+            showlegend=True,
+        ),
+    }
+
+
+def sensitivity_figure(return_rates, savings_rates, years_covered, retirement_age):
+    """Heatmap of years of retirement covered, by savings rate (x) and return rate (y)."""
+    return {
+        'data': [{
+            'type': 'heatmap',
+            'x': savings_rates * 100,
+            'y': return_rates * 100,
+            # A slice of the sensitivity grid; copied so orjson can encode it natively
+            'z': np.ascontiguousarray(years_covered),
+            'colorscale': 'Viridis',
+            'colorbar': {'title': {'text': 'Years covered'}},
+            'hovertemplate': 'Savings rate %{x:.1f}%<br>Return %{y:.1f}%<br>%{z:.1f} years<extra></extra>',
+        }],
+        'layout': _layout(
+            f'Years of Retirement Covered, Retiring at {retirement_age}',
+            xaxis={'title': {'text': 'Savings rate (%)'}},
+            yaxis={'title': {'text': 'Annual return (%)'}},
+        ),
+    }
+
+
+def decimate(x, y, max_points=MAX_POINTS):
+    """Min/max decimation of a line to at most ``max_points`` points.
+
+    The series is cut into equal buckets and each keeps its lowest and
+    highest point, in x order, plus the first and last points overall.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= max_points or max_points < 4:
+        return x, y
+    size = -(-n // ((max_points - 2) // 2))
+    rows = -(-n // size)
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(rows, size)
+    missing = np.isnan(blocks)
+    offsets = np.arange(rows) * size
+    low = offsets + np.argmin(np.where(missing, np.inf, blocks), axis=1)
+    high = offsets + np.argmax(np.where(missing, -np.inf, blocks), axis=1)
+    keep = np.unique(np.concatenate(([0, n - 1], low, high)))
+    return np.asarray(x)[keep], y[keep]
+
+
+def typed_array(values):
+    """Plotly's typed-array form of a numeric array: ``{'dtype', 'bdata'[, 'shape']}``."""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iu' and (values.size == 0 or (values.min() >= -2**31 and values.max() < 2**31)):
+        dtype, values = 'i4', values.astype('<i4')
+    else:
+        dtype, values = 'f8', values.astype('<f8')
+    spec = {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ','.join(map(str, values.shape))
+    return spec
+
+
+def compact_figure(figure, max_points=MAX_POINTS, typed_min_length=TYPED_ARRAY_MIN_LENGTH):
+    """Decimate long line traces and typed-encode long numeric arrays of ``figure`` in place."""
+    for trace in figure['data']:
+        if trace['type'] == 'scatter' and len(trace['y']) > max_points:
+            trace['x'], trace['y'] = decimate(trace['x'], trace['y'], max_points)
+        for field in ('x', 'y', 'z'):
+            values = trace.get(field)
+            if (isinstance(values, np.ndarray) and values.dtype.kind in 'iuf'
+                    and values.size >= typed_min_length):
+                trace[field] = typed_array(values)
+    return figure
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Encode a response containing NumPy arrays to JSON bytes in one pass."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode()
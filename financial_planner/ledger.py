@@ -0,0 +1,142 @@
+"""Cash-flow ledger: every profile's balance stepped from today to life expectancy.
+
+Each step (a year or a month) credits contributions and investment growth
+and debits college costs and inflation-adjusted retirement spending. The
+balance cannot go below zero: spending it cannot cover is recorded as a
+shortfall instead. Results are stored column-wise in one preallocated
+record array per call: one record per profile, whose fields are contiguous
+per-step arrays, so ``ledger.closing`` is a (profiles x steps) view.
+
+The step rule ``balance = max(balance * g + flow, 0)`` is evaluated for all
+steps at once rather than in a Python loop. Dividing by ``g**t`` turns it
+into a running sum floored at zero, whose closed form is the cumulative
+sum minus its running minimum, so monthly 80-year ledgers for thousands of
+profiles take a few array passes. Growth, price-level and college-cost
+factors are slices of each rate's cached ``growth_table``.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from financial_planner.assumptions import growth_factors
+
+# Ledger columns; each is stored as a per-step array within a profile's record
+LEDGER_FIELDS = (
+    'age',            # age at the start of the step
+    'opening',        # balance at the start of the step
+    'contribution',   # retirement and college savings paid in
+    'growth',         # investment return on the opening balance
+    'college',        # college costs paid out
+    'drawdown',       # retirement spending paid out
+    'shortfall',      # spending the balance could not cover
+    'closing',        # balance at the end of the step
+)
+
+
+@lru_cache(maxsize=256)
+def ledger_dtype(num_steps):
+    return np.dtype([(name, 'f8', (num_steps,)) for name in LEDGER_FIELDS])
+
+
+def _interval_sums(starts, stops, weights, num_steps):
+    """Sum ``weights`` over the steps ``[start, stop)`` of each (profile, child) pair.
+
+    ``starts`` and ``stops`` must be non-negative.
+
+    Returns a (profiles x steps) array, built from +weight/-weight edges and
+    one cumulative sum instead of a pass per child.
+    """
+    count = starts.shape[0]
+    width = num_steps + 1
+    offsets = np.arange(count)[:, None] * width
+    weights = weights.ravel()
+    edges = (
+        np.bincount((offsets + np.minimum(starts, num_steps)).ravel(), weights, count * width)
+        - np.bincount((offsets + np.minimum(stops, num_steps)).ravel(), weights, count * width)
+    )
+    return np.cumsum(edges.reshape(count, width), axis=1)[:, :num_steps]
+
+
+def build_ledger(age, retirement_age, current_savings, annual_contribution, annual_expenses,
+                 years_to_college, college_contribution, child_mask, *, annual_return_rate,
+                 inflation_rate, college_annual_cost, college_inflation_rate, college_years=4,
+                 life_expectancy=95, steps_per_year=1):
+    """Step every profile from ``age`` to ``life_expectancy`` (or one year past retirement, if later).
+
+    Per-profile inputs are 1-D arrays; the college inputs are (profiles x
+    children) arrays as built by ``profiles_to_arrays``. A child saves
+    ``college_contribution`` a year until college starts, then pays
+    ``college_annual_cost`` (grown at ``college_inflation_rate`` from today)
+    for ``college_years`` years. Retirement spending starts at
+    ``annual_expenses`` in today's dollars and grows with ``inflation_rate``.
+
+    Returns a dict with the ``ledger`` record array (one record per profile,
+    each field a per-step array, NaN past the profile's last step) and per-profile ``steps``, ``retirement_step``,
+    ``retirement_balance``, ``depletion_age`` (NaN if savings last),
+    ``college_shortfall`` and ``retirement_shortfall``.
+    """
+    age = np.asarray(age, dtype=float)
+    current_savings = np.maximum(np.asarray(current_savings, dtype=float), 0.0)
+    working_years = np.maximum(np.asarray(retirement_age) - age, 0).astype(int)
+    horizon_years = np.maximum(life_expectancy - age, working_years + 1).astype(int)
+    steps = horizon_years * steps_per_year
+    retirement_step = working_years * steps_per_year
+    count = len(age)
+    num_steps = int(steps.max()) if count else 0
+
+    t = np.arange(num_steps)
+    working = t < retirement_step[:, None]
+    per_step = 1 / steps_per_year
+    # NaN past each profile's last step, carried through every column by the arithmetic below
+    padding = np.where(t < steps[:, None], 1.0, np.nan) if count and steps.min() < num_steps else 1.0
+
+    # College savings run until each child starts college; bills are paid for college_years after that
+    college_start = np.maximum(years_to_college, 0) * steps_per_year
+    college_end = np.maximum(years_to_college + college_years, 0) * steps_per_year
+    contribution = working * (np.asarray(annual_contribution, dtype=float) * per_step)[:, None] * padding
+    if years_to_college.shape[1]:
+        contribution += _interval_sums(0 * college_start, college_start,
+                                       np.where(child_mask, college_contribution * per_step, 0.0), num_steps)
+        attending = _interval_sums(college_start, college_end, child_mask.astype(float), num_steps)
+        college_price = growth_factors(college_inflation_rate, num_steps // steps_per_year + 1)
+        yearly_college_cost = college_annual_cost * college_price[t // steps_per_year]
+        college = attending * (yearly_college_cost * per_step) * padding
+    else:
+        college = np.zeros((count, num_steps)) * padding
+
+    price_level = growth_factors(inflation_rate, num_steps + 1, steps_per_year)[1:]
+    drawdown = ~working * ((np.asarray(annual_expenses, dtype=float) * per_step)[:, None] * price_level) * padding
+
+    # balance[t+1] = max(balance[t] * g + flow[t], 0), solved in discounted terms
+    step_growth = (1 + annual_return_rate) ** per_step
+    discount = growth_factors(annual_return_rate, num_steps + 1, steps_per_year)
+    flow = contribution - college - drawdown
+    running = np.zeros((count, num_steps + 1))
+    np.cumsum(flow / discount[1:], axis=1, out=running[:, 1:])
+    floor = np.minimum.accumulate(running, axis=1)
+    balance = np.maximum((running + np.maximum(current_savings[:, None], -floor)) * discount, 0.0)
+
+    opening = balance[:, :-1]
+    shortfall = np.maximum(-(opening * step_growth + flow), 0.0)
+
+    ledger = np.empty(count, dtype=ledger_dtype(num_steps))
+    ledger['age'] = (age[:, None] + t * per_step) * padding
+    ledger['opening'] = opening
+    ledger['contribution'] = contribution
+    ledger['growth'] = opening * (step_growth - 1)
+    ledger['college'] = college
+    ledger['drawdown'] = drawdown
+    ledger['shortfall'] = shortfall
+    ledger['closing'] = balance[:, 1:]
+
+    depleted = (shortfall > 0) & ~working
+    first_depleted = depleted.argmax(axis=1)
+    return {
+        'ledger': ledger.view(np.recarray),
+        'steps': steps,
+        'retirement_step': retirement_step,
+        'retirement_balance': balance[np.arange(count), retirement_step],
+        'depletion_age': np.where(depleted.any(axis=1), age + first_depleted * per_step, np.nan),
+        'college_shortfall': np.where(working, shortfall, 0.0).sum(axis=1),
+        'retirement_shortfall': np.where(depleted, shortfall, 0.0).sum(axis=1),
+    }
@@ -0,0 +1,243 @@
+"""OpenAI chat client shared by every /chat request.
+
+One client is created per process and reused, so requests share its
+keep-alive connection pool instead of opening a new TLS connection per
+message. Upstream calls are bounded by a semaphore: once
+``CHAT_MAX_CONCURRENCY`` calls are in flight, new ones wait up to
+``CHAT_QUEUE_TIMEOUT`` seconds and then fail fast instead of piling up.
+
+The ``*_async`` variants are used by the ASGI server
+(``financial_planner.asgi``). They await an ``AsyncOpenAI`` client on the
+event loop, under their own per-loop semaphore with the same limits.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from financial_planner import metrics
+from financial_planner.cache import cache_key
+
+MODEL = "gpt-3.5-turbo"
+TEMPERATURE = 0.7
+MAX_TOKENS = 300
+
+REQUEST_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', 30))
+MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', 2))
+MAX_CONCURRENCY = int(os.getenv('CHAT_MAX_CONCURRENCY', 32))
+QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', 5))
+
+_client = None
+_client_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+# The async client and semaphore belong to the event loop that created them
+_async_client = None
+_async_loop = None
+_async_slots = None
+
+
+class ChatBusyError(Exception):
+    """Raised when every upstream slot stays taken for longer than the queue timeout."""
+
+
+def get_client():
+    """Return the process-wide OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                options = _client_options()
+                # Imported on first use; the client library is slow to load
+                from openai import OpenAI
+                _client = OpenAI(**options)
+    return _client
+
+
+def _client_options():
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        raise ValueError("OpenAI API key is not set")
+    return {
+        'api_key': api_key,
+        'base_url': os.getenv('OPENAI_BASE_URL') or None,
+        'timeout': REQUEST_TIMEOUT,
+        'max_retries': MAX_RETRIES,
+    }
+
+
+def get_async_client():
+    """Return the ``AsyncOpenAI`` client for the running event loop, creating it on first use."""
+    global _async_client, _async_loop, _async_slots
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        options = _client_options()
+        from openai import AsyncOpenAI
+        _async_client = AsyncOpenAI(**options)
+        _async_loop = loop
+        _async_slots = asyncio.BoundedSemaphore(MAX_CONCURRENCY)
+    return _async_client
+
+
+def reset_client():
+    """Drop the shared clients so the next call picks up changed settings."""
+    global _client, _async_client, _async_loop
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _async_client = _async_loop = None
+
+
+def chat_cache_key(messages):
+    """Hash a prompt for the reply cache.
+
+    Whitespace is normalized everywhere, and the final user message also
+    ignores case and trailing punctuation, so "Will I run out of money?"
+    and "will I run out of money" share a cached reply.
+    """
+    normalized = [[message['role'], ' '.join(message['content'].split())] for message in messages]
+    normalized[-1][1] = normalized[-1][1].casefold().rstrip('?!. ')
+    return cache_key(MODEL, TEMPERATURE, MAX_TOKENS, normalized)
+
+
+def _acquire_slot():
+    if not _slots.acquire(timeout=QUEUE_TIMEOUT):
+        raise ChatBusyError("Too many chat requests in progress, please try again shortly")
+
+
+def _outcome(error):
+    return 'busy' if isinstance(error, ChatBusyError) else 'error'
+
+
+def get_openai_response(messages):
+    """Wrapper function for OpenAI API calls with error handling"""
+    start = None
+    try:
+        client = get_client()
+        _acquire_slot()
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS
+            )
+        finally:
+            _slots.release()
+        metrics.record_upstream('complete', 'ok', time.perf_counter() - start)
+        return response.choices[0].message.content, None
+    except Exception as e:
+        metrics.record_upstream('complete', _outcome(e), time.perf_counter() - start if start else None)
+        print(f"OpenAI API Error: {str(e)}")
+        return None, str(e)
+
+
+def stream_openai_response(messages):
+    """Yield the assistant reply as text fragments while the completion is generated.
+
+    Errors are raised to the caller; the concurrency slot is held until the
+    stream is exhausted or closed.
+    """
+    try:
+        client = get_client()
+        _acquire_slot()
+    except Exception as e:
+        metrics.record_upstream('stream', _outcome(e))
+        raise
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            stream=True
+        )
+        try:
+            first = True
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first and metrics.ENABLED:
+                        metrics.UPSTREAM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                    first = False
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+        outcome = 'ok'
+    except GeneratorExit:
+        outcome = 'cancelled'
+        raise
+    finally:
+        _slots.release()
+        metrics.record_upstream('stream', outcome, time.perf_counter() - start)
+
+
+async def _acquire_async_slot():
+    try:
+        await asyncio.wait_for(_async_slots.acquire(), QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ChatBusyError("Too many chat requests in progress, please try again shortly") from None
+
+
+async def get_openai_response_async(messages):
+    """``get_openai_response`` awaited on the event loop; returns ``(reply, error)``."""
+    start = None
+    try:
+        client = get_async_client()
+        await _acquire_async_slot()
+        start = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=MODEL,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_TOKENS
+            )
+        finally:
+            _async_slots.release()
+        metrics.record_upstream('complete', 'ok', time.perf_counter() - start)
+        return response.choices[0].message.content, None
+    except Exception as e:
+        metrics.record_upstream('complete', _outcome(e), time.perf_counter() - start if start else None)
+        print(f"OpenAI API Error: {str(e)}")
+        return None, str(e)
+
+
+async def stream_openai_response_async(messages):
+    """``stream_openai_response`` as an async generator of reply fragments."""
+    try:
+        client = get_async_client()
+        await _acquire_async_slot()
+    except Exception as e:
+        metrics.record_upstream('stream', _outcome(e))
+        raise
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        stream = await client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            stream=True
+        )
+        try:
+            first = True
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first and metrics.ENABLED:
+                        metrics.UPSTREAM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                    first = False
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+        outcome = 'ok'
+    except (GeneratorExit, asyncio.CancelledError):
+        outcome = 'cancelled'
+        raise
+    finally:
+        _async_slots.release()
+        metrics.record_upstream('stream', outcome, time.perf_counter() - start)
@@ -0,0 +1,250 @@
+"""Latency metrics, stage spans and opt-in profiling.
+
+``span(stage)`` times a block of work into the ``planner_stage_seconds``
+histogram and into the current request's trace, which the app reports in a
+``Server-Timing`` header. ``REGISTRY.render()`` produces the Prometheus
+text format served at ``/metrics``. Values are per process, so scrape every
+worker (or run one worker per scrape target).
+
+A request whose ``X-Profile`` header matches ``PROFILE_TOKEN`` runs under
+cProfile and the stats are written to ``PROFILE_DIR``. With
+``METRICS_ENABLED=0`` spans and request metrics are no-ops.
+
+Only the standard library is used, so the calculation core and worker
+processes can import this module freely.
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = os.getenv('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """A monotonically increasing count per label combination."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f'{self.name}{_format_labels(self.label_names, labels)} {value}'
+
+
+class Histogram:
+    """Observations counted into fixed buckets per label combination."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, *labels):
+        state = self._values.get(labels)
+        return sum(state[0]) if state else 0
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.label_names, labels)} {total}'
+            yield f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Time from request start until the response headers are ready.',
+    ('endpoint', 'method', 'status'),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    'planner_stage_seconds',
+    'Time spent in each stage of /calculate and /chat.',
+    ('stage',),
+)
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    'openai_request_duration_seconds',
+    'OpenAI call latency, excluding time queued for a concurrency slot.',
+    ('mode', 'outcome'),
+)
+UPSTREAM_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    'openai_first_token_seconds',
+    'Time until the first streamed reply fragment arrives.',
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    'openai_requests_total',
+    'OpenAI calls by outcome (ok, error, busy or cancelled).',
+    ('mode', 'outcome'),
+)
+
+_trace = contextvars.ContextVar('trace', default=None)
+_noop = contextlib.nullcontext()
+_profile_lock = threading.Lock()
+
+
+class _Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append((self.stage, elapsed))
+
+
+def span(stage):
+    """Context manager timing one stage of the current request."""
+    return _Span(stage) if ENABLED else _noop
+
+
+def record_upstream(mode, outcome, seconds=None):
+    """Count one OpenAI call; ``seconds`` is None when it failed before reaching the API."""
+    if not ENABLED:
+        return
+    UPSTREAM_REQUESTS.inc(mode, outcome)
+    if seconds is not None:
+        UPSTREAM_SECONDS.observe(seconds, mode, outcome)
+
+
+def start_trace():
+    """Begin collecting spans for a request; returns the state for ``finish_trace``."""
+    if not ENABLED:
+        return None
+    _trace.set([])
+    return time.perf_counter()
+
+
+def finish_trace(start, endpoint, method, status):
+    """Record the request latency and return its ``(stage, seconds)`` spans."""
+    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint, method, str(status))
+    spans = _trace.get() or []
+    _trace.set(None)
+    return spans
+
+
+def server_timing(spans):
+    """Format spans as a ``Server-Timing`` header value."""
+    return ', '.join(f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in spans)
+
+
+def profiling_requested(header_value):
+    """True if the request's ``X-Profile`` header carries the configured token."""
+    import hmac
+    if not (PROFILE_TOKEN and header_value):
+        return False
+    # compare_digest rejects str holding non-ASCII characters, so compare bytes
+    return hmac.compare_digest(header_value.encode(), PROFILE_TOKEN.encode())
+
+
+def start_profile():
+    """Start cProfile for the current request, or return None if another profile is running."""
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler, label=None):
+    """Stop a profile started by ``start_profile``; write it to PROFILE_DIR if ``label`` is given."""
+    profiler.disable()
+    _profile_lock.release()
+    if label is None:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{label}-{os.getpid()}-{time.time_ns()}.prof")
+    profiler.dump_stats(path)
+    return path
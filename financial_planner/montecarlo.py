@@ -0,0 +1,159 @@
+"""Monte Carlo retirement simulation.
+
+Simulates many market paths with random annual returns and inflation. Each
+path contributes the profile's annual savings until retirement and then
+withdraws inflation-adjusted retirement expenses until the end of the
+horizon. Paths are compounded as (years x paths) NumPy matrices, one chunk
+at a time, and large runs are sharded across a process pool. Every chunk
+draws from its own child of one ``SeedSequence``, so a given seed produces
+the same result whatever the number of workers.
+
+Exact percentiles need every path's balance for every year, so a run holds
+one float32 (years + 1) x paths matrix: 4 bytes per path-year, about 31 MB
+for ``MAX_PATHS`` paths over the longest horizon (age 18 to 95). Chunks are
+copied into it as they arrive, and the percentiles are taken a few years at
+a time, so neither adds a second copy. When the pool finishes chunks faster
+than they are copied, their results wait in memory, up to the matrix size
+again. Simulating one chunk of ``CHUNK_SIZE`` paths takes about 20 MB more,
+so a ``MAX_PATHS`` run in one process peaks near 55 MB.
+"""
+import os
+import threading
+
+import numpy as np
+
+from financial_planner.projection import DEFAULT_ASSUMPTIONS, LIFE_EXPECTANCY
+
+# Spread of the yearly draws around the assumption set's return and inflation rates
+RETURN_VOLATILITY = 0.12
+INFLATION_VOLATILITY = 0.01
+
+DEFAULT_PATHS = 10000
+# Bounds the balance matrix, see above
+MAX_PATHS = 100000
+CHUNK_SIZE = 10000
+# Years per np.percentile call; its working copy is this many rows of the matrix
+PERCENTILE_BLOCK_YEARS = 8
+# Below this many paths the pool's start-up and transfer cost outweighs the speed-up
+PARALLEL_MIN_PATHS = 50000
+PERCENTILES = (5, 50, 95)
+
+SIMULATION_ASSUMPTIONS = {
+    'return_volatility': RETURN_VOLATILITY,
+    'inflation_volatility': INFLATION_VOLATILITY,
+    'life_expectancy': LIFE_EXPECTANCY,
+}
+
+_pool = None
+_pool_workers = None
+# Guards creating, replacing and submitting to the shared pool across request threads
+_pool_lock = threading.Lock()
+
+
+def _default_workers():
+    return int(os.getenv('MONTE_CARLO_WORKERS', os.cpu_count() or 1))
+
+
+def _get_pool(workers):
+    """Return a process pool shared across requests, recreated if the size changes.
+
+    Call with ``_pool_lock`` held. Workers start from a fork server (a
+    fresh interpreter on Windows) rather than forking the server, whose
+    other threads may hold locks mid-update.
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        # Imported here: multiprocessing adds ~25ms to every cold start that never uses the pool
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        if _pool is not None:
+            # Work already submitted to the old pool still runs to completion
+            _pool.shutdown(wait=False)
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+        _pool_workers = workers
+    return _pool
+
+
+def _map_chunks(workers, params, chunk_sizes, chunk_seeds):
+    """Submit every chunk to the shared pool; return an iterator over their balances in order."""
+    with _pool_lock:
+        # map submits all chunks before returning, so a later resize cannot drop them
+        return _get_pool(workers).map(_simulate_chunk, [params] * len(chunk_sizes), chunk_sizes, chunk_seeds)
+
+
+def _simulate_chunk(params, num_paths, seed_sequence):
+    """Simulate one chunk of paths and return balances as a (years + 1, paths) float32 matrix."""
+    current_savings, annual_savings, annual_expenses, working_years, horizon, return_mean, inflation_mean = params
+    rng = np.random.default_rng(seed_sequence)
+    returns = 1 + rng.normal(return_mean, RETURN_VOLATILITY, size=(horizon, num_paths))
+    price_level = np.cumprod(1 + rng.normal(inflation_mean, INFLATION_VOLATILITY, size=(horizon, num_paths)), axis=0)
+
+    balances = np.empty((horizon + 1, num_paths), dtype=np.float32)
+    balance = np.full(num_paths, float(current_savings))
+    balances[0] = balance
+    for year in range(horizon):
+        balance *= returns[year]
+        if year < working_years:
+            balance += annual_savings
+        else:
+            balance -= annual_expenses * price_level[year]
+        np.maximum(balance, 0, out=balance)
+        balances[year + 1] = balance
+    return balances
+
+
+def simulate_retirement(user_profile, num_paths=DEFAULT_PATHS, horizon_years=None, seed=None,
+                        chunk_size=CHUNK_SIZE, workers=None, assumptions=DEFAULT_ASSUMPTIONS):
+    """Run a Monte Carlo simulation for one profile.
+
+    Yearly returns and inflation are drawn around the rates of ``assumptions``.
+    Returns the ages covered, the p5/p50/p95 balance bands for each age and
+    the probability that savings last until the end of the horizon
+    (``LIFE_EXPECTANCY`` by default).
+    """
+    num_paths = int(min(max(num_paths, 1), MAX_PATHS))
+    age = user_profile['age']
+    working_years = max(user_profile['retirement_age'] - age, 0)
+    if horizon_years is None:
+        horizon_years = max(LIFE_EXPECTANCY - age, working_years + 1)
+    annual_income = user_profile['annual_income']
+    params = (
+        user_profile['current_savings'],
+        annual_income * assumptions.savings_rate,
+        annual_income * assumptions.retirement_expense_ratio,
+        working_years,
+        horizon_years,
+        assumptions.annual_return_rate,
+        assumptions.inflation_rate,
+    )
+
+    chunk_sizes = [min(chunk_size, num_paths - start) for start in range(0, num_paths, chunk_size)]
+    seed_sequence = np.random.SeedSequence(seed)
+    chunk_seeds = seed_sequence.spawn(len(chunk_sizes))
+
+    if workers is None:
+        workers = _default_workers()
+    if workers > 1 and num_paths >= PARALLEL_MIN_PATHS:
+        chunks = _map_chunks(workers, params, chunk_sizes, chunk_seeds)
+    else:
+        chunks = (_simulate_chunk(params, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, chunk_seeds))
+    balances = np.empty((horizon_years + 1, num_paths), dtype=np.float32)
+    start = 0
+    for chunk in chunks:
+        balances[:, start:start + chunk.shape[1]] = chunk
+        start += chunk.shape[1]
+
+    bands = np.empty((len(PERCENTILES), horizon_years + 1))
+    for first in range(0, horizon_years + 1, PERCENTILE_BLOCK_YEARS):
+        rows = slice(first, first + PERCENTILE_BLOCK_YEARS)
+        bands[:, rows] = np.percentile(balances[rows], PERCENTILES, axis=1)
+    return {
+        'ages': np.arange(age, age + horizon_years + 1),
+        'p5': bands[0],
+        'p50': bands[1],
+        'p95': bands[2],
+        'success_probability': float(np.count_nonzero(balances[-1] > 0)) / num_paths,
+        'num_paths': num_paths,
+        'seed': seed_sequence.entropy,
+    }
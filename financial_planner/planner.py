@@ -0,0 +1,367 @@
+"""Calculation core: projections, analysis and figures.
+
+Imports only NumPy and the engine modules, so batch jobs and worker
+processes can use it without loading Flask, plotly or openai. Plotly is
+imported on first use, and only when ``use_plotly`` figures are requested.
+"""
+import json
+import os
+
+from financial_planner import figures
+from financial_planner.metrics import span
+from financial_planner.montecarlo import simulate_retirement
+from financial_planner.projection import (
+    DEFAULT_ASSUMPTIONS,
+    LIFE_EXPECTANCY,
+    profiles_to_arrays,
+    project_batch,
+    project_profile,
+)
+from financial_planner.solver import solve_savings_rate
+from financial_planner.validation import parse_monte_carlo_options
+# parse_user_profile is re-exported here, where it used to live
+from financial_planner.validation import parse_user_profile, parse_user_profiles  # noqa: F401
+
+# Profiles projected together per array pass when streaming batch results
+BATCH_CHUNK_SIZE = 4096
+
+# Build figures through plotly.graph_objects instead of the lightweight spec builder
+USE_PLOTLY_FIGURES = os.getenv('USE_PLOTLY_FIGURES', '').lower() in ('1', 'true', 'yes')
+
+def calculate_plan(user_profile, monte_carlo=None, projection=None, assumptions=DEFAULT_ASSUMPTIONS):
+    """Run the projection, optional Monte Carlo simulation, figures and analysis for one profile.
+
+    ``monte_carlo`` is the optional ``/calculate`` setting: ``True`` or a dict
+    with ``paths`` and ``seed``, checked by ``parse_monte_carlo_options``. Pass ``projection`` if the caller already
+    projected the profile with ``assumptions``. Returns the ``/calculate``
+    response dict.
+    """
+    options = parse_monte_carlo_options(monte_carlo)
+    
+    # Project the savings and education series once for both consumers
+    if projection is None:
+        with span('projection'):
+            projection = project_profile(user_profile, assumptions=assumptions)
+    
+    simulation = None
+    if options is not None:
+        with span('monte_carlo'):
+            simulation = simulate_retirement(
+                user_profile,
+                num_paths=options['paths'],
+                seed=options['seed'],
+                assumptions=assumptions,
+            )
+    
+    # Generate visualizations
+    with span('figures'):
+        plots = generate_plots(user_profile, projection, simulation)
+    
+    # Generate financial health analysis
+    with span('analysis'):
+        analysis = analyze_financial_health(user_profile, plots, projection, simulation, assumptions)
+    plots['analysis'] = analysis
+    
+    if simulation is not None:
+        plots['monte_carlo'] = {
+            'success_probability': simulation['success_probability'],
+            'paths': simulation['num_paths'],
+            'seed': str(simulation['seed']),
+            'final_balance': {
+                'p5': float(simulation['p5'][-1]),
+                'p50': float(simulation['p50'][-1]),
+                'p95': float(simulation['p95'][-1]),
+            },
+        }
+    return plots
+
+def calculate_batch(profiles, include_figures=False, chunk_size=BATCH_CHUNK_SIZE, user_profiles=None,
+                    assumptions=DEFAULT_ASSUMPTIONS):
+    """Project many profiles in array passes and yield one compact result per profile.
+
+    ``profiles`` use the same JSON format as ``/calculate``. A profile's
+    ``id``, when present, is echoed back so callers can match results. All
+    profiles are validated before the first result, unless the caller passes
+    them already parsed as ``user_profiles``.
+    """
+    if user_profiles is None:
+        user_profiles = parse_user_profiles(profiles)
+    for start in range(0, len(profiles), chunk_size):
+        chunk = profiles[start:start + chunk_size]
+        chunk_profiles = user_profiles[start:start + chunk_size]
+        batch = project_batch(profiles_to_arrays(chunk_profiles), assumptions=assumptions)
+        
+        final_savings = batch['final_savings'].tolist()
+        years_covered = batch['years_of_retirement_covered'].tolist()
+        total_monthly = batch['total_monthly'].tolist()
+        risk_level = batch['risk_level'].tolist()
+        depletion_age = [None if age != age else age for age in batch['depletion_age'].tolist()]
+        projected_costs = batch['projected_costs'].tolist()
+        college_monthly = batch['college_monthly'].tolist()
+        
+        for i, (data, user_profile) in enumerate(zip(chunk, chunk_profiles)):
+            num_children = len(user_profile['children'])
+            result = {
+                'index': start + i,
+                'final_savings': final_savings[i],
+                'years_of_retirement_covered': years_covered[i],
+                'depletion_age': depletion_age[i],
+                'total_monthly': total_monthly[i],
+                'risk_level': risk_level[i],
+                'education_costs': projected_costs[i][:num_children],
+                'education_monthly': college_monthly[i][:num_children],
+            }
+            if 'id' in data:
+                result['id'] = data['id']
+            if include_figures:
+                result['plots'] = generate_plots(user_profile, project_profile(user_profile, assumptions=assumptions))
+            yield result
+
+def analyze_financial_health(user_profile, plots, projection=None, simulation=None, assumptions=DEFAULT_ASSUMPTIONS):
+    """Analyze financial health and provide recommendations."""
+    if projection is None:
+        projection = project_profile(user_profile, assumptions=assumptions)
+    savings_rate = assumptions.savings_rate
+    annual_savings = projection['annual_savings']
+    total_monthly = projection['total_monthly']
+    
+    # Education costs analysis
+    education_risks = []
+    for child, monthly_required in zip(user_profile['children'], projection['college_monthly']):
+        if monthly_required > user_profile['annual_income'] / 24:  # If monthly requirement exceeds half of monthly income
+            education_risks.append(f"Child age {child['age']}: High monthly savings requirement (${monthly_required:,.2f})")
+    
+    final_savings = projection['final_savings']
+    years_of_retirement_covered = projection['years_of_retirement_covered']
+    depletion_age = projection['depletion_age']
+    
+    # Generate analysis summary
+    analysis = {
+        'summary': '',
+        'risks': [],
+        'recommendations': []
+    }
+    
+    # Risk assessment
+    if years_of_retirement_covered < 20:
+        analysis['risks'].append(f"Your retirement savings may only last {years_of_retirement_covered:.1f} years after retirement")
+    
+    if depletion_age is not None:
+        analysis['risks'].append(
+            f"With retirement spending rising {assumptions.inflation_rate*100:.1f}% a year, your savings run out at age {depletion_age:.0f}"
+        )
+    
+    if total_monthly > user_profile['annual_income'] / 12 * 0.5:
+        analysis['risks'].append("Total monthly savings requirement exceeds 50% of your monthly income")
+    
+    if simulation is not None and simulation['success_probability'] < 0.8:
+        analysis['risks'].append(
+            f"Only {simulation['success_probability']*100:.0f}% of simulated market scenarios keep your savings above zero until age {simulation['ages'][-1]}"
+        )
+    
+    analysis['risks'].extend(education_risks)
+    
+    # Recommendations
+    if years_of_retirement_covered < 20 or depletion_age is not None:
+        required = solve_savings_rate(user_profile, assumptions=assumptions)
+        if required['feasible']:
+            analysis['recommendations'].append(
+                f"Consider increasing your retirement savings rate from the current {savings_rate*100}% to at least {required['value']*100:.1f}%"
+            )
+        else:
+            analysis['recommendations'].append(f"Consider increasing your retirement savings rate above the current {savings_rate*100}%")
+    
+    if user_profile['current_savings'] < user_profile['annual_income']:
+        analysis['recommendations'].append("Build an emergency fund of at least 6 months of expenses")
+    
+    if education_risks:
+        analysis['recommendations'].append("Consider starting a 529 college savings plan for each child")
+        analysis['recommendations'].append("Research scholarship and financial aid opportunities")
+    
+    # Overall summary
+    longevity = (
+        f"savings last beyond age {LIFE_EXPECTANCY}" if depletion_age is None
+        else f"savings run out at age {depletion_age:.0f}"
+    )
+    # Built outside the summary: before Python 3.12 an f-string expression cannot hold a backslash
+    monte_carlo_line = "" if simulation is None else (
+        f"- Monte Carlo success probability ({simulation['num_paths']:,} paths): "
+        f"{simulation['success_probability']*100:.1f}%\n"
+    )
+    education_lines = "" if not user_profile['children'] else (
+        f"Education Planning:\n- You have {len(user_profile['children'])} children to plan for\n"
+        "- Total education costs will be a significant portion of your savings goals"
+    )
+    risk_level = "LOW" if len(analysis['risks']) == 0 else "MODERATE" if len(analysis['risks']) <= 2 else "HIGH"
+    
+    analysis['summary'] = f"""Financial Health Assessment: {risk_level} RISK
+
+Retirement Outlook:
+- You're saving ${annual_savings:,.2f} annually for retirement
+- Projected savings at retirement: ${final_savings:,.2f}
+- This could cover approximately {years_of_retirement_covered:.1f} years of retirement
+- At a steady {assumptions.annual_return_rate*100:.0f}% return, {longevity}
+{monte_carlo_line}Monthly Savings Requirements:
+- Total monthly savings needed: ${total_monthly:,.2f}
+- This represents {(total_monthly/(user_profile['annual_income']/12)*100):.1f}% of your monthly income
+
+{education_lines}"""
+    
+    return analysis
+
+def generate_plots(user_profile, projection=None, simulation=None, use_plotly=None, max_points=figures.MAX_POINTS):
+    """Build the retirement, education and monthly-savings figure specs.
+
+    Figures are assembled as plain dicts by ``financial_planner.figures``
+    and compacted: line traces longer than ``max_points`` are decimated and
+    long numeric series become typed arrays. With ``use_plotly`` (default:
+    the USE_PLOTLY_FIGURES setting) they go through validated
+    ``plotly.graph_objects`` instead, for parity checks.
+    """
+    if projection is None:
+        projection = project_profile(user_profile)
+    if use_plotly is None:
+        use_plotly = USE_PLOTLY_FIGURES
+    if use_plotly:
+        return generate_plotly_plots(user_profile, projection, simulation)
+    
+    plots = {'retirement': figures.retirement_figure(
+        projection['years'], projection['savings'], simulation,
+        drawdown=(projection['drawdown_years'], projection['drawdown']),
+    )}
+    if user_profile['children']:
+        plots['education'] = figures.education_figure(projection['current_costs'], projection['projected_costs'])
+        plots['monthly'] = figures.monthly_figure(projection['monthly_retirement'], projection['college_monthly'])
+    for figure in plots.values():
+        figures.compact_figure(figure, max_points)
+    return plots
+
+def generate_plotly_plots(user_profile, projection, simulation=None):
+    # Imported on first use so the engine loads without plotly
+    import plotly.graph_objects as go
+    
+    plots = {}
+    
+    # 1. Retirement Planning Visualization
+    years = projection['years']
+    savings = projection['savings'].tolist()
+    
+    fig1 = go.Figure()
+    fig1.add_trace(go.Scatter(
+        x=years,
+        y=savings,
+        mode='lines+markers',
+        name='Projected Savings',
+        line=dict(color='#00ff00', width=3),
+        marker=dict(size=8, symbol='circle')
+    ))
+    
+    # Ledger balance from retirement to life expectancy
+    fig1.add_trace(go.Scatter(
+        x=projection['drawdown_years'],
+        y=projection['drawdown'].tolist(),
+        mode='lines',
+        name='Retirement Drawdown',
+        line=dict(color='#ffaa00', width=3)
+    ))
+    
+    if simulation is not None:
+        # Monte Carlo fan: p5-p95 band with the median path on top
+        ages = simulation['ages']
+        fig1.add_trace(go.Scatter(
+            x=ages,
+            y=simulation['p95'].tolist(),
+            mode='lines',
+            name='95th percentile',
+            line=dict(color='rgba(0,170,255,0.4)', width=1)
+        ))
+        fig1.add_trace(go.Scatter(
+            x=ages,
+            y=simulation['p5'].tolist(),
+            mode='lines',
+            name='5th percentile',
+            fill='tonexty',
+            fillcolor='rgba(0,170,255,0.2)',
+            line=dict(color='rgba(0,170,255,0.4)', width=1)
+        ))
+        fig1.add_trace(go.Scatter(
+            x=ages,
+            y=simulation['p50'].tolist(),
+            mode='lines',
+            name='Median (Monte Carlo)',
+            line=dict(color='#00aaff', width=2, dash='dash')
+        ))
+    
+    fig1.update_layout(
+        title='Projected Retirement Savings Growth',
+        title_x=0.5,
+        xaxis_title='Age',
+        yaxis_title='Savings ($)',
+        showlegend=True,
+        template='plotly_dark',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    
+    plots['retirement'] = json.loads(fig1.to_json())
+    
+    # 2. Education Planning Visualization
+    if user_profile['children']:
+        children_data = user_profile['children']
+        current_costs = projection['current_costs'].tolist()
+        projected_costs = projection['projected_costs'].tolist()
+        
+        fig2 = go.Figure()
+        
+        for i, (current, projected) in enumerate(zip(current_costs, projected_costs)):
+            fig2.add_trace(go.Bar(
+                name=f'Child {i+1} Current',
+                x=[f'Child {i+1}'],
+                y=[current],
+                marker_color='#3366cc'
+            ))
+            fig2.add_trace(go.Bar(
+                name=f'Child {i+1} Projected',
+                x=[f'Child {i+1}'],
+                y=[projected],
+                marker_color='#dc3912'
+            ))
+        
+        fig2.update_layout(
+            title='Projected 4-Year College Costs by Child',
+            title_x=0.5,
+            barmode='group',
+            template='plotly_dark',
+            plot_bgcolor='rgba(0,0,0,0)',
+        )
+        
+        plots['education'] = json.loads(fig2.to_json())
+        
+        # 3. Monthly Savings Requirements
+        retirement_monthly = projection['monthly_retirement']
+        college_monthly = projection['college_monthly'].tolist()
+        
+        goals = ['Retirement'] + [f'Child {i+1} Education' for i in range(len(children_data))]
+        monthly_savings = [retirement_monthly] + college_monthly
+        
+        fig3 = go.Figure()
+        fig3.add_trace(go.Bar(
+            x=goals,
+            y=monthly_savings,
+            marker=dict(
+                color=monthly_savings,
+                colorscale='Viridis',
+            ),
+            text=[f'${x:,.0f}' for x in monthly_savings],
+            textposition='inside',
+        ))
+        
+        fig3.update_layout(
+            title='Required Monthly Savings by Financial Goal',
+            title_x=0.5,
+            template='plotly_dark',
+            plot_bgcolor='rgba(0,0,0,0)',
+        )
+        
+        plots['monthly'] = json.loads(fig3.to_json())
+    
+    return plots
@@ -0,0 +1,225 @@
+"""Vectorized projection engine shared by the plots, the analysis and the chat context.
+
+Every figure and summary in the app is derived from the same handful of
+series: the savings balance for each year until retirement and, per child,
+the future college cost and the monthly savings it requires. They are
+computed here once, in closed form, and handed to every caller. Balances
+come from the cash-flow ledger (``financial_planner.ledger``), which also
+pays out college costs and retirement spending until ``LIFE_EXPECTANCY``.
+Every function takes the ``AssumptionSet`` to project with (see
+``financial_planner.assumptions``), the built-in values by default.
+"""
+import numpy as np
+
+# The model constants live with the assumption sets; re-exported here, where they used to be
+from financial_planner.assumptions import (  # noqa: F401
+    ANNUAL_RETURN_RATE,
+    ASSUMPTIONS,
+    COLLEGE_INFLATION_RATE,
+    COLLEGE_START_AGE,
+    COLLEGE_YEARS,
+    DEFAULT_ASSUMPTIONS,
+    ESTIMATED_ANNUAL_COLLEGE_COST,
+    INFLATION_RATE,
+    LIFE_EXPECTANCY,
+    RETIREMENT_EXPENSE_RATIO,
+    SAVINGS_RATE,
+    annuity_factors,
+    growth_factors,
+)
+from financial_planner.ledger import build_ledger
+
+
+def education_costs(child_ages, assumptions=DEFAULT_ASSUMPTIONS):
+    """Return (years_to_college, current_costs, projected_costs, monthly_required) arrays.
+
+    ``child_ages`` may be a flat list for one family or a 2-D array for a batch.
+    A child not yet at college age saves for the full cost, grown to the
+    year college starts, until then. At or past college age
+    (``years_to_college <= 0``) only the years still to attend are counted,
+    at today's prices, and they are to be saved over the next 12 months. A
+    child past college costs nothing.
+    """
+    child_ages = np.asarray(child_ages, dtype=int)
+    years_to_college = assumptions.college_start_age - child_ages
+    years_left = np.clip(COLLEGE_YEARS + np.minimum(years_to_college, 0), 0, COLLEGE_YEARS)
+    current_costs = (assumptions.estimated_annual_college_cost * years_left).astype(float)
+    waiting = np.maximum(years_to_college, 0)
+    inflation = growth_factors(assumptions.college_inflation_rate, int(waiting.max(initial=0)) + 1)
+    projected_costs = current_costs * inflation[waiting]
+    months = np.where(years_to_college > 0, years_to_college * 12, 12)
+    monthly_required = projected_costs / months
+    return years_to_college, current_costs, projected_costs, monthly_required
+
+
+def project_profile(user_profile, steps_per_year=1, assumptions=DEFAULT_ASSUMPTIONS):
+    """Compute every series and summary figure needed for one user profile.
+
+    ``savings`` holds the ledger balance at each age until retirement and
+    ``drawdown`` the balance from retirement to the end of the ledger.
+    """
+    current_age = user_profile['age']
+    retirement_age = user_profile['retirement_age']
+    annual_income = user_profile['annual_income']
+
+    annual_savings = annual_income * assumptions.savings_rate
+    years = np.arange(current_age, retirement_age + 1)
+    years_to_retirement = retirement_age - current_age
+
+    child_ages = [child['age'] for child in user_profile['children']]
+    years_to_college, current_costs, projected_costs, college_monthly = education_costs(child_ages, assumptions)
+
+    run = project_ledger(profiles_to_arrays([user_profile]), steps_per_year, assumptions=assumptions)
+    ledger = run['ledger'][0]
+    balances = np.append(ledger.opening[::steps_per_year], ledger.closing[-1])
+    retirement_index = max(years_to_retirement, 0)
+    depletion_age = float(run['depletion_age'][0])
+
+    monthly_retirement = annual_savings / 12
+    monthly_expenses_in_retirement = (annual_income * assumptions.retirement_expense_ratio) / 12
+    final_savings = float(run['retirement_balance'][0])
+
+    return {
+        'years': years,
+        'savings': balances[:len(years)],
+        'drawdown_years': np.arange(current_age + retirement_index, current_age + len(balances)),
+        'drawdown': balances[retirement_index:],
+        'ledger': ledger,
+        'depletion_age': None if np.isnan(depletion_age) else depletion_age,
+        'annual_savings': annual_savings,
+        'years_to_retirement': years_to_retirement,
+        'final_savings': final_savings,
+        'monthly_retirement': monthly_retirement,
+        'years_to_college': years_to_college,
+        'current_costs': current_costs,
+        'projected_costs': projected_costs,
+        'college_monthly': college_monthly,
+        'total_monthly': monthly_retirement + float(college_monthly.sum()),
+        'monthly_expenses_in_retirement': monthly_expenses_in_retirement,
+        'years_of_retirement_covered': final_savings / (monthly_expenses_in_retirement * 12),
+    }
+
+
+def profiles_to_arrays(user_profiles):
+    """Pack parsed user profiles into column arrays, padding children to a 2-D grid."""
+    count = len(user_profiles)
+    max_children = max((len(p['children']) for p in user_profiles), default=0)
+    child_ages = np.zeros((count, max_children), dtype=int)
+    child_mask = np.zeros((count, max_children), dtype=bool)
+    for i, profile in enumerate(user_profiles):
+        for j, child in enumerate(profile['children']):
+            child_ages[i, j] = child['age']
+            child_mask[i, j] = True
+    return {
+        'age': np.fromiter((p['age'] for p in user_profiles), dtype=int, count=count),
+        'retirement_age': np.fromiter((p['retirement_age'] for p in user_profiles), dtype=int, count=count),
+        'current_savings': np.fromiter((p['current_savings'] for p in user_profiles), dtype=float, count=count),
+        'annual_income': np.fromiter((p['annual_income'] for p in user_profiles), dtype=float, count=count),
+        'child_ages': child_ages,
+        'child_mask': child_mask,
+    }
+
+
+def project_ledger(arrays, steps_per_year=1, life_expectancy=LIFE_EXPECTANCY, savings_rate=None,
+                   assumptions=DEFAULT_ASSUMPTIONS):
+    """Run the cash-flow ledger for profiles packed by ``profiles_to_arrays``.
+
+    Each child saves its ``education_costs`` monthly requirement until
+    college starts and the college bills are paid from the same balance.
+    ``savings_rate`` may be a scalar or one rate per profile; by default it
+    is the assumption set's.
+    """
+    if savings_rate is None:
+        savings_rate = assumptions.savings_rate
+    years_to_college, _, _, college_monthly = education_costs(arrays['child_ages'], assumptions)
+    return build_ledger(
+        arrays['age'],
+        arrays['retirement_age'],
+        arrays['current_savings'],
+        arrays['annual_income'] * savings_rate,
+        arrays['annual_income'] * assumptions.retirement_expense_ratio,
+        years_to_college,
+        college_monthly * 12,
+        arrays['child_mask'],
+        annual_return_rate=assumptions.annual_return_rate,
+        inflation_rate=assumptions.inflation_rate,
+        college_annual_cost=assumptions.estimated_annual_college_cost,
+        college_inflation_rate=assumptions.college_inflation_rate,
+        college_years=COLLEGE_YEARS,
+        life_expectancy=life_expectancy,
+        steps_per_year=steps_per_year,
+    )
+
+
+def project_batch(arrays, include_trajectories=False, include_balances=False, assumptions=DEFAULT_ASSUMPTIONS):
+    """Project many profiles at once from the column arrays built by ``profiles_to_arrays``.
+
+    Returns one entry per profile in each array. Education arrays are 2-D
+    (profiles x children) and zero where ``child_mask`` is False. With
+    ``include_trajectories`` the savings series are returned as a 2-D array
+    padded with NaN past each profile's retirement age; ``include_balances``
+    adds ``balances``, the ledger balance at every age to the end of the
+    ledger (``steps`` + 1 values per profile, NaN after). ``depletion_age``
+    is NaN where savings last until ``LIFE_EXPECTANCY``.
+    """
+    annual_income = arrays['annual_income']
+    years_to_retirement = arrays['retirement_age'] - arrays['age']
+
+    annual_savings = annual_income * assumptions.savings_rate
+    run = project_ledger(arrays, assumptions=assumptions)
+    final_savings = run['retirement_balance']
+    depleted = ~np.isnan(run['depletion_age'])
+
+    mask = arrays['child_mask']
+    years_to_college, _, projected_costs, college_monthly = education_costs(arrays['child_ages'], assumptions)
+    projected_costs = np.where(mask, projected_costs, 0.0)
+    college_monthly = np.where(mask, college_monthly, 0.0)
+
+    monthly_retirement = annual_savings / 12
+    total_monthly = monthly_retirement + college_monthly.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        years_covered = final_savings / (annual_income * assumptions.retirement_expense_ratio)
+
+    # Same risk count as analyze_financial_health: retirement shortfall, savings
+    # running out before life expectancy, overall savings burden, and one per
+    # child with a high monthly requirement
+    half_monthly_income = annual_income / 24
+    risk_count = (
+        (years_covered < 20).astype(int)
+        + depleted
+        + (total_monthly > half_monthly_income)
+        + ((college_monthly > half_monthly_income[:, None]) & mask).sum(axis=1)
+    )
+    risk_level = np.where(risk_count == 0, 'LOW', np.where(risk_count <= 2, 'MODERATE', 'HIGH'))
+
+    batch = {
+        'years_to_retirement': years_to_retirement,
+        'annual_savings': annual_savings,
+        'final_savings': final_savings,
+        'monthly_retirement': monthly_retirement,
+        'years_to_college': np.where(mask, years_to_college, 0),
+        'projected_costs': projected_costs,
+        'college_monthly': college_monthly,
+        'total_monthly': total_monthly,
+        'years_of_retirement_covered': years_covered,
+        'depletion_age': run['depletion_age'],
+        'risk_count': risk_count,
+        'risk_level': risk_level,
+    }
+    if include_balances:
+        ledger = run['ledger']
+        rows = np.arange(len(years_to_retirement))
+        balances = np.full((len(rows), ledger.opening.shape[1] + 1), np.nan)
+        balances[:, :-1] = ledger.opening
+        balances[rows, run['steps']] = ledger.closing[rows, run['steps'] - 1]
+        batch['steps'] = run['steps']
+        batch['balances'] = balances
+    if include_trajectories:
+        # Ledger opening balances are the balance at each age; keep them up to retirement
+        width = int(np.maximum(years_to_retirement, 0).max(initial=0)) + 1
+        opening = run['ledger'].opening[:, :width]
+        trajectories = np.full((len(years_to_retirement), width), np.nan)
+        trajectories[:, :opening.shape[1]] = opening
+        trajectories[np.arange(width)[None, :] > years_to_retirement[:, None]] = np.nan
+        batch['trajectories'] = trajectories
+    return batch
@@ -0,0 +1,201 @@
+"""Saved scenarios: profiles, assumptions and result summaries in SQLite.
+
+Each scenario row holds:
+
+- the parsed ``user_profile``
+- the assumption values it was projected with
+- a compact summary: final savings, years covered, depletion age, total
+  monthly savings and risk level
+- the ledger balance curve, as raw float64 bytes
+
+Listing, filtering and comparing scenarios therefore never re-runs a
+projection. Profiles are projected in one array pass per call and inserted
+in a single transaction. Lookups by user, risk level and creation time use
+indexes. The database runs in WAL mode, so readers do not block the writer.
+Each worker thread keeps one connection open and reuses it.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from financial_planner.projection import DEFAULT_ASSUMPTIONS, profiles_to_arrays, project_batch
+
+DEFAULT_LIST_LIMIT = 100
+MAX_LIST_LIMIT = 1000
+
+# Profiles projected and written per transaction by ``reproject``
+REPROJECT_CHUNK_SIZE = 4096
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS scenarios ('
+    ' id INTEGER PRIMARY KEY, user_id TEXT, name TEXT, created_at REAL NOT NULL,'
+    ' profile TEXT NOT NULL, assumptions TEXT NOT NULL, risk_level TEXT NOT NULL,'
+    ' final_savings REAL NOT NULL, years_covered REAL NOT NULL, depletion_age REAL,'
+    ' total_monthly REAL NOT NULL, start_age INTEGER NOT NULL, curve BLOB NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS scenarios_user ON scenarios (user_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS scenarios_risk ON scenarios (risk_level, created_at)',
+    'CREATE INDEX IF NOT EXISTS scenarios_created ON scenarios (created_at)',
+)
+
+_SUMMARY_COLUMNS = (
+    'id', 'user_id', 'name', 'created_at', 'risk_level', 'final_savings',
+    'years_covered', 'depletion_age', 'total_monthly',
+)
+
+
+def summarize(user_profiles, assumptions=DEFAULT_ASSUMPTIONS):
+    """Project parsed profiles together; return one summary dict per profile, with its curve."""
+    batch = project_batch(profiles_to_arrays(user_profiles), include_balances=True, assumptions=assumptions)
+    columns = zip(
+        batch['risk_level'].tolist(),
+        batch['final_savings'].tolist(),
+        batch['years_of_retirement_covered'].tolist(),
+        batch['depletion_age'].tolist(),
+        batch['total_monthly'].tolist(),
+        batch['steps'].tolist(),
+    )
+    return [
+        {
+            'risk_level': risk_level,
+            'final_savings': final_savings,
+            'years_covered': years_covered,
+            'depletion_age': None if depletion_age != depletion_age else depletion_age,
+            'total_monthly': total_monthly,
+            'curve': batch['balances'][i, :steps + 1],
+        }
+        for i, (risk_level, final_savings, years_covered, depletion_age, total_monthly, steps)
+        in enumerate(columns)
+    ]
+
+
+class SQLiteScenarioStore:
+    """Scenario repository in a SQLite file shared by every worker process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def save_many(self, user_profiles, user_id=None, names=None, assumptions=DEFAULT_ASSUMPTIONS):
+        """Project parsed profiles with ``assumptions`` and insert them in one transaction; return their IDs."""
+        if not user_profiles:
+            return []
+        names = names or [None] * len(user_profiles)
+        now = time.time()
+        values = json.dumps(assumptions.values, sort_keys=True)
+        rows = [
+            (user_id, name, now, json.dumps(profile, separators=(',', ':')), values,
+             summary['risk_level'], summary['final_savings'], summary['years_covered'],
+             summary['depletion_age'], summary['total_monthly'], profile['age'], summary['curve'].tobytes())
+            for profile, name, summary in zip(user_profiles, names, summarize(user_profiles, assumptions))
+        ]
+        with self._connect() as conn:
+            # Take the write lock before reading the next ID, so concurrent writers cannot share IDs
+            conn.execute('BEGIN IMMEDIATE')
+            first = conn.execute('SELECT COALESCE(MAX(id), 0) FROM scenarios').fetchone()[0] + 1
+            conn.executemany(
+                'INSERT INTO scenarios (id, user_id, name, created_at, profile, assumptions, risk_level,'
+                ' final_savings, years_covered, depletion_age, total_monthly, start_age, curve)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(first + i, *row) for i, row in enumerate(rows)],
+            )
+        return list(range(first, first + len(rows)))
+
+    def list(self, user_id=None, risk_level=None, since=None, until=None, limit=DEFAULT_LIST_LIMIT):
+        """Summaries of matching scenarios, newest first, without profiles or curves.
+
+        ``limit`` is clamped to 1 .. ``MAX_LIST_LIMIT``; SQLite reads a negative one as no limit.
+        """
+        clauses, params = [], []
+        for column, operator, value in (
+                ('user_id', '=', user_id), ('risk_level', '=', risk_level),
+                ('created_at', '>=', since), ('created_at', '<', until)):
+            if value is not None:
+                clauses.append(f'{column} {operator} ?')
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        params.append(max(1, min(int(limit), MAX_LIST_LIMIT)))
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM scenarios{where}"
+            ' ORDER BY created_at DESC, id DESC LIMIT ?',
+            params,
+        ).fetchall()
+        return [dict(zip(_SUMMARY_COLUMNS, row)) for row in rows]
+
+    def get_many(self, scenario_ids):
+        """Full scenarios (summary, profile, assumptions, ``ages`` and ``curve``) in the order asked.
+
+        IDs that do not exist are left out.
+        """
+        scenario_ids = [int(scenario_id) for scenario_id in scenario_ids]
+        if not scenario_ids:
+            return []
+        rows = self._connect().execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)}, profile, assumptions, start_age, curve FROM scenarios"
+            f" WHERE id IN ({', '.join('?' * len(scenario_ids))})",
+            scenario_ids,
+        ).fetchall()
+        found = {}
+        for row in rows:
+            scenario = dict(zip(_SUMMARY_COLUMNS, row))
+            profile, assumptions, start_age, curve = row[len(_SUMMARY_COLUMNS):]
+            scenario['profile'] = json.loads(profile)
+            scenario['assumptions'] = json.loads(assumptions)
+            scenario['curve'] = np.frombuffer(curve, dtype=np.float64)
+            scenario['ages'] = np.arange(start_age, start_age + len(scenario['curve']))
+            found[scenario['id']] = scenario
+        return [found[scenario_id] for scenario_id in scenario_ids if scenario_id in found]
+
+    def reproject(self, chunk_size=REPROJECT_CHUNK_SIZE, assumptions=DEFAULT_ASSUMPTIONS):
+        """Re-project every saved profile with ``assumptions``; return the count.
+
+        Meant for a nightly job after the model changes; each chunk is read,
+        projected in one array pass and written back in one transaction.
+        """
+        conn = self._connect()
+        values = json.dumps(assumptions.values, sort_keys=True)
+        last_id, count = 0, 0
+        while True:
+            rows = conn.execute(
+                'SELECT id, profile FROM scenarios WHERE id > ? ORDER BY id LIMIT ?', (last_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                return count
+            profiles = [json.loads(profile) for _, profile in rows]
+            updates = [
+                (values, summary['risk_level'], summary['final_savings'], summary['years_covered'],
+                 summary['depletion_age'], summary['total_monthly'], summary['curve'].tobytes(), scenario_id)
+                for (scenario_id, _), summary in zip(rows, summarize(profiles, assumptions))
+            ]
+            with conn:
+                conn.executemany(
+                    'UPDATE scenarios SET assumptions = ?, risk_level = ?, final_savings = ?, years_covered = ?,'
+                    ' depletion_age = ?, total_monthly = ?, curve = ? WHERE id = ?',
+                    updates,
+                )
+            last_id = rows[-1][0]
+            count += len(rows)
+
+
+def create_scenario_store(instance_path):
+    """Build the store from SCENARIO_STORE_PATH, by default in the app's ``instance_path``.
+
+    The file, and its directory, are created on first use.
+    """
+    return SQLiteScenarioStore(os.getenv('SCENARIO_STORE_PATH') or os.path.join(instance_path, 'scenarios.sqlite3'))
@@ -0,0 +1,238 @@
+"""Goal solver: the savings rate, retirement age or college saving a target needs.
+
+A retirement target is met when the balance at retirement covers
+``target_years`` of retirement spending (``years_of_retirement_covered``)
+and, unless ``last_until`` is None, the ledger balance pays every bill
+until that age. These are the two retirement risks ``analyze_financial_health``
+reports, so solving with the defaults clears both.
+
+Until retirement the ledger balance is affine in the savings rate as long as
+college bills never empty it, so the required rate comes in closed form from
+one ledger run: the retirement balance the target needs (the running maximum
+of discounted post-retirement spending) less the balance already reached,
+divided by the annuity factor of the income. When college bills do empty the
+balance that relation bends, and the rate is found by vectorized bisection:
+each round evaluates a grid of candidate rates as one ledger batch. The
+earliest retirement age is one ledger batch over every candidate age, and the
+per-child college saving is a sinking-fund annuity. Every solver takes the
+``AssumptionSet`` to solve under, the built-in values by default.
+"""
+import numpy as np
+
+from financial_planner.projection import (
+    ANNUAL_RETURN_RATE,
+    COLLEGE_YEARS,
+    DEFAULT_ASSUMPTIONS,
+    LIFE_EXPECTANCY,
+    annuity_factors,
+    education_costs,
+    growth_factors,
+    profiles_to_arrays,
+    project_ledger,
+)
+
+GOALS = ('savings_rate', 'retirement_age', 'college_contribution')
+
+# Matches the "savings may only last N years" risk in analyze_financial_health
+DEFAULT_TARGET_YEARS = 20
+
+MAX_SAVINGS_RATE = 1.0
+
+# Candidate rates per bisection round; 4 rounds of 32 intervals narrow [0, 1] to about 1e-6
+BISECTION_POINTS = 33
+BISECTION_ROUNDS = 4
+
+# Closed-form answers land exactly on the target; aim this far above it so rounding cannot miss
+TARGET_MARGIN = 1e-9
+
+
+def annuity_factor(num_years, annual_return_rate=ANNUAL_RETURN_RATE):
+    """Value after ``num_years`` of a yearly payment of 1, paid at each year end."""
+    return annuity_factors(annual_return_rate, num_years)
+
+
+def _meets_target(run, annual_income, target_years, last_until, assumptions=DEFAULT_ASSUMPTIONS):
+    """Per-profile mask of ledger runs that reach the target."""
+    met = run['retirement_balance'] >= target_years * annual_income * assumptions.retirement_expense_ratio
+    if last_until is not None:
+        # NaN (never depleted) compares False
+        met &= ~(run['depletion_age'] < last_until)
+    return met
+
+
+def _required_balance(run, age, target_years, annual_income, last_until, assumptions=DEFAULT_ASSUMPTIONS):
+    """Smallest retirement balance meeting the target, for the first profile of ``run``.
+
+    After retirement the savings rate no longer matters, so the balance at
+    ``last_until`` is the retirement balance plus the discounted sum of the
+    remaining flows. It stays above zero at every step if the retirement
+    balance covers the deepest point of that running sum.
+    """
+    required = target_years * annual_income * assumptions.retirement_expense_ratio
+    if last_until is None:
+        return required
+    ledger = run['ledger'][0]
+    start = int(run['retirement_step'][0])
+    stop = min(int(np.ceil(last_until - age)), int(run['steps'][0]))
+    flow = (ledger.contribution - ledger.college - ledger.drawdown)[start:stop]
+    discount = growth_factors(assumptions.annual_return_rate, len(flow) + 1)[1:]
+    deepest = np.cumsum(flow / discount).min(initial=0.0)
+    return max(required, -deepest)
+
+
+def _repeat(arrays, count):
+    return {name: np.repeat(values, count, axis=0) for name, values in arrays.items()}
+
+
+def _outcome(final_savings, annual_income, depletion_age=None, assumptions=DEFAULT_ASSUMPTIONS):
+    return {
+        'final_savings': float(final_savings),
+        'years_of_retirement_covered': float(final_savings / (annual_income * assumptions.retirement_expense_ratio)),
+        'depletion_age': None if depletion_age is None or np.isnan(depletion_age) else float(depletion_age),
+    }
+
+
+def _bisect_savings_rate(arrays, target_years, last_until, assumptions=DEFAULT_ASSUMPTIONS):
+    """Lowest feasible rate in [0, MAX_SAVINGS_RATE], or None; each round is one ledger batch."""
+    income = arrays['annual_income'][0]
+    batch = _repeat(arrays, BISECTION_POINTS)
+    low, high = 0.0, MAX_SAVINGS_RATE
+    best = None
+    for _ in range(BISECTION_ROUNDS):
+        rates = np.linspace(low, high, BISECTION_POINTS)
+        run = project_ledger(batch, savings_rate=rates, assumptions=assumptions)
+        met = _meets_target(run, income, target_years, last_until, assumptions)
+        if not met.any():
+            return None
+        first = int(met.argmax())
+        best = (rates[first], run['retirement_balance'][first], run['depletion_age'][first])
+        if first == 0:
+            break
+        low, high = rates[first - 1], rates[first]
+    return best
+
+
+def solve_savings_rate(user_profile, target_years=DEFAULT_TARGET_YEARS, last_until=LIFE_EXPECTANCY,
+                       assumptions=DEFAULT_ASSUMPTIONS):
+    """Minimum share of income to save until retirement for the target to be met."""
+    income = user_profile['annual_income']
+    savings_rate = assumptions.savings_rate
+    working_years = max(user_profile['retirement_age'] - user_profile['age'], 0)
+    arrays = profiles_to_arrays([user_profile])
+    run = project_ledger(arrays, assumptions=assumptions)
+    required = _required_balance(run, user_profile['age'], target_years, income, last_until, assumptions)
+    required *= 1 + TARGET_MARGIN
+    base_balance = run['retirement_balance'][0]
+
+    result = {
+        'goal': 'savings_rate',
+        'current': savings_rate,
+        'target': {'years_covered': target_years, 'last_until': last_until},
+    }
+    slope = income * annuity_factor(working_years, assumptions.annual_return_rate)
+    if slope > 0:
+        rate = max(savings_rate + (required - base_balance) / slope, 0.0)
+        # Saving more than today keeps the balance above zero wherever it already was,
+        # so without college shortfalls the affine solution needs no check
+        exact = run['college_shortfall'][0] == 0 and savings_rate <= rate <= MAX_SAVINGS_RATE
+        if rate <= MAX_SAVINGS_RATE and not exact:
+            check = project_ledger(arrays, savings_rate=rate, assumptions=assumptions)
+            exact = bool(_meets_target(check, income, target_years, last_until, assumptions)[0])
+        if exact:
+            final_savings = base_balance + (rate - savings_rate) * slope
+            return dict(result, value=float(rate), feasible=True, method='closed_form',
+                        outcome=_outcome(final_savings, income, assumptions=assumptions))
+
+    solution = _bisect_savings_rate(arrays, target_years, last_until, assumptions)
+    if solution is None:
+        return dict(result, value=None, feasible=False, method='bisection', outcome=None)
+    rate, final_savings, depletion_age = solution
+    return dict(result, value=float(rate), feasible=True, method='bisection',
+                outcome=_outcome(final_savings, income, depletion_age, assumptions))
+
+
+def solve_retirement_age(user_profile, target_years=DEFAULT_TARGET_YEARS, last_until=LIFE_EXPECTANCY,
+                         assumptions=DEFAULT_ASSUMPTIONS):
+    """Earliest whole retirement age at today's savings rate for which the target is met.
+
+    Every candidate age up to ``LIFE_EXPECTANCY`` is projected in one ledger batch.
+    """
+    income = user_profile['annual_income']
+    candidates = np.arange(user_profile['age'] + 1, LIFE_EXPECTANCY + 1)
+    result = {
+        'goal': 'retirement_age',
+        'current': user_profile['retirement_age'],
+        'target': {'years_covered': target_years, 'last_until': last_until},
+        'method': 'search',
+    }
+    if len(candidates):
+        arrays = _repeat(profiles_to_arrays([user_profile]), len(candidates))
+        arrays['retirement_age'] = candidates
+        run = project_ledger(arrays, assumptions=assumptions)
+        met = _meets_target(run, income, target_years, last_until, assumptions)
+        if met.any():
+            first = int(met.argmax())
+            return dict(result, value=int(candidates[first]), feasible=True,
+                        outcome=_outcome(run['retirement_balance'][first], income, run['depletion_age'][first],
+                                         assumptions))
+    return dict(result, value=None, feasible=False, outcome=None)
+
+
+def solve_college_contribution(user_profile, assumptions=DEFAULT_ASSUMPTIONS):
+    """Monthly saving per child that fully pays that child's college bills.
+
+    Savings earn the annual return rate until the bills are paid, so this is
+    less than the undiscounted ``college_monthly`` figure. A child already in
+    college cannot save ahead; their ``monthly`` is None and
+    ``remaining_cost`` is what is still to pay.
+    """
+    child_ages = [child['age'] for child in user_profile['children']]
+    years_to_college, _, _, current_monthly = education_costs(child_ages, assumptions)
+    rate = assumptions.annual_return_rate
+
+    # Bill for each college year, paid at that year's end as in the ledger; past years cost nothing
+    college_year = np.maximum(years_to_college[:, None] + np.arange(COLLEGE_YEARS), -1)
+    horizon = int(college_year.max(initial=0)) + 2
+    growth = growth_factors(rate, horizon)
+    college_price = growth_factors(assumptions.college_inflation_rate, horizon)
+    bills = assumptions.estimated_annual_college_cost * college_price[np.maximum(college_year, 0)]
+    present_value = np.where(college_year >= 0, bills / growth[college_year + 1], 0.0).sum(axis=1)
+
+    saving_years = np.maximum(years_to_college, 0)
+    # Present value of paying 1 a year for saving_years years
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annual = np.where(saving_years > 0,
+                          present_value / (annuity_factor(saving_years, rate) / growth[saving_years]), np.nan)
+    monthly = annual / 12
+
+    children = []
+    for age, years, required, current, cost in zip(
+            child_ages, years_to_college.tolist(), monthly.tolist(), current_monthly.tolist(),
+            present_value.tolist()):
+        savable = years > 0
+        children.append({
+            'age': age,
+            'years_to_college': years,
+            'monthly': required if savable else (0.0 if cost == 0 else None),
+            'current_plan_monthly': current,
+            'remaining_cost': None if savable else cost,
+        })
+    return {
+        'goal': 'college_contribution',
+        'value': float(np.nansum(monthly)),
+        'feasible': all(child['monthly'] is not None for child in children),
+        'method': 'closed_form',
+        'children': children,
+    }
+
+
+def solve_goal(user_profile, goal, target_years=DEFAULT_TARGET_YEARS, last_until=LIFE_EXPECTANCY,
+               assumptions=DEFAULT_ASSUMPTIONS):
+    """Dispatch to the solver for ``goal``; raises ValueError for an unknown goal."""
+    if goal == 'savings_rate':
+        return solve_savings_rate(user_profile, target_years, last_until, assumptions)
+    if goal == 'retirement_age':
+        return solve_retirement_age(user_profile, target_years, last_until, assumptions)
+    if goal == 'college_contribution':
+        return solve_college_contribution(user_profile, assumptions)
+    raise ValueError(f"Unknown goal {goal!r}; expected one of {', '.join(GOALS)}")
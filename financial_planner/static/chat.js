@@ -8,6 +8,7 @@ $(document).ready(function() {
     const closeButton = $('#closeChatbox');
     
     let financialData = null;
+    let contextId = null;
 
     // Show/hide chat toggle button based on form submission
     function updateChatVisibility() {
@@ -16,6 +17,11 @@ $(document).ready(function() {
         }
     }
 
+    // Remember the context ID /calculate stored for this plan
+    $(document).on('financial:calculated', function(e, response) {
+        contextId = response.context_id || null;
+    });
+
     // Toggle chatbox
     chatToggle.click(function() {
         chatbox.show();
@@ -36,27 +42,108 @@ $(document).ready(function() {
             appendMessage('user', message);
             chatInput.val('');
 
-            // Send to server
-            $.ajax({
-                url: '/chat',
-                method: 'POST',
-                contentType: 'application/json',
-                data: JSON.stringify({
-                    message: message,
-                    financialData: financialData
-                }),
-                success: function(response) {
-                    if (response.success) {
-                        appendMessage('assistant', response.response);
-                    } else {
-                        appendMessage('assistant', 'I apologize, but I encountered an error. Please try again.');
-                    }
-                },
-                error: function() {
+            // Stream the reply where the browser supports it, otherwise wait for the full response
+            if (window.fetch && window.ReadableStream && window.TextDecoder) {
+                streamReply(message);
+            } else {
+                requestReply(message);
+            }
+        }
+    }
+
+    // Request the whole reply as one JSON response
+    function requestReply(message) {
+        $.ajax({
+            url: '/chat',
+            method: 'POST',
+            contentType: 'application/json',
+            data: JSON.stringify({
+                message: message,
+                contextId: contextId,
+                financialData: financialData
+            }),
+            success: function(response) {
+                if (response.success) {
+                    appendMessage('assistant', response.response);
+                } else {
+                    appendMessage('assistant', 'I apologize, but I encountered an error. Please try again.');
+                }
+            },
+            error: function(xhr) {
+                if (xhr.responseJSON && xhr.responseJSON.response) {
+                    // Rejected financial details, explained field by field
+                    appendMessage('assistant', xhr.responseJSON.response);
+                } else {
                     appendMessage('assistant', 'Sorry, I\'m having trouble connecting. Please try again later.');
                 }
+            }
+        });
+    }
+
+    // Render the reply token by token from the Server-Sent Events stream
+    function streamReply(message) {
+        const messageDiv = appendMessage('assistant', '');
+        let reply = '';
+        let buffer = '';
+
+        function handleFrame(frame) {
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(function(line) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    data += line.slice(6);
+                }
             });
+            if (!data) {
+                return;
+            }
+            const payload = JSON.parse(data);
+            if (event === 'error') {
+                messageDiv.text('I apologize, but I encountered an error. Please try again.');
+            } else if (payload.delta) {
+                reply += payload.delta;
+                messageDiv.text(reply);
+                chatMessages.scrollTop(chatMessages[0].scrollHeight);
+            }
         }
+
+        fetch('/chat', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json', 'Accept': 'text/event-stream'},
+            body: JSON.stringify({
+                message: message,
+                contextId: contextId,
+                financialData: financialData,
+                stream: true
+            })
+        }).then(function(response) {
+            // Requests rejected before streaming starts get a JSON body instead of events
+            if ((response.headers.get('Content-Type') || '').startsWith('application/json')) {
+                return response.json().then(function(body) {
+                    messageDiv.text(body.response || 'I apologize, but I encountered an error. Please try again.');
+                });
+            }
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+
+            function read() {
+                return reader.read().then(function(result) {
+                    if (result.done) {
+                        return;
+                    }
+                    buffer += decoder.decode(result.value, {stream: true});
+                    const frames = buffer.split('\n\n');
+                    buffer = frames.pop();
+                    frames.forEach(handleFrame);
+                    return read();
+                });
+            }
+            return read();
+        }).catch(function() {
+            messageDiv.text('Sorry, I\'m having trouble connecting. Please try again later.');
+        });
     }
 
     // Append message to chat
@@ -68,6 +155,7 @@ $(document).ready(function() {
         
         chatMessages.append(messageDiv);
         chatMessages.scrollTop(chatMessages[0].scrollHeight);
+        return messageDiv;
     }
 
     // Event listeners
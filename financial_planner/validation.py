@@ -0,0 +1,454 @@
+"""Profile schema: the one parser and validator every endpoint uses.
+
+``/calculate``, ``/calculate/batch``, ``/solve``, ``/sensitivity``,
+``/scenarios`` and ``/chat`` (its ``financialData``) all parse profiles
+here, into the plain dict the engines, cache keys and saved scenarios use:
+
+- ``age``: integer, ``MIN_AGE`` up to below ``LIFE_EXPECTANCY``
+- ``retirement_age``: integer, above ``age`` and at most ``LIFE_EXPECTANCY``
+- ``current_savings``: finite number, zero or more
+- ``annual_income``: finite number above zero
+- ``children``: up to ``MAX_CHILDREN`` objects, each with an integer
+  ``age`` from 0 up to below the parent's age and an ``education_goal``
+  from ``EDUCATION_GOALS``
+
+Integers may arrive as whole floats or numeric strings, and numbers as
+numeric strings, since form fields are text. Anything else is rejected
+before any projection or LLM call. Every problem is reported at once in a
+``ProfileError``, with the path of the field it concerns, and the app turns
+that into a 400 response. ``parse_assumptions`` checks assumption
+overrides (see ``financial_planner.assumptions``) the same way, and
+``parse_sensitivity_axes`` the ``/sensitivity`` axes.
+"""
+import math
+
+import numpy as np
+
+from financial_planner.assumptions import LIFE_EXPECTANCY
+from financial_planner.montecarlo import DEFAULT_PATHS, MAX_PATHS
+from financial_planner.sensitivity import MAX_GRID_CELLS, default_axes, grid_cells
+from financial_planner.solver import DEFAULT_TARGET_YEARS
+
+# The planner models working adults saving for retirement
+MIN_AGE = 18
+MAX_CHILDREN = 20
+EDUCATION_GOALS = ('college', 'university')
+# Problems listed per response; a bad bulk upload would otherwise echo every row
+MAX_ERRORS = 50
+# Longest saved scenario ``user_id`` or ``name``
+MAX_LABEL_LENGTH = 200
+# Most ``/solve`` target years; longer than any retirement
+MAX_TARGET_YEARS = 100
+
+
+class ProfileError(ValueError):
+    """Invalid profile input; ``errors`` holds one ``{'field', 'message'}`` dict per problem."""
+
+    def __init__(self, errors):
+        self.errors = errors[:MAX_ERRORS]
+        super().__init__('; '.join(f"{error['field']}: {error['message']}" for error in self.errors))
+
+    title = 'Invalid profile'
+
+    def to_dict(self):
+        return {'error': self.title, 'errors': self.errors}
+
+
+class AssumptionsError(ProfileError):
+    """Invalid assumption overrides or an unknown assumption set."""
+
+    title = 'Invalid assumptions'
+
+
+class ChatMessageError(ProfileError):
+    """A ``/chat`` message that is not text or does not fit the prompt budget."""
+
+    title = 'Invalid message'
+
+
+class SensitivityError(ProfileError):
+    """Invalid or oversized ``/sensitivity`` axes."""
+
+    title = 'Invalid sensitivity axes'
+
+
+def _integer(value):
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, int):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise ValueError
+
+
+def _number(value):
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, (int, float)):
+        try:
+            number = float(value)
+        except OverflowError:
+            # An integer past the float range, such as a JSON 1 followed by 400 zeros
+            raise ValueError
+    elif isinstance(value, str):
+        number = float(value.strip())
+    else:
+        raise ValueError
+    if not math.isfinite(number):
+        raise ValueError
+    return number
+
+
+_KINDS = {_integer: 'an integer', _number: 'a number'}
+
+# Assumptions a set or request may override, as (parser, lowest, highest); rates stay above -100%
+ASSUMPTION_LIMITS = {
+    'annual_return_rate': (_number, -0.1, 0.2),
+    'savings_rate': (_number, 0.0, 1.0),
+    'college_start_age': (_integer, 14, 25),
+    'estimated_annual_college_cost': (_number, 0.0, 1_000_000.0),
+    'college_inflation_rate': (_number, -0.05, 0.2),
+    'retirement_expense_ratio': (_number, 0.1, 3.0),
+    'inflation_rate': (_number, -0.05, 0.2),
+}
+
+
+def _field(data, name, parse, prefix, errors):
+    value = data.get(name)
+    # Exact JSON types skip the conversion rules
+    if type(value) is int and parse is _integer:
+        return value
+    if type(value) is float and parse is _number and math.isfinite(value):
+        return value
+    if value is None:
+        errors.append({'field': prefix + name, 'message': 'is required'})
+        return None
+    try:
+        return parse(value)
+    except (TypeError, ValueError):
+        errors.append({'field': prefix + name, 'message': f'must be {_KINDS[parse]}'})
+        return None
+
+
+def _parse(data, prefix, errors):
+    """Parse one profile, appending problems to ``errors``; return the profile dict or None.
+
+    Messages are only formatted for failed checks, which keeps bulk parsing fast.
+    """
+    if not isinstance(data, dict):
+        errors.append({'field': prefix.rstrip('.') or 'body', 'message': 'must be an object'})
+        return None
+    count = len(errors)
+    age = _field(data, 'age', _integer, prefix, errors)
+    retirement_age = _field(data, 'retirement_age', _integer, prefix, errors)
+    current_savings = _field(data, 'current_savings', _number, prefix, errors)
+    annual_income = _field(data, 'annual_income', _number, prefix, errors)
+
+    if age is not None and not MIN_AGE <= age < LIFE_EXPECTANCY:
+        errors.append({'field': prefix + 'age', 'message': f'must be at least {MIN_AGE} and below {LIFE_EXPECTANCY}'})
+    if retirement_age is not None and age is not None and not age < retirement_age <= LIFE_EXPECTANCY:
+        errors.append({'field': prefix + 'retirement_age',
+                       'message': f'must be above age and at most {LIFE_EXPECTANCY}'})
+    if current_savings is not None and current_savings < 0:
+        errors.append({'field': prefix + 'current_savings', 'message': 'must not be negative'})
+    if annual_income is not None and annual_income <= 0:
+        errors.append({'field': prefix + 'annual_income', 'message': 'must be above zero'})
+
+    children = []
+    raw_children = data.get('children', [])
+    if not isinstance(raw_children, list):
+        errors.append({'field': prefix + 'children', 'message': 'must be a list'})
+    elif len(raw_children) > MAX_CHILDREN:
+        errors.append({'field': prefix + 'children', 'message': f'must have at most {MAX_CHILDREN} entries'})
+    else:
+        for i, child in enumerate(raw_children):
+            if not isinstance(child, dict):
+                errors.append({'field': f'{prefix}children[{i}]', 'message': 'must be an object'})
+                continue
+            child_age = child.get('age')
+            if type(child_age) is not int:
+                child_age = _field(child, 'age', _integer, f'{prefix}children[{i}].', errors)
+            if child_age is not None and not (0 <= child_age and (age is None or child_age < age)):
+                errors.append({'field': f'{prefix}children[{i}].age',
+                               'message': "must be zero or more and below the parent's age"})
+            goal = child.get('education_goal')
+            if goal not in EDUCATION_GOALS:
+                errors.append({'field': f'{prefix}children[{i}].education_goal',
+                               'message': f"must be one of {', '.join(EDUCATION_GOALS)}"})
+            children.append({'age': child_age, 'education_goal': goal})
+
+    if len(errors) > count:
+        return None
+    return {
+        'age': age,
+        'current_savings': current_savings,
+        'annual_income': annual_income,
+        'retirement_age': retirement_age,
+        'children': children,
+    }
+
+
+def parse_user_profile(data, prefix=''):
+    """Validate the JSON fields posted by the input form and build a user profile.
+
+    ``prefix`` is prepended to field paths in errors. Raises ``ProfileError``.
+    """
+    errors = []
+    profile = _parse(data, prefix, errors)
+    if errors:
+        raise ProfileError(errors)
+    return profile
+
+
+def parse_user_profiles(items, field='profiles'):
+    """Validate a list of profiles in one pass; errors name each entry as ``field[i]``.
+
+    Raises ``ProfileError`` listing the problems of every invalid entry.
+    """
+    if not isinstance(items, list):
+        raise ProfileError([{'field': field, 'message': 'must be a list'}])
+    errors = []
+    profiles = [_parse(data, f'{field}[{i}].', errors) for i, data in enumerate(items)]
+    if errors:
+        raise ProfileError(errors)
+    return profiles
+
+
+def _parse_assumptions(data, prefix, errors):
+    if not isinstance(data, dict):
+        errors.append({'field': prefix.rstrip('.'), 'message': 'must be an object'})
+        return {}
+    overrides = {}
+    for name, value in data.items():
+        field = prefix + str(name)
+        if name not in ASSUMPTION_LIMITS:
+            # life_expectancy bounds the profile ranges above, so it is fixed
+            message = 'cannot be changed' if name == 'life_expectancy' else 'is not an assumption'
+            errors.append({'field': field, 'message': message})
+            continue
+        parse, low, high = ASSUMPTION_LIMITS[name]
+        try:
+            value = parse(value)
+        except (TypeError, ValueError):
+            errors.append({'field': field, 'message': f'must be {_KINDS[parse]}'})
+            continue
+        if not low <= value <= high:
+            errors.append({'field': field, 'message': f'must be from {low:g} to {high:g}'})
+            continue
+        overrides[name] = value
+    return overrides
+
+
+def parse_assumptions(data, prefix='assumptions.'):
+    """Validate an object of assumption overrides; return them parsed. Raises ``AssumptionsError``."""
+    errors = []
+    overrides = _parse_assumptions(data, prefix, errors)
+    if errors:
+        raise AssumptionsError(errors)
+    return overrides
+
+
+def parse_assumption_sets(data):
+    """Validate ``{name: overrides}`` as read from an assumptions file. Raises ``AssumptionsError``."""
+    if not isinstance(data, dict):
+        raise AssumptionsError([{'field': 'assumptions', 'message': 'must map set names to objects'}])
+    errors = []
+    sets = {name: _parse_assumptions(overrides, f'{name}.', errors) for name, overrides in data.items()}
+    if errors:
+        raise AssumptionsError(errors)
+    return sets
+
+
+def parse_monte_carlo_options(monte_carlo, prefix='monte_carlo.'):
+    """Validate the ``/calculate`` ``monte_carlo`` setting: false, true or ``{'paths', 'seed'}``.
+
+    Returns None when no simulation is asked for, otherwise ``{'paths', 'seed'}``
+    with ``paths`` from 1 to ``MAX_PATHS`` and ``seed`` a non-negative
+    integer or None. Raises ``ProfileError``.
+    """
+    if monte_carlo is None or monte_carlo is False:
+        return None
+    if monte_carlo is True:
+        monte_carlo = {}
+    if not isinstance(monte_carlo, dict):
+        raise ProfileError([{'field': prefix.rstrip('.'), 'message': 'must be true, false or an object'}])
+    errors = []
+    paths = monte_carlo.get('paths', DEFAULT_PATHS)
+    try:
+        paths = _integer(paths)
+    except (TypeError, ValueError):
+        errors.append({'field': prefix + 'paths', 'message': 'must be an integer'})
+    else:
+        if not 1 <= paths <= MAX_PATHS:
+            errors.append({'field': prefix + 'paths', 'message': f'must be from 1 to {MAX_PATHS}'})
+    seed = monte_carlo.get('seed')
+    if seed is not None:
+        try:
+            seed = _integer(seed)
+        except (TypeError, ValueError):
+            errors.append({'field': prefix + 'seed', 'message': 'must be an integer or null'})
+        else:
+            if seed < 0:
+                errors.append({'field': prefix + 'seed', 'message': 'must not be negative'})
+    if errors:
+        raise ProfileError(errors)
+    return {'paths': paths, 'seed': seed}
+
+
+def parse_solve_options(data, user_profile):
+    """Validate the ``/solve`` ``target_years`` and ``last_until`` of ``data``, or their defaults.
+
+    ``target_years`` is a number above 0 and at most ``MAX_TARGET_YEARS``;
+    ``last_until`` is null (no longevity check) or an age above the
+    profile's and at most ``LIFE_EXPECTANCY``. Returns both as floats or
+    None. Raises ``ProfileError``.
+    """
+    errors = []
+    target_years = data.get('target_years', DEFAULT_TARGET_YEARS)
+    try:
+        target_years = _number(target_years)
+    except (TypeError, ValueError):
+        errors.append({'field': 'target_years', 'message': 'must be a number'})
+    else:
+        if not 0 < target_years <= MAX_TARGET_YEARS:
+            errors.append({'field': 'target_years', 'message': f'must be above 0 and at most {MAX_TARGET_YEARS}'})
+    last_until = data.get('last_until', LIFE_EXPECTANCY)
+    if last_until is not None:
+        try:
+            last_until = _number(last_until)
+        except (TypeError, ValueError):
+            errors.append({'field': 'last_until', 'message': 'must be a number or null'})
+        else:
+            if not user_profile['age'] < last_until <= LIFE_EXPECTANCY:
+                errors.append({'field': 'last_until', 'message': f'must be above age and at most {LIFE_EXPECTANCY}'})
+    if errors:
+        raise ProfileError(errors)
+    return {'target_years': target_years, 'last_until': last_until}
+
+def _label(value, field, errors):
+    if value is not None and not (isinstance(value, str) and len(value) <= MAX_LABEL_LENGTH):
+        errors.append({'field': field, 'message': f'must be a string of at most {MAX_LABEL_LENGTH} characters'})
+
+
+def parse_scenario_labels(user_id, names, field=None):
+    """Check a saved scenario's optional ``user_id`` and each entry's optional ``name``.
+
+    Errors name the entries ``field[i].name``, or ``name`` when ``field`` is
+    None (a single scenario). Raises ``ProfileError``.
+    """
+    errors = []
+    _label(user_id, 'user_id', errors)
+    for i, name in enumerate(names):
+        _label(name, 'name' if field is None else f'{field}[{i}].name', errors)
+    if errors:
+        raise ProfileError(errors)
+
+
+def _axis_value(value, field, parse, within, message, errors):
+    try:
+        value = parse(value)
+    except (TypeError, ValueError):
+        errors.append({'field': field, 'message': f'must be {_KINDS[parse]}'})
+        return None
+    if not within(value):
+        errors.append({'field': field, 'message': message})
+        return None
+    return value
+
+
+def _parse_axis(spec, field, parse, within, message, errors):
+    """One axis as ``(count, build)``, where ``build()`` makes its array; None if it is invalid.
+
+    Lists are checked value by value. Ranges only check their keys, so the
+    caller can size the grid before ``build`` allocates anything.
+    """
+    if isinstance(spec, list):
+        if not spec or len(spec) > MAX_GRID_CELLS:
+            errors.append({'field': field, 'message': f'must have from 1 to {MAX_GRID_CELLS:,} values'})
+            return None
+        count = len(errors)
+        values = [_axis_value(value, f'{field}[{i}]', parse, within, message, errors) for i, value in enumerate(spec)]
+        if len(errors) > count:
+            return None
+        return len(values), lambda: np.array(values)
+    if not isinstance(spec, dict):
+        errors.append({'field': field, 'message': 'must be a list or an object'})
+        return None
+    count = len(errors)
+    ends = []
+    for key in ('start', 'stop'):
+        if spec.get(key) is None:
+            errors.append({'field': f'{field}.{key}', 'message': 'is required'})
+        else:
+            ends.append(_axis_value(spec[key], f'{field}.{key}', parse, within, message, errors))
+    if parse is _integer:
+        # Ages step through the range, both ends included
+        key, size = 'step', spec.get('step', 1)
+    else:
+        # Rates take ``num`` evenly spaced values, both ends included
+        key, size = 'num', spec.get('num')
+    if size is None:
+        errors.append({'field': f'{field}.{key}', 'message': 'is required'})
+    else:
+        try:
+            size = _integer(size)
+        except (TypeError, ValueError):
+            size = 0
+        if not 1 <= size <= MAX_GRID_CELLS:
+            errors.append({'field': f'{field}.{key}', 'message': f'must be an integer from 1 to {MAX_GRID_CELLS:,}'})
+    if len(errors) > count:
+        return None
+    start, stop = ends
+    if stop < start:
+        errors.append({'field': f'{field}.stop', 'message': 'must not be below start'})
+        return None
+    if parse is _integer:
+        return (stop - start) // size + 1, lambda: np.arange(start, stop + 1, size)
+    return size, lambda: np.linspace(start, stop, size)
+
+
+def parse_sensitivity_axes(data, user_profile):
+    """Validate and build the ``/sensitivity`` axes of ``data``, or the defaults for those left out.
+
+    Each axis is a list of values or a range: ``{'start', 'stop', 'num'}``
+    for ``return_rates`` (each above -1 and at most 1) and ``savings_rates``
+    (0 to 1), ``{'start', 'stop', 'step'}`` for ``retirement_ages`` (above
+    the profile's age and at most ``LIFE_EXPECTANCY``). The grid is sized
+    with ``grid_cells`` before any axis array is built, and refused above
+    ``MAX_GRID_CELLS``. Returns ``{name: array}``; raises ``SensitivityError``.
+    """
+    age = user_profile['age']
+    limits = {
+        'return_rates': (_number, lambda rate: -1 < rate <= 1, 'must be above -1 and at most 1'),
+        'savings_rates': (_number, lambda rate: 0 <= rate <= 1, 'must be from 0 to 1'),
+        'retirement_ages': (_integer, lambda retirement_age: age < retirement_age <= LIFE_EXPECTANCY,
+                            f'must be above age and at most {LIFE_EXPECTANCY}'),
+    }
+    defaults = default_axes(user_profile)
+    errors = []
+    axes = {}
+    for name, (parse, within, message) in limits.items():
+        if name not in data:
+            axes[name] = len(defaults[name]), lambda values=defaults[name]: values
+        else:
+            axes[name] = _parse_axis(data[name], name, parse, within, message, errors)
+    if errors:
+        raise SensitivityError(errors)
+
+    # Ages are at most LIFE_EXPECTANCY - MIN_AGE long, so building them now costs nothing
+    retirement_ages = axes['retirement_ages'][1]()
+    cells = grid_cells(axes['return_rates'][0], axes['savings_rates'][0], retirement_ages, age)
+    if cells > MAX_GRID_CELLS:
+        raise SensitivityError([{
+            'field': 'body',
+            'message': f'the grid needs {cells:,} cells (returns x savings rates x (ages + working years + 1)); '
+                       f'the limit is {MAX_GRID_CELLS:,}',
+        }])
+    return {
+        'return_rates': axes['return_rates'][1](),
+        'savings_rates': axes['savings_rates'][1](),
+        'retirement_ages': retirement_ages,
+    }
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from financial_planner import llm
+from financial_planner.app import create_app
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Keep saved scenarios out of the working directory
+    monkeypatch.setenv('SCENARIO_STORE_PATH', str(tmp_path / 'scenarios.sqlite3'))
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """A local OpenAI-compatible /v1/chat/completions server."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeOpenAIHandler)
+        self.reply = 'You are on track for retirement.'
+        self.delay = 0.0
+        self.requests = []
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/v1'
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        time.sleep(self.server.delay)
+        reply = self.server.reply
+        base = {'id': 'chatcmpl-test', 'created': 0, 'model': body['model']}
+
+        if not body.get('stream'):
+            payload = json.dumps(dict(base, object='chat.completion', choices=[{
+                'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': reply},
+            }], usage={'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2})).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for word in reply.split(' '):
+            chunk = dict(base, object='chat.completion.chunk', choices=[{
+                'index': 0, 'finish_reason': None, 'delta': {'content': word + ' '},
+            }])
+            self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+            self.wfile.flush()
+        self.wfile.write(b'data: [DONE]\n\n')
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    server = FakeOpenAI()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+    monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+    llm.reset_client()
+    yield server
+    llm.reset_client()
+    server.shutdown()
+    server.server_close()
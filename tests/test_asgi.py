@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from financial_planner.asgi import PlannerASGI
+from financial_planner.conversations import CONVERSATION_COOKIE
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 50000,
+    'annual_income': 90000,
+    'children': [{'age': 8, 'education_goal': 'college'}],
+}
+
+
+async def call(asgi, method, path, body=None, headers=()):
+    """Send one request through the ASGI app; return (status, headers, body)."""
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'root_path': '',
+        'http_version': '1.1', 'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode()),
+                    *headers],
+    }
+    received = False
+    messages = []
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)
+        received = True
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await asyncio.wait_for(asyncio.ensure_future(asgi(scope, receive, send)), 30)
+    start = messages[0]
+    response_headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(m.get('body', b'') for m in messages[1:])
+
+
+@pytest.fixture
+def asgi(app):
+    asgi = PlannerASGI(app, calculate_workers=2, calculate_queue_size=2, io_workers=2)
+    yield asgi
+    asgi.calculate_pool.shutdown()
+    asgi.io_pool.shutdown()
+
+
+def test_calculate_matches_the_flask_response(asgi, client):
+    status, headers, body = asyncio.run(call(asgi, 'POST', '/calculate', PROFILE))
+
+    assert status == 200 and headers['content-type'] == 'application/json'
+    assert json.loads(body) == json.loads(client.post('/calculate', json=PROFILE).data)
+    assert asyncio.run(call(asgi, 'GET', '/missing'))[0] == 404
+
+
+def test_calculate_sheds_load_beyond_the_queue(asgi):
+    asgi.calculate_requests = asgi.max_calculate_requests
+    status, headers, _ = asyncio.run(call(asgi, 'POST', '/calculate', PROFILE))
+
+    assert status == 503 and headers['retry-after'] == '1'
+
+
+def test_oversized_bodies_are_a_413(app):
+    asgi = PlannerASGI(app, calculate_workers=1, calculate_queue_size=1, io_workers=1, max_body_bytes=64)
+    try:
+        for path in ('/calculate', '/chat'):
+            status, _, body = asyncio.run(call(asgi, 'POST', path, dict(PROFILE, message='x' * 64)))
+            assert status == 413 and 'larger than 64 bytes' in json.loads(body)['error']
+    finally:
+        asgi.calculate_pool.shutdown()
+        asgi.io_pool.shutdown()
+
+
+def test_chat_awaits_the_upstream_without_holding_threads(asgi, fake_openai):
+    async def chats():
+        # The first call imports and connects the client
+        await call(asgi, 'POST', '/chat', {'message': 'Warm up'})
+        fake_openai.delay = 0.3
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(
+            call(asgi, 'POST', '/chat', {'message': f'Question {i}'}) for i in range(12)
+        ))
+        return responses, time.perf_counter() - start
+
+    responses, elapsed = asyncio.run(chats())
+    # Two I/O threads serving blocking calls would need at least 12 * 0.3 / 2 seconds
+    assert elapsed < 1.5
+    for status, headers, body in responses:
+        assert json.loads(body) == {'response': fake_openai.reply, 'success': True}
+        assert headers['set-cookie'].startswith(f'{CONVERSATION_COOKIE}=')
+
+
+def test_streamed_chat_records_the_turn(asgi, fake_openai):
+    async def conversation():
+        _, headers, body = await call(asgi, 'POST', '/chat', {'message': 'Hi', 'stream': True})
+        cookie = headers['set-cookie'].split(';', 1)[0].encode()
+        await call(asgi, 'POST', '/chat', {'message': 'Again'}, headers=[(b'cookie', cookie)])
+        return headers, body
+
+    headers, body = asyncio.run(conversation())
+
+    assert headers['content-type'] == 'text/event-stream'
+    assert body.decode().rstrip().endswith('event: done\ndata: {"success": true}')
+    sent = fake_openai.requests[-1]['messages']
+    assert [m['content'].strip() for m in sent[1:]] == ['Hi', fake_openai.reply, 'Again']
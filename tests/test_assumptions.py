@@ -0,0 +1,133 @@
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from financial_planner.app import create_app
+from financial_planner.assumptions import (
+    ASSUMPTIONS,
+    DEFAULT_ASSUMPTIONS,
+    TABLE_YEARS,
+    AssumptionRegistry,
+    annuity_factors,
+    growth_factors,
+    growth_table,
+)
+from financial_planner.projection import project_profile
+from financial_planner.validation import AssumptionsError
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 50000,
+    'annual_income': 90000,
+    'children': [{'age': 8, 'education_goal': 'college'}],
+}
+
+
+def write_sets(path, sets, mtime):
+    path.write_text(json.dumps(sets))
+    # Distinct timestamps, however coarse the file system clock
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_tables_match_direct_powers():
+    for years in (0, 1, 37, TABLE_YEARS, TABLE_YEARS + 5):
+        assert math.isclose(growth_factors(0.06, years + 1)[-1], 1.06 ** years, rel_tol=1e-12)
+        assert math.isclose(annuity_factors(0.06, years), (1.06 ** years - 1) / 0.06, rel_tol=1e-12, abs_tol=1e-12)
+    assert np.array_equal(annuity_factors(0.0, np.arange(4)), [0.0, 1.0, 2.0, 3.0])
+    monthly = growth_factors(0.06, 13, steps_per_year=12)
+    assert math.isclose(monthly[12], 1.06, rel_tol=1e-12)
+    # Built once per rate and shared, so callers cannot write into them
+    assert growth_table(0.06) is growth_table(0.06)
+    assert not growth_table(0.06).flags.writeable
+
+
+def test_registry_versions_only_changed_sets(tmp_path):
+    path = tmp_path / 'assumptions.json'
+    write_sets(path, {'conservative': {'annual_return_rate': 0.04}, 'college': {'college_inflation_rate': 0.07}}, 1)
+    registry = AssumptionRegistry(str(path))
+    conservative, college = registry.get('conservative'), registry.get('college')
+    assert conservative.version == college.version == 1
+    assert registry.get().values == ASSUMPTIONS
+
+    write_sets(path, {'conservative': {'annual_return_rate': 0.03}, 'college': {'college_inflation_rate': 0.07}}, 2)
+    changed = registry.resolve('conservative')
+    assert changed.version == 2 and changed.digest != conservative.digest
+    assert registry.resolve('college') is college
+
+    write_sets(path, {'college': {'college_inflation_rate': 0.07}}, 3)
+    with pytest.raises(AssumptionsError):
+        registry.resolve('conservative')
+
+
+def test_a_broken_edit_keeps_the_current_sets(tmp_path):
+    path = tmp_path / 'assumptions.json'
+    write_sets(path, {'conservative': {'annual_return_rate': 0.04}}, 1)
+    registry = AssumptionRegistry(str(path))
+
+    path.write_text('{"conservative": {"annual_return_rate": 2}}')
+    os.utime(path, ns=(2, 2))
+    assert registry.resolve('conservative').annual_return_rate == 0.04
+
+
+def test_overrides_are_validated_and_reused():
+    registry = AssumptionRegistry()
+    custom = registry.resolve({'annual_return_rate': 0.05, 'savings_rate': '0.2'})
+
+    assert custom.values == dict(ASSUMPTIONS, annual_return_rate=0.05, savings_rate=0.2)
+    assert registry.resolve({'savings_rate': 0.2, 'annual_return_rate': 0.05}) is custom
+    assert registry.resolve({}) is DEFAULT_ASSUMPTIONS
+    with pytest.raises(AssumptionsError) as error:
+        registry.resolve({'annual_return_rate': 0.5, 'life_expectancy': 100, 'return': 0.05})
+    assert [problem['field'] for problem in error.value.errors] == [
+        'assumptions.annual_return_rate', 'assumptions.life_expectancy', 'assumptions.return',
+    ]
+    assert error.value.errors[1]['message'] == 'cannot be changed'
+
+
+def test_projection_follows_the_assumptions():
+    registry = AssumptionRegistry()
+    higher = project_profile(PROFILE, assumptions=registry.resolve({'annual_return_rate': 0.08}))
+    dearer = project_profile(PROFILE, assumptions=registry.resolve({'estimated_annual_college_cost': 50000}))
+    baseline = project_profile(PROFILE)
+
+    assert higher['final_savings'] > baseline['final_savings']
+    assert dearer['projected_costs'][0] == pytest.approx(baseline['projected_costs'][0] * 50000 / 35000)
+
+
+def test_calculate_caches_per_assumption_set(tmp_path, monkeypatch):
+    path = tmp_path / 'assumptions.json'
+    write_sets(path, {'conservative': {'annual_return_rate': 0.04}}, 1)
+    monkeypatch.setenv('ASSUMPTIONS_FILE', str(path))
+    client = create_app().test_client()
+
+    default = client.post('/calculate', json=PROFILE)
+    conservative = client.post('/calculate', json=dict(PROFILE, assumptions='conservative'))
+    assert conservative.headers['X-Cache'] == 'MISS'
+    assert json.loads(conservative.data)['calc_id'] != json.loads(default.data)['calc_id']
+    assert client.post('/calculate', json=dict(PROFILE, assumptions='conservative')).headers['X-Cache'] == 'HIT'
+
+    # Changing one set misses only its own results
+    write_sets(path, {'conservative': {'annual_return_rate': 0.03}}, 2)
+    assert client.post('/calculate', json=dict(PROFILE, assumptions='conservative')).headers['X-Cache'] == 'MISS'
+    assert client.post('/calculate', json=PROFILE).headers['X-Cache'] == 'HIT'
+    assert client.get('/assumptions').get_json()['assumptions']['conservative']['version'] == 2
+
+
+def test_delta_keeps_the_base_assumptions(client):
+    assumptions = {'annual_return_rate': 0.08}
+    base = json.loads(client.post('/calculate', json=dict(PROFILE, assumptions=assumptions)).data)
+    delta = json.loads(client.post('/calculate', json={'calc_id': base['calc_id'], 'changes': {'age': 41}}).data)
+    full = json.loads(client.post('/calculate', json=dict(PROFILE, age=41, assumptions=assumptions)).data)
+
+    assert delta['analysis'] == full['analysis'] and delta['calc_id'] == full['calc_id']
+
+
+def test_invalid_assumptions_are_a_400(client):
+    response = client.post('/solve', json=dict(PROFILE, assumptions={'savings_rate': -1}))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid assumptions'
+    assert client.post('/sensitivity', json=dict(PROFILE, assumptions='missing')).status_code == 400
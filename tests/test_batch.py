@@ -0,0 +1,50 @@
+import json
+import math
+
+from financial_planner.planner import analyze_financial_health, calculate_batch, parse_user_profile
+from financial_planner.projection import project_profile
+
+PROFILES = [
+    {'id': 'a', 'age': 30, 'retirement_age': 65, 'current_savings': 10000, 'annual_income': 80000, 'children': []},
+    {'id': 'b', 'age': 45, 'retirement_age': 60, 'current_savings': 5000, 'annual_income': 40000, 'children': [
+        {'age': 2, 'education_goal': 'college'},
+        {'age': 16, 'education_goal': 'university'},
+        {'age': 17, 'education_goal': 'college'},
+    ]},
+    {'age': 35, 'retirement_age': 67, 'current_savings': 250000, 'annual_income': 150000, 'children': [
+        {'age': 18, 'education_goal': 'college'},
+    ]},
+]
+
+
+def test_calculate_batch_matches_single_profile_analysis():
+    results = list(calculate_batch(PROFILES))
+    assert [r['index'] for r in results] == [0, 1, 2]
+    assert results[0]['id'] == 'a' and 'id' not in results[2]
+
+    for data, result in zip(PROFILES, results):
+        user_profile = parse_user_profile(data)
+        projection = project_profile(user_profile)
+        analysis = analyze_financial_health(user_profile, {}, projection)
+
+        assert math.isclose(result['final_savings'], projection['final_savings'], rel_tol=1e-12)
+        assert math.isclose(result['total_monthly'], projection['total_monthly'], rel_tol=1e-12)
+        assert analysis['summary'].startswith(f"Financial Health Assessment: {result['risk_level']} RISK")
+        assert len(result['education_monthly']) == len(data['children'])
+        assert 'plots' not in result
+
+
+def test_calculate_batch_chunks_preserve_order():
+    profiles = PROFILES * 5
+    chunked = list(calculate_batch(profiles, chunk_size=2))
+    whole = list(calculate_batch(profiles))
+    assert chunked == whole
+
+
+def test_batch_endpoint_streams_ndjson(client):
+    response = client.post('/calculate/batch', json={'profiles': PROFILES, 'include_figures': True})
+    assert response.mimetype == 'application/x-ndjson'
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == len(PROFILES)
+    assert 'retirement' in lines[0]['plots']
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+from financial_planner import cache
+from financial_planner.cache import MemoryBackend, ResultCache, SQLiteBackend, cache_key
+
+
+def test_cache_key_ignores_dict_order():
+    assert cache_key({'a': 1, 'b': [1, 2]}, None) == cache_key({'b': [1, 2], 'a': 1}, None)
+    assert cache_key({'a': 1}) != cache_key({'a': 2})
+
+
+def test_memory_backend_evicts_least_recently_used():
+    results = ResultCache(MemoryBackend(max_entries=2))
+    results.set('a', b'1')
+    results.set('b', b'2')
+    assert results.get('a') == b'1'
+    results.set('c', b'3')
+
+    assert results.get('b') is None
+    assert results.get('a') == b'1'
+    assert results.stats()['evictions'] == 1
+    assert results.stats()['entries'] == 2
+
+
+def test_memory_backend_enforces_byte_limit_and_ttl(monkeypatch):
+    results = ResultCache(MemoryBackend(max_bytes=10, ttl=60))
+    results.set('a', b'x' * 6)
+    results.set('b', b'y' * 6)
+    assert results.get('a') is None
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now + 120)
+    assert results.get('b') is None
+    assert results.stats()['expirations'] == 1
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'results.sqlite3')
+    first = ResultCache(SQLiteBackend(path, max_entries=2))
+    second = ResultCache(SQLiteBackend(path, max_entries=2))
+
+    first.set('a', b'{"x": 1}')
+    assert second.get('a') == b'{"x": 1}'
+    second.set('b', b'2')
+    second.set('c', b'3')
+    assert first.get('a') is None
+    assert second.stats()['evictions'] == 1
+
+
+def test_calculate_serves_repeat_requests_from_cache(client):
+    payload = {'age': 33, 'retirement_age': 62, 'current_savings': 1000, 'annual_income': 50000,
+               'children': [{'age': 3, 'education_goal': 'college'}]}
+
+    first = client.post('/calculate', json=payload)
+    second = client.post('/calculate', json=dict(payload, current_savings=1000.0))
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert first.get_json() == second.get_json()
+
+    stats = client.get('/cache/stats').get_json()['calculate']
+    assert stats['hits'] >= 1 and stats['entries'] >= 1
+
+
+def test_get_or_compute_coalesces_and_skips_failures():
+    results = ResultCache(MemoryBackend())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b'value'
+
+    assert results.get_or_compute('k', compute) == (b'value', 'MISS')
+    assert results.get_or_compute('k', compute) == (b'value', 'HIT')
+    assert len(calls) == 1
+
+    def fail():
+        raise RuntimeError('upstream down')
+
+    try:
+        results.get_or_compute('other', fail)
+    except RuntimeError:
+        pass
+    assert results.get('other') is None
+
+    flight, is_leader = results.claim('slow')
+    assert is_leader and results.claim('slow') == (flight, False)
+    results.complete('slow', flight, b'done', cost=2.0)
+    assert results.wait(flight) == b'done'
+    assert results.stats()['coalesced'] == 1 and results.stats()['saved_seconds'] >= 2.0
+
+
+def test_async_waiters_are_woken_without_threads():
+    results = ResultCache(MemoryBackend())
+    flight, _ = results.claim('slow')
+
+    async def waiters():
+        waiting = [asyncio.ensure_future(results.wait_async(flight)) for _ in range(3)]
+        await asyncio.sleep(0)
+        # The leader may finish on another thread, as WSGI requests do
+        threading.Thread(target=results.complete, args=('slow', flight, b'done', 1.0)).start()
+        return await asyncio.gather(*waiting)
+
+    assert asyncio.run(waiters()) == [b'done'] * 3
+    assert results.stats()['coalesced'] == 3
+    # A flight that already finished returns at once
+    assert asyncio.run(results.wait_async(flight)) == b'done'
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+
+import pytest
+
+from financial_planner import llm
+
+FINANCIAL_DATA = {
+    'age': 35,
+    'current_savings': 100000,
+    'annual_income': 85000,
+    'retirement_age': 65,
+    'children': [{'age': 5, 'education_goal': 'college'}],
+}
+
+
+def parse_sse(body):
+    events = []
+    for frame in body.strip().split('\n\n'):
+        event = 'message'
+        for line in frame.splitlines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                events.append((event, json.loads(line[len('data: '):])))
+    return events
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_chat_rejects_messages_past_the_budget(client, fake_openai, stream):
+    calls = len(fake_openai.requests)
+    response = client.post('/chat', json={'message': 'x' * 2001, 'stream': stream})
+
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0]['field'] == 'message'
+    assert len(fake_openai.requests) == calls
+    assert client.post('/chat', json={'message': 'x' * 2000}).status_code == 200
+
+
+def test_chat_returns_full_reply(client, fake_openai):
+    response = client.post('/chat', json={'message': 'Will I run out of money?', 'financialData': FINANCIAL_DATA})
+
+    assert response.get_json() == {'response': fake_openai.reply, 'success': True}
+    sent = fake_openai.requests[0]
+    assert sent['messages'][-1] == {'role': 'user', 'content': 'Will I run out of money?'}
+    assert 'Retirement: projected $' in sent['messages'][0]['content']
+
+
+def test_chat_streams_server_sent_events(client, fake_openai):
+    response = client.post('/chat', json={'message': 'Hi', 'financialData': FINANCIAL_DATA, 'stream': True})
+
+    assert response.mimetype == 'text/event-stream'
+    events = parse_sse(response.get_data(as_text=True))
+    deltas = ''.join(payload['delta'] for event, payload in events if event == 'message')
+    assert deltas.strip() == fake_openai.reply
+    assert events[-1] == ('done', {'success': True})
+    assert fake_openai.requests[0]['stream'] is True
+
+
+def test_stream_reports_upstream_errors(client, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    llm.reset_client()
+
+    response = client.post('/chat', json={'message': 'Hi', 'stream': True})
+    event, payload = parse_sse(response.get_data(as_text=True))[-1]
+    assert event == 'error' and 'API key' in payload['error']
+
+
+def test_client_is_reused_across_requests(client, fake_openai):
+    client.post('/chat', json={'message': 'one'})
+    first = llm.get_client()
+    client.post('/chat', json={'message': 'two'})
+    assert llm.get_client() is first
+    assert len(fake_openai.requests) == 2
+
+
+def test_concurrency_limit_fails_fast_when_saturated(fake_openai, monkeypatch):
+    monkeypatch.setattr(llm, '_slots', threading.BoundedSemaphore(1))
+    monkeypatch.setattr(llm, 'QUEUE_TIMEOUT', 0.05)
+    fake_openai.delay = 0.5
+
+    holder = threading.Thread(target=llm.get_openai_response, args=([{'role': 'user', 'content': 'slow'}],))
+    holder.start()
+    try:
+        while not fake_openai.requests:
+            time.sleep(0.01)
+        with pytest.raises(llm.ChatBusyError):
+            list(llm.stream_openai_response([{'role': 'user', 'content': 'second'}]))
+    finally:
+        holder.join()
+
+
+def test_identical_prompts_are_served_from_cache(app, fake_openai):
+    payload = {'message': 'Will I run out of money in retirement?', 'financialData': FINANCIAL_DATA}
+    first = app.test_client().post('/chat', json=payload)
+    second = app.test_client().post('/chat', json=dict(payload, message='will I run out of money in retirement'))
+    streamed = app.test_client().post('/chat', json=dict(payload, stream=True))
+
+    assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT'
+    assert second.get_json()['response'] == fake_openai.reply
+    assert parse_sse(streamed.get_data(as_text=True))[0] == ('message', {'delta': fake_openai.reply})
+    assert len(fake_openai.requests) == 1
+
+    stats = app.test_client().get('/cache/stats').get_json()['chat']
+    assert stats['hits'] == 2 and stats['saved_seconds'] > 0
+
+
+def test_concurrent_identical_prompts_share_one_upstream_call(app, fake_openai):
+    fake_openai.delay = 0.3
+    payload = {'message': 'Should I open a 529 plan?', 'financialData': FINANCIAL_DATA}
+    replies = []
+
+    def ask(stream):
+        response = app.test_client().post('/chat', json=dict(payload, stream=stream))
+        if stream:
+            events = parse_sse(response.get_data(as_text=True))
+            replies.append(''.join(payload['delta'] for event, payload in events if event == 'message'))
+        else:
+            replies.append(response.get_json()['response'])
+
+    threads = [threading.Thread(target=ask, args=(i % 2 == 0,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fake_openai.requests) == 1
+    assert [reply.strip() for reply in replies] == [fake_openai.reply] * 4
+    assert app.extensions['chat_cache'].stats()['coalesced'] == 3
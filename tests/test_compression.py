@@ -0,0 +1,39 @@
+import gzip
+import json
+
+import pytest
+
+from financial_planner.compression import brotli
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 50000,
+    'annual_income': 90000,
+    'children': [{'age': 8, 'education_goal': 'college'}],
+}
+
+
+@pytest.mark.parametrize('accept, encoding, decompress', [
+    ('gzip, deflate', 'gzip', gzip.decompress),
+    pytest.param('gzip, deflate, br', 'br', brotli and brotli.decompress,
+                 marks=pytest.mark.skipif(brotli is None, reason='brotli is not installed')),
+])
+def test_large_responses_are_compressed(client, accept, encoding, decompress):
+    plain = client.post('/sensitivity', json=PROFILE)
+    response = client.post('/sensitivity', json=PROFILE, headers={'Accept-Encoding': accept})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(decompress(response.data)) == json.loads(plain.data)
+    assert len(response.data) < 0.6 * len(plain.data)
+
+
+def test_small_and_streamed_responses_are_not_compressed(client):
+    headers = {'Accept-Encoding': 'gzip'}
+    small = client.post('/solve', json=dict(PROFILE, goal='savings_rate'), headers=headers)
+    streamed = client.post('/calculate/batch', json=[PROFILE] * 100, headers=headers)
+
+    assert 'Content-Encoding' not in small.headers
+    assert 'Content-Encoding' not in streamed.headers
@@ -0,0 +1,45 @@
+from financial_planner.context import build_chat_messages, estimate_tokens
+
+PROFILE = {
+    'age': 35,
+    'current_savings': 100000,
+    'annual_income': 85000,
+    'retirement_age': 65,
+    'children': [{'age': 5, 'education_goal': 'college'}],
+}
+
+
+def test_build_chat_messages_keeps_newest_history_within_budget():
+    history = []
+    for i in range(40):
+        history.append({'role': 'user', 'content': f'Question {i}: ' + 'details ' * 30})
+        history.append({'role': 'assistant', 'content': f'Answer {i}: ' + 'advice ' * 60})
+
+    messages = build_chat_messages('Profile: age 35', history, 'What next?', token_budget=1000)
+
+    assert sum(estimate_tokens(m['content']) for m in messages) <= 1000
+    assert messages[-1] == {'role': 'user', 'content': 'What next?'}
+    assert messages[-2]['content'].startswith('Answer 39')
+    assert 'Earlier in this conversation the user asked about: Question 0' in messages[0]['content']
+
+
+def test_build_chat_messages_without_overflow_has_no_summary():
+    history = [{'role': 'user', 'content': 'Hi'}, {'role': 'assistant', 'content': 'Hello'}]
+    messages = build_chat_messages('', history, 'Thanks')
+    assert [m['role'] for m in messages] == ['system', 'user', 'assistant', 'user']
+    assert 'Earlier in this conversation' not in messages[0]['content']
+
+
+def test_chat_uses_context_stored_by_calculate(client, fake_openai):
+    context_id = client.post('/calculate', json=PROFILE).get_json()['context_id']
+    assert context_id
+
+    client.post('/chat', json={'message': 'How am I doing?', 'contextId': context_id})
+    system_prompt = fake_openai.requests[-1]['messages'][0]['content']
+    assert 'Profile: age 35, income $85,000.00/yr' in system_prompt
+    assert '- Child 1: age 5, 13 years to college' in system_prompt
+
+
+def test_chat_falls_back_to_financial_data_for_unknown_context(client, fake_openai):
+    client.post('/chat', json={'message': 'Hi', 'contextId': 'missing', 'financialData': PROFILE})
+    assert 'Profile: age 35' in fake_openai.requests[-1]['messages'][0]['content']
@@ -0,0 +1,76 @@
+import pytest
+
+from financial_planner import conversations
+
+from financial_planner.conversations import (
+    CONVERSATION_COOKIE,
+    MemoryConversationStore,
+    SQLiteConversationStore,
+    is_valid_conversation_id,
+    new_conversation_id,
+)
+
+
+def turn(i):
+    return {'role': 'user', 'content': f'q{i}'}, {'role': 'assistant', 'content': f'a{i}'}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryConversationStore(max_messages=4)
+    return SQLiteConversationStore(str(tmp_path / 'chat.sqlite3'), max_messages=4)
+
+
+def test_store_keeps_only_the_newest_messages(store):
+    for i in range(5):
+        store.append('conversation-one-0001', *turn(i))
+
+    assert [m['content'] for m in store.history('conversation-one-0001')] == ['q3', 'a3', 'q4', 'a4']
+    assert store.history('someone-else-00001') == []
+
+
+def test_memory_store_drops_least_recent_conversations():
+    store = MemoryConversationStore(max_conversations=2)
+    for name in ('a', 'b', 'c'):
+        store.append(name, *turn(0))
+
+    assert store.history('a') == [] and len(store.history('c')) == 2
+
+
+def test_sqlite_store_drops_expired_messages(tmp_path, monkeypatch):
+    store = SQLiteConversationStore(str(tmp_path / 'chat.sqlite3'), ttl=60)
+    monkeypatch.setattr(conversations.time, 'time', lambda: 1000.0)
+    store.append('abandoned-chat-0001', *turn(0))
+    store.append('active-chat-000001', *turn(1))
+
+    monkeypatch.setattr(conversations.time, 'time', lambda: 1050.0)
+    store.append('active-chat-000001', *turn(2))
+    monkeypatch.setattr(conversations.time, 'time', lambda: 1070.0)
+    assert [m['content'] for m in store.history('active-chat-000001')] == ['q2', 'a2']
+
+    store.append('active-chat-000001', *turn(3))
+    count = store._connect().execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+    assert count == 4 and store.history('abandoned-chat-0001') == []
+
+
+def test_conversation_ids_are_opaque_tokens():
+    assert is_valid_conversation_id(new_conversation_id())
+    assert not is_valid_conversation_id('../../etc/passwd')
+    assert not is_valid_conversation_id(None)
+
+
+def test_chat_history_survives_across_requests_by_cookie(client, fake_openai):
+    client.post('/chat', json={'message': 'First question'})
+    cookie = client.get_cookie(CONVERSATION_COOKIE)
+    assert cookie is not None and is_valid_conversation_id(cookie.value)
+
+    client.post('/chat', json={'message': 'Second question', 'stream': True}).get_data()
+    client.post('/chat', json={'message': 'Third question'})
+
+    sent = fake_openai.requests[-1]['messages']
+    assert [m['content'].strip() for m in sent[1:]] == [
+        'First question', fake_openai.reply, 'Second question', fake_openai.reply, 'Third question'
+    ]
+    history = client.application.extensions['conversations'].history(cookie.value)
+    assert len(history) == 6
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from financial_planner.delta import changed_fields, figure_patch
+from financial_planner.figures import dumps
+from financial_planner.planner import generate_plots
+from financial_planner.projection import project_profile
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 50000,
+    'annual_income': 90000,
+    'children': [{'age': 8, 'education_goal': 'college'}],
+}
+
+FIGURES = ('retirement', 'education', 'monthly')
+
+
+def apply_patch(plots, patch):
+    """What input.html does before Plotly.react."""
+    plots = json.loads(json.dumps(plots))
+    for name, update in patch.items():
+        if update is None:
+            plots.pop(name, None)
+            continue
+        figure = plots.setdefault(name, {'data': [], 'layout': {}})
+        if 'layout' in update:
+            figure['layout'] = update['layout']
+        for index, fields in update['traces']:
+            if index < len(figure['data']):
+                figure['data'][index] = {**figure['data'][index], **fields}
+            else:
+                figure['data'].append(fields)
+        del figure['data'][update['length']:]
+    return plots
+
+
+def full(client, profile):
+    result = json.loads(client.post('/calculate', json=profile).data)
+    return result, {name: result[name] for name in FIGURES if name in result}
+
+
+@pytest.mark.parametrize('changes', [
+    {'retirement_age': 67},
+    {'annual_income': 120000},
+    {'current_savings': 10},
+    {'age': 45},
+    {'children': [{'age': 8, 'education_goal': 'college'}, {'age': 2, 'education_goal': 'college'}]},
+    {'children': [{'age': 3, 'education_goal': 'college'}]},
+    {'children': []},
+    {'children': [{'age': 8, 'education_goal': 'university'}]},
+])
+def test_patch_reproduces_the_full_response(client, changes):
+    base, plots = full(client, PROFILE)
+    response = client.post('/calculate', json={'calc_id': base['calc_id'], 'changes': changes})
+    delta = json.loads(response.data)
+    expected, expected_plots = full(client, dict(PROFILE, **changes))
+
+    assert response.status_code == 200
+    assert apply_patch(plots, delta['patch']) == expected_plots
+    assert delta['analysis'] == expected['analysis']
+    assert delta['calc_id'] == expected['calc_id'] and delta['context_id'] == expected['context_id']
+
+
+def test_patch_adds_figures_for_a_first_child(client):
+    base, plots = full(client, dict(PROFILE, children=[]))
+    changes = {'children': [{'age': 5, 'education_goal': 'college'}]}
+    delta = json.loads(client.post('/calculate', json={'calc_id': base['calc_id'], 'changes': changes}).data)
+
+    assert apply_patch(plots, delta['patch']) == full(client, dict(PROFILE, **changes))[1]
+
+
+def test_patch_only_sends_what_changed(client):
+    base, _ = full(client, PROFILE)
+    two_children = [PROFILE['children'][0], {'age': 2, 'education_goal': 'college'}]
+    patch = json.loads(client.post('/calculate', json={
+        'calc_id': base['calc_id'], 'changes': {'children': two_children},
+    }).data)['patch']
+
+    # Only the new child's bars, plus the monthly chart and the balances
+    assert [index for index, _ in patch['education']['traces']] == [2, 3]
+    assert set(patch) == {'retirement', 'education', 'monthly'}
+    assert 'x' not in patch['retirement']['traces'][0][1]
+
+    patch = json.loads(client.post('/calculate', json={
+        'calc_id': base['calc_id'], 'changes': {'retirement_age': 60},
+    }).data)['patch']
+    assert set(patch) == {'retirement'}
+    assert changed_fields(PROFILE, dict(PROFILE, children=[{'age': 8, 'education_goal': 'university'}])) == set()
+
+
+def test_unknown_calc_id_asks_for_the_full_profile(client):
+    response = client.post('/calculate', json={'calc_id': 'missing', 'changes': {'age': 41}})
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('calc_id', [['a'], {'a': 1}, 5, ''])
+def test_malformed_calc_id_is_a_400(client, calc_id):
+    response = client.post('/calculate', json={'calc_id': calc_id, 'changes': {'age': 41}})
+
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'field': 'calc_id', 'message': 'must be a non-empty string'}]
+
+
+def test_invalid_changes_are_rejected(client):
+    base, _ = full(client, PROFILE)
+    for changes in ({'savings_rate': 0.3}, {'age': 'old'}, [1]):
+        response = client.post('/calculate', json={'calc_id': base['calc_id'], 'changes': changes})
+        assert response.status_code == 400
+    response = client.post('/calculate', json={'calc_id': base['calc_id'], 'changes': {}, 'monte_carlo': True})
+    assert response.status_code == 400
+
+
+def test_patch_of_decimated_series_resends_the_ages():
+    profile = dict(PROFILE, children=[])
+    changed = dict(profile, current_savings=1000)
+    plots = json.loads(dumps(generate_plots(profile, max_points=10)))
+    patch = json.loads(dumps(figure_patch(profile, changed, project_profile(changed), max_points=10)))
+
+    assert 'x' in patch['retirement']['traces'][0][1]
+    assert apply_patch(plots, patch) == json.loads(dumps(generate_plots(changed, max_points=10)))
@@ -0,0 +1,78 @@
+import base64
+import json
+
+import numpy as np
+import pytest
+
+from financial_planner.planner import generate_plots
+from financial_planner.figures import compact_figure, decimate, dumps, retirement_figure, typed_array
+from financial_planner.montecarlo import simulate_retirement
+
+PROFILE = {
+    'age': 35,
+    'retirement_age': 65,
+    'current_savings': 100000.0,
+    'annual_income': 85000.0,
+    'children': [{'age': 5, 'education_goal': 'college'}, {'age': 2, 'education_goal': 'college'}],
+}
+
+
+def decode(values):
+    """Plotly >= 6 emits NumPy arrays as typed arrays; decode them back to lists."""
+    if isinstance(values, dict) and 'bdata' in values:
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype']).tolist()
+    return values
+
+
+@pytest.mark.parametrize('with_simulation', [False, True])
+def test_spec_builder_matches_plotly_figures(with_simulation):
+    simulation = simulate_retirement(PROFILE, num_paths=200, seed=1, workers=1) if with_simulation else None
+    fast = json.loads(dumps(generate_plots(PROFILE, simulation=simulation, use_plotly=False)))
+    slow = generate_plots(PROFILE, simulation=simulation, use_plotly=True)
+
+    assert fast.keys() == slow.keys()
+    for name in fast:
+        assert len(fast[name]['data']) == len(slow[name]['data'])
+        for fast_trace, slow_trace in zip(fast[name]['data'], slow[name]['data']):
+            for field in ('type', 'name', 'mode', 'text', 'fill', 'line'):
+                assert fast_trace.get(field) == slow_trace.get(field), (name, field)
+            assert decode(fast_trace['x']) == decode(slow_trace['x'])
+            np.testing.assert_allclose(decode(fast_trace['y']), decode(slow_trace['y']), rtol=1e-12)
+
+        fast_layout, slow_layout = fast[name]['layout'], slow[name]['layout']
+        for field in ('title', 'xaxis', 'yaxis', 'barmode', 'showlegend', 'plot_bgcolor'):
+            assert fast_layout.get(field) == slow_layout.get(field), (name, field)
+        assert fast_layout['template']['layout']['paper_bgcolor'] == slow_layout['template']['layout']['paper_bgcolor']
+
+
+def test_dumps_encodes_numpy_values():
+    encoded = json.loads(dumps({'a': np.arange(3), 'b': np.float64(1.5), 'c': np.arange(6.0).reshape(2, 3)[:, 0]}))
+    assert encoded == {'a': [0, 1, 2], 'b': 1.5, 'c': [0.0, 3.0]}
+
+
+def test_decimate_keeps_extremes_within_the_budget():
+    x = np.arange(100_000)
+    y = np.sin(x / 500.0) * x
+    y[12_345] = 1e9
+    dx, dy = decimate(x, y, 1000)
+
+    assert len(dx) <= 1000 and np.all(np.diff(dx) > 0)
+    assert dx[0] == 0 and dx[-1] == x[-1]
+    assert dy.max() == 1e9 and dy.min() == y.min()
+    np.testing.assert_array_equal(dy, y[dx])
+
+
+def test_compact_figure_sends_long_series_as_typed_arrays():
+    ages = np.arange(30, 30 + 5000)
+    balances = np.linspace(0, 1e6, 5000)
+    figure = compact_figure(retirement_figure(ages[:10], balances[:10], drawdown=(ages, balances)), max_points=2000)
+    short, long = figure['data']
+
+    assert short['x'].tolist() == ages[:10].tolist()
+    assert long['y']['dtype'] == 'f8' and long['x']['dtype'] == 'i4'
+    assert len(decode(long['y'])) <= 2000
+    assert decode(long['y'])[-1] == 1e6
+
+    grid = np.arange(600.0).reshape(20, 30)
+    z = typed_array(grid)
+    assert z['shape'] == '20,30' and decode(z) == grid.ravel().tolist()
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+from financial_planner.projection import (
+    ESTIMATED_ANNUAL_COLLEGE_COST,
+    education_costs,
+    profiles_to_arrays,
+    project_batch,
+    project_ledger,
+    project_profile,
+)
+
+PROFILE = {
+    'age': 45,
+    'retirement_age': 60,
+    'current_savings': 150000.0,
+    'annual_income': 90000.0,
+    'children': [{'age': 10, 'education_goal': 'college'}, {'age': 19, 'education_goal': 'college'}],
+}
+
+
+def ledger_loop(profile, steps_per_year):
+    """Reference: step the ledger one period at a time in plain Python."""
+    g = 1.06 ** (1 / steps_per_year)
+    working_steps = (profile['retirement_age'] - profile['age']) * steps_per_year
+    horizon = max(95 - profile['age'], profile['retirement_age'] - profile['age'] + 1) * steps_per_year
+    years_to_college, _, _, monthly = education_costs([c['age'] for c in profile['children']])
+    balance = profile['current_savings']
+    balances, shortfalls = [balance], []
+    for t in range(horizon):
+        year = t // steps_per_year
+        flow = 0.0
+        if t < working_steps:
+            flow += profile['annual_income'] * 0.15 / steps_per_year
+        else:
+            flow -= profile['annual_income'] * 0.8 / steps_per_year * 1.025 ** ((t + 1) / steps_per_year)
+        for start, needed in zip(years_to_college, monthly):
+            if t < start * steps_per_year:
+                flow += needed * 12 / steps_per_year
+            if start <= year < start + 4:
+                flow -= ESTIMATED_ANNUAL_COLLEGE_COST * 1.05 ** year / steps_per_year
+        balance = balance * g + flow
+        shortfalls.append(max(-balance, 0.0))
+        balance = max(balance, 0.0)
+        balances.append(balance)
+    return np.array(balances), np.array(shortfalls)
+
+
+@pytest.mark.parametrize('steps_per_year', [1, 12])
+def test_ledger_matches_step_by_step_loop(steps_per_year):
+    run = project_ledger(profiles_to_arrays([PROFILE]), steps_per_year)
+    ledger = run['ledger'][0]
+    balances, shortfalls = ledger_loop(PROFILE, steps_per_year)
+
+    np.testing.assert_allclose(ledger.closing, balances[1:], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(ledger.shortfall, shortfalls, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(ledger.opening + ledger.growth + ledger.contribution - ledger.college
+                               - ledger.drawdown + ledger.shortfall, ledger.closing, atol=1e-6)
+    depleted = np.flatnonzero(shortfalls > 0)
+    assert math.isclose(run['depletion_age'][0], 45 + depleted[0] / steps_per_year)
+
+
+def test_batch_ledger_pads_each_profile_past_its_horizon():
+    young = dict(PROFILE, age=25, retirement_age=65, children=[])
+    run = project_ledger(profiles_to_arrays([PROFILE, young]))
+
+    closing = run['ledger'].closing
+    assert closing.shape == (2, 70)
+    assert run['steps'].tolist() == [50, 70]
+    assert np.isnan(closing[0, 50:]).all() and not np.isnan(closing[0, :50]).any()
+    assert not np.isnan(closing[1]).any()
+    single = project_profile(PROFILE)
+    assert math.isclose(run['retirement_balance'][0], single['final_savings'], rel_tol=1e-12)
+
+
+def test_batch_risk_counts_savings_running_out():
+    batch = project_batch(profiles_to_arrays([PROFILE]))
+    projection = project_profile(PROFILE)
+    assert projection['depletion_age'] is not None
+    assert batch['depletion_age'][0] == projection['depletion_age']
+    assert projection['drawdown_years'][0] == 60 and projection['drawdown_years'][-1] == 95
@@ -0,0 +1,67 @@
+import os
+
+from financial_planner import metrics
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 50000,
+    'annual_income': 90000,
+    'children': [{'age': 8, 'education_goal': 'college'}],
+}
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('demo_seconds', 'Demo.', ('stage',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, 'x')
+
+    lines = list(histogram.samples())
+    assert lines == [
+        'demo_seconds_bucket{stage="x",le="0.1"} 1',
+        'demo_seconds_bucket{stage="x",le="1.0"} 2',
+        'demo_seconds_bucket{stage="x",le="+Inf"} 3',
+        'demo_seconds_sum{stage="x"} 5.55',
+        'demo_seconds_count{stage="x"} 3',
+    ]
+
+
+def test_calculate_reports_stage_timings_and_metrics(client):
+    metrics.REGISTRY.reset()
+    response = client.post('/calculate', json=PROFILE)
+
+    stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+    assert stages == ['context', 'figures', 'analysis', 'encode']
+    assert metrics.REQUEST_SECONDS.count('/calculate', 'POST', '200') == 1
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE planner_stage_seconds histogram' in body
+    assert 'planner_stage_seconds_count{stage="figures"} 1' in body
+
+
+def test_upstream_errors_are_counted(client, monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    metrics.REGISTRY.reset()
+    client.post('/chat', json={'message': 'Hi'})
+
+    assert metrics.UPSTREAM_REQUESTS.value('complete', 'error') == 1
+
+
+def test_profile_header_writes_stats_only_with_the_token(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(metrics, 'PROFILE_DIR', str(tmp_path))
+
+    assert 'X-Profile' not in client.post('/calculate', json=PROFILE, headers={'X-Profile': 'guess'}).headers
+    response = client.post('/calculate', json=PROFILE, headers={'X-Profile': 'sécret'})
+    assert response.status_code == 200 and 'X-Profile' not in response.headers
+    response = client.post('/calculate', json=PROFILE, headers={'X-Profile': 'secret'})
+    assert os.listdir(tmp_path) == [response.headers['X-Profile']]
+
+
+def test_disabled_metrics_record_nothing(client, monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', False)
+    metrics.REGISTRY.reset()
+    response = client.post('/calculate', json=PROFILE)
+
+    assert 'Server-Timing' not in response.headers
+    assert metrics.STAGE_SECONDS.count('figures') == 0
@@ -0,0 +1,76 @@
+import math
+import threading
+
+import numpy as np
+
+from financial_planner import montecarlo
+from financial_planner.projection import project_profile
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 200000.0,
+    'annual_income': 100000.0,
+    'children': [],
+}
+
+
+def test_simulation_is_reproducible_across_chunking_and_workers(monkeypatch):
+    monkeypatch.setattr(montecarlo, 'PARALLEL_MIN_PATHS', 1)
+    serial = montecarlo.simulate_retirement(PROFILE, num_paths=3000, seed=7, chunk_size=1000, workers=1)
+    parallel = montecarlo.simulate_retirement(PROFILE, num_paths=3000, seed=7, chunk_size=1000, workers=2)
+
+    assert serial['success_probability'] == parallel['success_probability']
+    np.testing.assert_array_equal(serial['p50'], parallel['p50'])
+    assert 0.0 <= serial['success_probability'] <= 1.0
+    assert len(serial['ages']) == montecarlo.LIFE_EXPECTANCY - PROFILE['age'] + 1
+    assert np.all(serial['p5'] <= serial['p50']) and np.all(serial['p50'] <= serial['p95'])
+
+
+def test_concurrent_runs_share_one_pool(monkeypatch):
+    monkeypatch.setattr(montecarlo, 'PARALLEL_MIN_PATHS', 1)
+    created = []
+    get_pool = montecarlo._get_pool
+
+    def counting_get_pool(workers):
+        pool = get_pool(workers)
+        if pool not in created:
+            created.append(pool)
+        return pool
+
+    monkeypatch.setattr(montecarlo, '_get_pool', counting_get_pool)
+    monkeypatch.setattr(montecarlo, '_pool', None)
+    results = []
+
+    def run():
+        results.append(montecarlo.simulate_retirement(PROFILE, num_paths=2000, seed=7, chunk_size=500, workers=2))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    created[0].shutdown()
+    assert len(created) == 1 and created[0]._mp_context.get_start_method() != 'fork'
+    assert all(np.array_equal(result['p50'], results[0]['p50']) for result in results)
+
+
+def test_zero_volatility_median_follows_deterministic_projection(monkeypatch):
+    monkeypatch.setattr(montecarlo, 'RETURN_VOLATILITY', 0.0)
+    result = montecarlo.simulate_retirement(PROFILE, num_paths=10, seed=1, workers=1)
+
+    expected = project_profile(PROFILE)['final_savings']
+    at_retirement = result['p50'][PROFILE['retirement_age'] - PROFILE['age']]
+    assert math.isclose(at_retirement, expected, rel_tol=1e-5)
+
+
+def test_calculate_monte_carlo_adds_fan_and_summary(client):
+    payload = dict(PROFILE, monte_carlo={'paths': 2000, 'seed': 3})
+    response = client.post('/calculate', json=payload).get_json()
+
+    names = [trace['name'] for trace in response['retirement']['data']]
+    assert names[:2] == ['Projected Savings', 'Retirement Drawdown']
+    assert names[2:] == ['95th percentile', '5th percentile', 'Median (Monte Carlo)']
+    assert response['monte_carlo']['paths'] == 2000
+    assert 'Monte Carlo success probability' in response['analysis']['summary']
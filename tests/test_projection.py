@@ -0,0 +1,37 @@
+import math
+
+from financial_planner.projection import project_profile
+
+
+def legacy_final_savings(current_savings, annual_savings, years, annual_return_rate=0.06):
+    final = current_savings
+    for _ in range(years):
+        final = final * (1 + annual_return_rate) + annual_savings
+    return final
+
+
+def test_project_profile_education_costs():
+    profile = {
+        'age': 40,
+        'retirement_age': 65,
+        'current_savings': 50000.0,
+        'annual_income': 90000.0,
+        'children': [{'age': 8, 'education_goal': 'college'}, {'age': 18, 'education_goal': 'college'}],
+    }
+
+    projection = project_profile(profile)
+
+    projected = projection['projected_costs']
+    assert math.isclose(projected[0], 140000 * 1.05 ** 10)
+    assert math.isclose(projection['college_monthly'][0], projected[0] / 120)
+    # A child already at college age has the full cost spread over the next 12 months
+    assert math.isclose(projection['college_monthly'][1], 140000 / 12)
+    assert math.isclose(
+        projection['total_monthly'],
+        90000 * 0.15 / 12 + projection['college_monthly'].sum(),
+    )
+    # College bills are paid from the savings balance, so it ends below the no-children projection
+    assert projection['final_savings'] == projection['savings'][-1]
+    assert projection['final_savings'] < legacy_final_savings(50000.0, 13500.0, 25)
+    childless = project_profile(dict(profile, children=[]))
+    assert math.isclose(childless['final_savings'], legacy_final_savings(50000.0, 13500.0, 25))
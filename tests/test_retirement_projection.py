@@ -1,7 +1,7 @@
 import json
 import math
 
-from financial_planner.app import generate_plots
+from financial_planner.planner import generate_plots
 
 
 def compute_expected_final_savings(current_savings, annual_income, savings_rate, annual_return_rate, years):
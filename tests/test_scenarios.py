@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pytest
+
+from financial_planner.app import create_app
+from financial_planner.assumptions import ASSUMPTIONS, AssumptionSet
+from financial_planner.projection import project_profile
+from financial_planner.scenarios import SQLiteScenarioStore, create_scenario_store
+
+PROFILES = [
+    {'age': 30, 'retirement_age': 65, 'current_savings': 10000, 'annual_income': 80000, 'children': []},
+    {'age': 45, 'retirement_age': 60, 'current_savings': 5000, 'annual_income': 40000, 'children': [
+        {'age': 2, 'education_goal': 'college'},
+        {'age': 16, 'education_goal': 'university'},
+    ]},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteScenarioStore(str(tmp_path / 'scenarios.sqlite3'))
+
+
+@pytest.fixture
+def scenario_client(tmp_path, monkeypatch):
+    monkeypatch.setenv('SCENARIO_STORE_PATH', str(tmp_path / 'scenarios.sqlite3'))
+    return create_app().test_client()
+
+
+def test_saved_scenarios_keep_summary_and_curve(store):
+    ids = store.save_many(PROFILES, user_id='alice', names=['Early', None])
+    saved = store.get_many(reversed(ids))
+
+    assert [s['id'] for s in saved] == ids[::-1]
+    for scenario, profile in zip(saved[::-1], PROFILES):
+        projected = project_profile(profile)
+        assert scenario['profile'] == profile
+        assert scenario['final_savings'] == projected['final_savings']
+        assert np.allclose(scenario['curve'], np.concatenate((projected['savings'], projected['drawdown'][1:])))
+        assert scenario['ages'][0] == profile['age']
+
+
+def test_list_filters_by_user_and_risk(store):
+    store.save_many(PROFILES, user_id='alice')
+    store.save_many(PROFILES[:1], user_id='bob')
+
+    alice = store.list(user_id='alice')
+    assert len(alice) == 2
+    risk_level = alice[0]['risk_level']
+    matching = store.list(risk_level=risk_level)
+    assert matching and all(s['risk_level'] == risk_level for s in matching)
+    newest = store.list(limit=1)[0]
+    assert newest['user_id'] == 'bob' and 'curve' not in newest
+    assert len(store.list(limit=-1)) == len(store.list(limit=0)) == 1
+
+
+def test_reproject_applies_new_assumptions(store):
+    [scenario_id] = store.save_many(PROFILES[:1])
+    before = store.get_many([scenario_id])[0]['final_savings']
+
+    assumptions = AssumptionSet('higher', dict(ASSUMPTIONS, annual_return_rate=0.08))
+    assert store.reproject(chunk_size=1, assumptions=assumptions) == 1
+    after = store.get_many([scenario_id])[0]
+    assert after['final_savings'] > before and after['assumptions']['annual_return_rate'] == 0.08
+
+
+def test_compare_overlays_saved_curves(scenario_client):
+    response = scenario_client.post('/scenarios', json={'scenarios': PROFILES, 'user_id': 'alice'})
+    assert response.status_code == 201
+    ids = response.get_json()['ids']
+
+    listed = scenario_client.get('/scenarios?user_id=alice').get_json()['scenarios']
+    assert sorted(s['id'] for s in listed) == ids
+
+    result = json.loads(scenario_client.get(f'/scenarios/compare?ids={ids[1]},{ids[0]}').data)
+    assert [trace['name'] for trace in result['figure']['data']] == [f'Scenario {ids[1]}', f'Scenario {ids[0]}']
+    assert result['scenarios'][0]['profile'] == PROFILES[1]
+
+    assert scenario_client.get('/scenarios/compare?ids=999').status_code == 404
+
+
+@pytest.mark.parametrize('body, field', [
+    (dict(PROFILES[0], user_id={'id': 1}), 'user_id'),
+    (dict(PROFILES[0], name=['Early']), 'name'),
+    (dict(PROFILES[0], user_id='x' * 201), 'user_id'),
+    ({'scenarios': [PROFILES[0], dict(PROFILES[1], name=5)]}, 'scenarios[1].name'),
+])
+def test_bad_user_ids_and_names_are_a_400(scenario_client, body, field):
+    response = scenario_client.post('/scenarios', json=body)
+
+    assert response.status_code == 400
+    assert [error['field'] for error in response.get_json()['errors']] == [field]
+
+
+def test_store_defaults_to_the_instance_folder(tmp_path, monkeypatch):
+    monkeypatch.delenv('SCENARIO_STORE_PATH', raising=False)
+    instance_path = tmp_path / 'instance'
+    store = create_scenario_store(str(instance_path))
+
+    assert store.path == str(instance_path / 'scenarios.sqlite3') and not instance_path.exists()
+    store.save_many(PROFILES[:1])
+    assert (instance_path / 'scenarios.sqlite3').exists()
@@ -0,0 +1,92 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from financial_planner.assumptions import ASSUMPTIONS, AssumptionSet
+from financial_planner.projection import profiles_to_arrays, project_ledger, project_profile
+from financial_planner.sensitivity import sensitivity_grid
+
+PROFILE = {
+    'age': 45,
+    'retirement_age': 60,
+    'current_savings': 5000,
+    'annual_income': 40000,
+    'children': [
+        {'age': 2, 'education_goal': 'college'},
+        {'age': 16, 'education_goal': 'university'},
+    ],
+}
+
+
+def test_grid_cells_match_the_ledger():
+    return_rates, savings_rates, retirement_ages = [0.03, 0.09], [0.05, 0.3], [46, 55, 70]
+    grid = sensitivity_grid(PROFILE, return_rates, savings_rates, retirement_ages)
+    assert grid['final_savings'].shape == (2, 2, 3)
+
+    for i, rate in enumerate(return_rates):
+        assumptions = AssumptionSet('test', dict(ASSUMPTIONS, annual_return_rate=rate))
+        for j, savings_rate in enumerate(savings_rates):
+            for k, retirement_age in enumerate(retirement_ages):
+                arrays = profiles_to_arrays([dict(PROFILE, retirement_age=retirement_age)])
+                expected = project_ledger(arrays, savings_rate=savings_rate, assumptions=assumptions)
+                expected = expected['retirement_balance'][0]
+                assert math.isclose(grid['final_savings'][i, j, k], expected, rel_tol=1e-9)
+
+
+def test_grid_includes_the_baseline_projection():
+    grid = sensitivity_grid(PROFILE, [0.06], [0.15], [PROFILE['retirement_age']])
+    projected = project_profile(PROFILE)
+
+    assert math.isclose(grid['years_of_retirement_covered'][0, 0, 0], projected['years_of_retirement_covered'])
+
+
+def test_sensitivity_endpoint(client):
+    body = dict(
+        PROFILE,
+        return_rates={'start': 0.03, 'stop': 0.09, 'num': 7},
+        savings_rates=[0.1, 0.2],
+        retirement_ages={'start': 58, 'stop': 62},
+    )
+    result = json.loads(client.post('/sensitivity', json=body).data)
+
+    assert np.shape(result['grid']['final_savings']) == (7, 2, 5)
+    assert result['baseline_index'] == [3, 0, 2]
+    assert np.shape(result['heatmap']['data'][0]['z']) == (7, 2)
+
+
+def test_sensitivity_rejects_oversized_grids(client):
+    body = dict(PROFILE, return_rates={'start': 0.0, 'stop': 0.1, 'num': 1000},
+                savings_rates={'start': 0.0, 'stop': 0.5, 'num': 1000})
+    response = client.post('/sensitivity', json=body)
+
+    assert response.status_code == 400 and 'limit' in response.get_json()['errors'][0]['message']
+
+
+def test_late_retirement_ages_count_towards_the_limit(client):
+    # 1,000 x 20 cells, but the running sums reach 50 working years further
+    body = dict(PROFILE, return_rates={'start': 0.0, 'stop': 0.1, 'num': 1000},
+                savings_rates={'start': 0.0, 'stop': 0.5, 'num': 20}, retirement_ages=[95])
+    response = client.post('/sensitivity', json=body)
+
+    assert response.status_code == 400 and 'limit' in response.get_json()['errors'][0]['message']
+
+
+@pytest.mark.parametrize('axes, field', [
+    ({'retirement_ages': [3000000]}, 'retirement_ages[0]'),
+    ({'retirement_ages': [40]}, 'retirement_ages[0]'),
+    ({'retirement_ages': {'start': 50, 'stop': 70, 'step': 0}}, 'retirement_ages.step'),
+    ({'return_rates': [-1]}, 'return_rates[0]'),
+    ({'return_rates': {'start': 0.03, 'stop': 0.09}}, 'return_rates.num'),
+    ({'savings_rates': {'stop': 0.3, 'num': 5}}, 'savings_rates.start'),
+    ({'savings_rates': {'start': 0.3, 'stop': 0.1, 'num': 5}}, 'savings_rates.stop'),
+    ({'savings_rates': []}, 'savings_rates'),
+    ({'savings_rates': 'all'}, 'savings_rates'),
+])
+def test_bad_axes_are_a_400(client, axes, field):
+    response = client.post('/sensitivity', json=dict(PROFILE, **axes))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid sensitivity axes'
+    assert [error['field'] for error in response.get_json()['errors']] == [field]
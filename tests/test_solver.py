@@ -0,0 +1,86 @@
+import math
+
+import pytest
+
+from financial_planner.projection import profiles_to_arrays, project_ledger
+from financial_planner.solver import _bisect_savings_rate, _meets_target, solve_goal
+
+PROFILES = [
+    {'age': 30, 'retirement_age': 65, 'current_savings': 10000, 'annual_income': 80000, 'children': []},
+    {'age': 45, 'retirement_age': 60, 'current_savings': 5000, 'annual_income': 40000, 'children': [
+        {'age': 2, 'education_goal': 'college'},
+        {'age': 16, 'education_goal': 'university'},
+        {'age': 17, 'education_goal': 'college'},
+    ]},
+]
+
+
+def meets(profile, savings_rate=0.15, **changes):
+    profile = dict(profile, **changes)
+    run = project_ledger(profiles_to_arrays([profile]), savings_rate=savings_rate)
+    return bool(_meets_target(run, profile['annual_income'], 20, 95)[0])
+
+
+@pytest.mark.parametrize('profile', PROFILES)
+def test_savings_rate_is_the_minimum_that_meets_the_target(profile):
+    result = solve_goal(profile, 'savings_rate')
+    rate = result['value']
+
+    assert result['method'] == 'closed_form' and result['feasible']
+    assert meets(profile, rate) and not meets(profile, rate * (1 - 1e-6))
+    assert math.isclose(_bisect_savings_rate(profiles_to_arrays([profile]), 20, 95)[0], rate, abs_tol=1e-5)
+
+
+def test_retirement_age_is_the_earliest_that_meets_the_target():
+    profile = PROFILES[0]
+    age = solve_goal(profile, 'retirement_age')['value']
+
+    assert meets(profile, retirement_age=age) and not meets(profile, retirement_age=age - 1)
+
+
+def test_unreachable_targets_are_reported_as_infeasible():
+    profile = dict(PROFILES[0], age=60, current_savings=0)
+    result = solve_goal(profile, 'savings_rate', target_years=100)
+
+    assert result['value'] is None and not result['feasible']
+
+
+def test_college_contribution_pays_the_bills_exactly():
+    result = solve_goal(PROFILES[1], 'college_contribution')
+    child = result['children'][0]
+    assert child['monthly'] < child['current_plan_monthly']
+
+    # Save for 16 years, then pay four years of bills; the fund should end at zero
+    balance = 0.0
+    for year in range(child['years_to_college'] + 4):
+        flow = child['monthly'] * 12 if year < child['years_to_college'] else -35000 * 1.05 ** year
+        balance = balance * 1.06 + flow
+        assert balance > -1e-6
+    assert abs(balance) < 1e-6
+
+
+def test_solve_endpoint(client):
+    response = client.post('/solve', json=dict(PROFILES[0], goal='retirement_age', last_until=None))
+    assert response.status_code == 200
+    assert response.get_json()['target'] == {'years_covered': 20.0, 'last_until': None}
+
+    response = client.post('/solve', json=dict(PROFILES[0], goal='net_worth'))
+    assert response.status_code == 400 and 'Unknown goal' in response.get_json()['error']
+
+
+@pytest.mark.parametrize('options, field', [
+    ({'last_until': 'inf'}, 'last_until'),
+    ({'last_until': 'nan'}, 'last_until'),
+    ({'last_until': 10 ** 400}, 'last_until'),
+    ({'last_until': 20}, 'last_until'),
+    ({'target_years': 'inf'}, 'target_years'),
+    ({'target_years': 10 ** 400}, 'target_years'),
+    ({'target_years': -5}, 'target_years'),
+    ({'target_years': [20]}, 'target_years'),
+])
+def test_bad_solve_targets_are_a_400(client, options, field):
+    response = client.post('/solve', json=dict(PROFILES[0], **options))
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid profile'
+    assert [error['field'] for error in response.get_json()['errors']] == [field]
@@ -0,0 +1,150 @@
+import math
+
+import pytest
+
+from financial_planner.projection import education_costs
+from financial_planner.montecarlo import MAX_PATHS
+from financial_planner.planner import calculate_plan
+from financial_planner.validation import ProfileError, parse_monte_carlo_options, parse_user_profile, parse_user_profiles
+
+PROFILE = {
+    'age': 40,
+    'retirement_age': 65,
+    'current_savings': 50000,
+    'annual_income': 90000,
+    'children': [{'age': 8, 'education_goal': 'college'}],
+}
+
+
+def fields(error):
+    return [problem['field'] for problem in error.value.errors]
+
+
+def test_form_strings_and_whole_floats_are_accepted():
+    profile = parse_user_profile(dict(
+        PROFILE, age='40', retirement_age=65.0, current_savings=' 50000.5 ',
+        children=[{'age': '8', 'education_goal': 'university'}],
+    ))
+
+    assert profile == dict(PROFILE, current_savings=50000.5, annual_income=90000.0,
+                           children=[{'age': 8, 'education_goal': 'university'}])
+    assert type(profile['age']) is int and type(profile['annual_income']) is float
+
+
+@pytest.mark.parametrize('changes, field', [
+    ({'age': 40.5}, 'age'),
+    ({'age': True}, 'age'),
+    ({'age': 10}, 'age'),
+    ({'retirement_age': 40}, 'retirement_age'),
+    ({'retirement_age': 96}, 'retirement_age'),
+    ({'annual_income': 0}, 'annual_income'),
+    ({'annual_income': 'NaN'}, 'annual_income'),
+    ({'current_savings': -1}, 'current_savings'),
+    ({'current_savings': 10 ** 400}, 'current_savings'),
+    ({'children': {'age': 3}}, 'children'),
+    ({'children': [{'age': -1, 'education_goal': 'college'}]}, 'children[0].age'),
+    ({'children': [{'age': 40, 'education_goal': 'college'}]}, 'children[0].age'),
+    ({'children': [{'age': 3, 'education_goal': 'trade school'}]}, 'children[0].education_goal'),
+    ({'children': [3]}, 'children[0]'),
+])
+def test_bad_values_are_rejected_by_field(changes, field):
+    with pytest.raises(ProfileError) as error:
+        parse_user_profile(dict(PROFILE, **changes))
+    assert fields(error) == [field]
+
+
+def test_every_problem_is_reported_at_once():
+    with pytest.raises(ProfileError) as error:
+        parse_user_profile({'age': 'forty', 'annual_income': -5, 'children': [{'education_goal': 'college'}]})
+
+    assert fields(error) == ['age', 'retirement_age', 'current_savings', 'annual_income', 'children[0].age']
+    assert error.value.to_dict()['errors'][1] == {'field': 'retirement_age', 'message': 'is required'}
+
+
+def test_bulk_parsing_names_each_entry():
+    profiles = [PROFILE, dict(PROFILE, annual_income=0), 'nope']
+    with pytest.raises(ProfileError) as error:
+        parse_user_profiles(profiles)
+
+    assert fields(error) == ['profiles[1].annual_income', 'profiles[2]']
+    assert parse_user_profiles([PROFILE] * 3) == [parse_user_profile(PROFILE)] * 3
+
+
+def test_children_at_or_past_college_age_are_explicit():
+    years_to_college, current, projected, monthly = education_costs([18, 20, 22, 30])
+
+    assert years_to_college.tolist() == [0, -2, -4, -12]
+    # Only the years still to attend, due within the next 12 months
+    assert current.tolist() == [140000.0, 70000.0, 0.0, 0.0]
+    assert projected.tolist() == current.tolist()
+    assert math.isclose(monthly[1], 70000 / 12) and monthly[2] == monthly[3] == 0
+
+
+def test_integers_past_the_float_range_are_a_400(client):
+    for body, field in ((dict(PROFILE, current_savings=10 ** 400), 'current_savings'),
+                        (dict(PROFILE, assumptions={'annual_return_rate': 10 ** 400}), 'assumptions.annual_return_rate'),
+                        (dict(PROFILE, return_rates=[10 ** 400]), 'return_rates[0]')):
+        path = '/sensitivity' if 'return_rates' in body else '/calculate'
+        response = client.post(path, json=body)
+        assert response.status_code == 400
+        assert response.get_json()['errors'] == [{'field': field, 'message': 'must be a number'}]
+
+
+def test_endpoints_answer_with_structured_400s(client):
+    bad = dict(PROFILE, retirement_age=30)
+    expected = {'error': 'Invalid profile', 'errors': [
+        {'field': 'retirement_age', 'message': 'must be above age and at most 95'},
+    ]}
+
+    for path, body in (('/calculate', bad), ('/solve', bad), ('/sensitivity', bad), ('/scenarios', bad)):
+        response = client.post(path, json=body)
+        assert response.status_code == 400 and response.get_json() == expected, path
+
+    response = client.post('/calculate/batch', json=[PROFILE, bad])
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0]['field'] == 'profiles[1].retirement_age'
+
+    response = client.post('/scenarios', json={'scenarios': [PROFILE, bad]})
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0]['field'] == 'scenarios[1].retirement_age'
+
+
+def test_chat_rejects_bad_financial_data_before_calling_openai(client, fake_openai):
+    response = client.post('/chat', json={'message': 'Hi', 'financialData': dict(PROFILE, annual_income='lots')})
+
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [{'field': 'financialData.annual_income', 'message': 'must be a number'}]
+    assert fake_openai.requests == []
+
+
+def test_chat_parses_form_strings_like_calculate(client, fake_openai):
+    financial_data = {key: str(value) for key, value in PROFILE.items() if key != 'children'}
+    response = client.post('/chat', json={'message': 'Hi', 'financialData': financial_data})
+
+    assert response.get_json()['success'] is True
+    system_prompt = fake_openai.requests[-1]['messages'][0]['content']
+    assert 'retiring at 65 (25 years away)' in system_prompt
+
+
+@pytest.mark.parametrize('monte_carlo, field', [
+    ({'paths': 'abc'}, 'monte_carlo.paths'),
+    ({'paths': 0}, 'monte_carlo.paths'),
+    ({'paths': MAX_PATHS + 1}, 'monte_carlo.paths'),
+    ({'seed': -1}, 'monte_carlo.seed'),
+    ({'seed': 'x'}, 'monte_carlo.seed'),
+    ({'seed': 1.5}, 'monte_carlo.seed'),
+    ('yes', 'monte_carlo'),
+])
+def test_bad_monte_carlo_options_are_a_400(client, monte_carlo, field):
+    response = client.post('/calculate', json=dict(PROFILE, monte_carlo=monte_carlo))
+
+    assert response.status_code == 400
+    assert [problem['field'] for problem in response.get_json()['errors']] == [field]
+    with pytest.raises(ProfileError):
+        calculate_plan(parse_user_profile(PROFILE), monte_carlo)
+
+
+def test_monte_carlo_options_defaults():
+    assert parse_monte_carlo_options(None) is None and parse_monte_carlo_options(False) is None
+    assert parse_monte_carlo_options(True) == {'paths': 10000, 'seed': None}
+    assert parse_monte_carlo_options({'paths': '500', 'seed': 7}) == {'paths': 500, 'seed': 7}